@@ -9,11 +9,16 @@ import json
 import re
 import time
 import argparse
+import threading
 import requests
 import logging
 from pathlib import Path
 from urllib.parse import urlparse, parse_qs
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import RateLimiter
 
 
 BASE_URL = "https://tononkira.serasera.org"
@@ -24,12 +29,21 @@ HEADERS = {
                   "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 }
 
+# Session réutilisable pour le pool de connexions (comme en Phase 2)
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+
+# Limiteur de débit (token bucket par hôte), même composant que la Phase 2
+RATE_LIMITER = RateLimiter()
+
 
 def fetch_page(url, retries=3, delay=2):
     """Télécharge une page HTML avec retry et backoff exponentiel."""
     for attempt in range(1, retries + 1):
         try:
-            r = requests.get(url, headers=HEADERS, timeout=20)
+            RATE_LIMITER.wait(url)
+            r = SESSION.get(url, timeout=20)
+            RATE_LIMITER.feedback(url, r.status_code, r.headers.get("Retry-After"))
             r.raise_for_status()
             return r.text
         except requests.RequestException as e:
@@ -100,8 +114,47 @@ def extract_artists_from_page(html):
     return artists
 
 
-def discover_all_artists(delay=2, output_file="artists.json"):
-    """Pipeline complet : parcourt toutes les pages et sauvegarde artists.json."""
+def load_checkpoint(checkpoint_path):
+    """Relit le checkpoint JSONL : {numéro de page: [artistes]}.
+
+    Une dernière ligne tronquée par un crash est coupée du fichier : sinon la
+    prochaine page ajoutée serait collée dessus et perdue elle aussi.
+    """
+    pages = {}
+    if not checkpoint_path.exists():
+        return pages
+    with open(checkpoint_path, "rb") as f:
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    if end < len(data):
+        # Dernière ligne tronquée : on la refera
+        with open(checkpoint_path, "r+b") as f:
+            f.truncate(end)
+    for line in data[:end].splitlines():
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            # Ligne illisible (ancien checkpoint abîmé) : page refaite
+            continue
+        pages[entry["page"]] = entry["artists"]
+    return pages
+
+
+def discover_all_artists(delay=2, output_file="artists.json", rate=1.0, burst=2,
+                         workers=4, checkpoint_file=None):
+    """Pipeline complet : parcourt toutes les pages et sauvegarde artists.json.
+
+    Le débit est plafonné par RATE_LIMITER (`rate` req/s, rafale `burst`) ;
+    `delay` sert de base au backoff des retries.
+
+    Les pages sont téléchargées par `workers` threads (Session partagée) et
+    chaque page terminée est ajoutée au checkpoint JSONL : une découverte
+    interrompue reprend là où elle s'était arrêtée. Le checkpoint est
+    supprimé une fois artists.json écrit sans page en échec.
+    """
+    RATE_LIMITER.configure(rate, burst)
+    SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+    SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=workers))
     
     # Configuration du logging
     log_file = "discover_artists.log"
@@ -130,30 +183,49 @@ def discover_all_artists(delay=2, output_file="artists.json"):
     last_page = get_last_page_number(first_page)
     logger.info(f"   → {last_page} pages détectées")
 
-    # Étape 2 : Parcourir toutes les pages
-    all_artists = []
-    seen_slugs = set()
-
-    for page_num in range(1, last_page + 1):
-        url = f"{ARTISTS_LIST_URL}?page={page_num}"
-        logger.info(f"📥 Page {page_num}/{last_page} ...")
-
-        html = fetch_page(url)
+    # Étape 2 : Parcourir toutes les pages (en parallèle, avec checkpoint)
+    checkpoint_path = Path(checkpoint_file or f"{output_file}.pages.jsonl")
+    pages = load_checkpoint(checkpoint_path)
+    if pages:
+        logger.info(f"♻️  Reprise : {len(pages)} pages déjà dans {checkpoint_path}")
+
+    todo = [n for n in range(1, last_page + 1) if n not in pages]
+    checkpoint_lock = threading.Lock()
+
+    def fetch_listing(page_num):
+        # La page 1 est celle déjà chargée pour la pagination
+        if page_num == 1:
+            html = first_page
+        else:
+            html = fetch_page(f"{ARTISTS_LIST_URL}?page={page_num}", delay=delay)
         if not html:
-            continue
-
+            return page_num, None
         page_artists = extract_artists_from_page(html)
-
-        # Dédupliquer
-        new_count = 0
-        for artist in page_artists:
+        with checkpoint_lock:
+            with open(checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"page": page_num, "artists": page_artists},
+                                   ensure_ascii=False) + "\n")
+        return page_num, page_artists
+
+    failed_pages = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(fetch_listing, n) for n in todo]
+        for done, future in enumerate(as_completed(futures), 1):
+            page_num, page_artists = future.result()
+            if page_artists is None:
+                failed_pages.append(page_num)
+                continue
+            pages[page_num] = page_artists
+            logger.info(f"📥 Page {page_num} ({done}/{len(todo)}) → {len(page_artists)} artistes")
+
+    # Dédupliquer, dans l'ordre des pages
+    all_artists = []
+    seen_slugs = set()
+    for page_num in sorted(pages):
+        for artist in pages[page_num]:
             if artist["slug"] not in seen_slugs:
                 seen_slugs.add(artist["slug"])
                 all_artists.append(artist)
-                new_count += 1
-
-        logger.info(f"  → {new_count} nouveaux artistes")
-        time.sleep(delay)
 
     # Étape 3 : Filtrer les artistes sans chansons
     artists_with_songs = [a for a in all_artists if a["song_count"] > 0]
@@ -164,6 +236,12 @@ def discover_all_artists(delay=2, output_file="artists.json"):
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(artists_with_songs, f, ensure_ascii=False, indent=2)
 
+    if failed_pages:
+        logger.warning(f"⚠️  {len(failed_pages)} pages en échec : {sorted(failed_pages)[:20]}")
+        logger.warning(f"   Relancez le script pour les reprendre (checkpoint : {checkpoint_path})")
+    elif checkpoint_path.exists():
+        checkpoint_path.unlink()
+
     # Résumé
     total_songs = sum(a["song_count"] for a in artists_with_songs)
     top_artists = sorted(artists_with_songs, key=lambda a: a["song_count"], reverse=True)
@@ -193,7 +271,23 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--delay", type=float, default=2.0,
-        help="Délai entre les requêtes en secondes (défaut: 2.0)"
+        help="Délai de base du backoff entre deux tentatives en secondes (défaut: 2.0)"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=1.0,
+        help="Requêtes/s max vers le site ; 0 = illimité (défaut: 1.0)"
+    )
+    parser.add_argument(
+        "--burst", type=int, default=2,
+        help="Rafale max autorisée par le token bucket (défaut: 2)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4,
+        help="Nombre de pages téléchargées en parallèle (défaut: 4)"
+    )
+    parser.add_argument(
+        "--checkpoint", type=str, default=None,
+        help="Fichier JSONL de reprise (défaut: <output>.pages.jsonl)"
     )
     parser.add_argument(
         "--output", type=str, default="artists.json",
@@ -201,4 +295,6 @@ if __name__ == "__main__":
     )
     args = parser.parse_args()
 
-    discover_all_artists(delay=args.delay, output_file=args.output)
+    discover_all_artists(delay=args.delay, output_file=args.output,
+                         rate=args.rate, burst=args.burst,
+                         workers=args.workers, checkpoint_file=args.checkpoint)
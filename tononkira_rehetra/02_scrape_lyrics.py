@@ -9,6 +9,7 @@ organisées par dossier artiste avec un fichier .txt par chanson.
 import json
 import re
 import time
+import asyncio
 import argparse
 import requests
 import logging
@@ -17,6 +18,18 @@ from urllib.parse import urlparse, parse_qs, unquote
 from bs4 import BeautifulSoup
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from rate_limiter import RateLimiter
+from crawl_state import CrawlState
+from http_cache import HttpCache
+from song_parser import extract_song_info_lxml, lxml
+from replay_server import CrawlArchive
+from song_store import SongStore
+
+try:
+    import aiohttp  # Optionnel : uniquement pour --engine async
+except ImportError:
+    aiohttp = None
+
 
 BASE_URL = "https://tononkira.serasera.org"
 
@@ -29,18 +42,75 @@ HEADERS = {
 SESSION = requests.Session()
 SESSION.headers.update(HEADERS)
 
+# Limiteur de débit partagé par tous les workers (token bucket par hôte)
+RATE_LIMITER = RateLimiter()
+
+# Cache conditionnel (ETag / Last-Modified) des pages de liste, configuré
+# par run_scraping. Les pages de chansons ne sont jamais mises en cache.
+HTTP_CACHE = None
+
+# Code renvoyé quand une page de liste n'a pas changé depuis le dernier crawl
+NOT_MODIFIED = 304
+
+# Archive des réponses brutes (--record), rejouable par replay_server.py
+ARCHIVE = None
+
+# Store de chansons en shards (--store) ; None = un fichier .txt par chanson
+SONG_STORE = None
+
+# Latences des requêtes en secondes, collectées si c'est une liste
+# (utilisé par bench_scraper.py pour les percentiles) : une par réponse
+# reçue, erreurs HTTP comprises, dans les deux moteurs
+REQUEST_LATENCIES = None
+
 
 # ============================================================
 # HTTP
 # ============================================================
 
-def fetch_page(url, retries=3, delay=1):
-    """Télécharge une page HTML avec retry et backoff exponentiel en utilisant la Session."""
+def archive_response(url, status, body, content_type, elapsed):
+    """Enregistre une réponse dans l'archive --record, s'il y en a une.
+
+    Un 304 est archivé comme le 200 qu'il confirme, avec le corps du cache :
+    le serveur de rejeu ne fait pas de requêtes conditionnelles.
+    """
+    if ARCHIVE is None:
+        return
+    if status == NOT_MODIFIED:
+        status, content_type = 200, content_type or "text/html; charset=utf-8"
+    ARCHIVE.record(url, status, body, content_type, elapsed)
+
+
+def fetch_with_status(url, retries=3, delay=1, cache=None):
+    """Comme fetch_page, mais retourne (html, code HTTP).
+
+    html vaut None en cas d'échec ; le code est celui de la dernière
+    réponse reçue (None si aucune réponse, ex. timeout).
+    Avec `cache`, la requête est conditionnelle : sur un 304 on retourne
+    (corps en cache, NOT_MODIFIED) sans rien re-télécharger.
+    """
+    conditional = cache.conditional_headers(url) if cache else {}
+    status = None
     for attempt in range(1, retries + 1):
         try:
-            r = SESSION.get(url, timeout=20)
+            RATE_LIMITER.wait(url)
+            start = time.perf_counter()
+            r = SESSION.get(url, timeout=20, headers=conditional or None)
+            if REQUEST_LATENCIES is not None:
+                REQUEST_LATENCIES.append(time.perf_counter() - start)
+            status = r.status_code
+            RATE_LIMITER.feedback(url, r.status_code, r.headers.get("Retry-After"))
             r.raise_for_status()
-            return r.text
+            if cache is not None:
+                if status == NOT_MODIFIED:
+                    text = cache.body(url)
+                    archive_response(url, status, text, r.headers.get("Content-Type"),
+                                     r.elapsed.total_seconds())
+                    return text, status
+                cache.store(url, r.text, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+            archive_response(url, status, r.content, r.headers.get("Content-Type"),
+                             r.elapsed.total_seconds())
+            return r.text, status
         except requests.RequestException as e:
             # On log l'erreur mais on continue
             if attempt == retries:
@@ -48,7 +118,67 @@ def fetch_page(url, retries=3, delay=1):
             if attempt < retries:
                 wait = delay * (2 ** (attempt - 1))
                 time.sleep(wait)
-    return None
+    return None, status
+
+
+def fetch_page(url, retries=3, delay=1):
+    """Télécharge une page HTML avec retry et backoff exponentiel en utilisant la Session."""
+    return fetch_with_status(url, retries, delay)[0]
+
+
+async def fetch_with_status_async(session, url, inflight, retries=3, delay=1, cache=None):
+    """Version asyncio de fetch_with_status.
+
+    `inflight` est le sémaphore global : il borne le nombre de requêtes
+    en vol pour tout le crawl. Le backoff se fait hors du sémaphore pour
+    ne pas bloquer un slot pendant l'attente. Le cache et l'archive
+    (SQLite, verrou et commit par ligne) passent par asyncio.to_thread,
+    une fois la réponse lue et le slot rendu : la boucle n'est jamais
+    bloquée sur le disque.
+    """
+    conditional = await asyncio.to_thread(cache.conditional_headers, url) if cache else {}
+    status = None
+    for attempt in range(1, retries + 1):
+        try:
+            await RATE_LIMITER.wait_async(url)
+            async with inflight:
+                start = time.perf_counter()
+                async with session.get(url, headers=conditional or None) as r:
+                    status = r.status
+                    # Réponse complète, erreurs comprises : mêmes latences que le moteur threads
+                    raw = await r.read()
+                    elapsed = time.perf_counter() - start
+                    if REQUEST_LATENCIES is not None:
+                        REQUEST_LATENCIES.append(elapsed)
+                    RATE_LIMITER.feedback(url, r.status, r.headers.get("Retry-After"))
+                    r.raise_for_status()
+                    headers = r.headers
+                    text = None if status == NOT_MODIFIED else raw.decode(r.get_encoding())
+
+            content_type = headers.get("Content-Type")
+            if cache is not None and status == NOT_MODIFIED:
+                text = await asyncio.to_thread(cache.body, url)
+                if ARCHIVE is not None:
+                    await asyncio.to_thread(archive_response, url, status, text, content_type, elapsed)
+                return text, status
+            if cache is not None:
+                await asyncio.to_thread(cache.store, url, text, headers.get("ETag"),
+                                        headers.get("Last-Modified"))
+            if ARCHIVE is not None:
+                await asyncio.to_thread(archive_response, url, status, raw, content_type, elapsed)
+            return text, status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == retries:
+                logging.getLogger(__name__).debug(f"    ⚠️  Échec final pour {url} : {e}")
+            if attempt < retries:
+                wait = delay * (2 ** (attempt - 1))
+                await asyncio.sleep(wait)
+    return None, status
+
+
+async def fetch_page_async(session, url, inflight, retries=3, delay=1):
+    """Version asyncio de fetch_page."""
+    return (await fetch_with_status_async(session, url, inflight, retries, delay))[0]
 
 
 # ============================================================
@@ -172,6 +302,19 @@ def extract_song_info(html, song_url):
     }
 
 
+# Backends d'extraction interchangeables (--parser). "lxml" donne le même
+# dict que "bs4" en un seul parcours de l'arbre sur les pages bien formées
+# (cf. bench_song_parser.py) ; sur une balise non fermée (<p> sans </p>),
+# les deux arbres diffèrent. "bs4" reste donc le défaut.
+SONG_PARSERS = {
+    "bs4": extract_song_info,
+    "lxml": extract_song_info_lxml,
+}
+
+# Backend actif, choisi par run_scraping
+SONG_PARSER = extract_song_info
+
+
 # ============================================================
 # SAUVEGARDE
 # ============================================================
@@ -188,12 +331,9 @@ def sanitize_filename(name):
     return name
 
 
-def save_song(output_dir, titre_slug, song_info, song_url):
-    """Sauvegarde une chanson dans un fichier .txt."""
-    filename = sanitize_filename(titre_slug) + ".txt"
-    filepath = output_dir / filename
-
-    content = (
+def format_song(song_info, song_url):
+    """Contenu texte d'une chanson, tel qu'écrit dans son fichier .txt."""
+    return (
         f"Titre: {song_info['title']}\n"
         f"Artiste: {song_info['artist']}\n"
         f"Source: {song_url}\n"
@@ -201,59 +341,125 @@ def save_song(output_dir, titre_slug, song_info, song_url):
         f"{song_info['lyrics']}\n"
     )
 
+
+def save_song(output_dir, titre_slug, song_info, song_url):
+    """Sauvegarde une chanson dans un fichier .txt, ou dans SONG_STORE s'il est actif."""
+    filename = sanitize_filename(titre_slug) + ".txt"
+    filepath = output_dir / filename
+
+    content = format_song(song_info, song_url)
+
+    if SONG_STORE is not None:
+        SONG_STORE.put(output_dir.name, filepath.stem, song_url, content)
+        return filepath
+
     with open(filepath, "w", encoding="utf-8") as f:
         f.write(content)
 
     return filepath
 
 
+def existing_song(artist_dir, titre_slug):
+    """Nom du fichier de la chanson si elle est déjà sauvée (resume), sinon None."""
+    filename = sanitize_filename(titre_slug) + ".txt"
+    if SONG_STORE is not None:
+        found = SONG_STORE.exists(artist_dir.name, filename[:-4])
+    else:
+        found = (artist_dir / filename).exists()
+    return filename if found else None
+
+
 # ============================================================
 # SCRAPING D'UN ARTISTE
 # ============================================================
 
-def download_song_task(song_url, titre_slug, artist_dir, delay, logger):
+def process_song_html(html, song_url, titre_slug, artist_dir):
+    """Parse une page de chanson déjà téléchargée et la sauvegarde."""
+    song_info = SONG_PARSER(html, song_url)
+    if not song_info or len(song_info["lyrics"]) < 50:
+        return "too_short", titre_slug
+
+    filepath = save_song(artist_dir, titre_slug, song_info, song_url)
+    return "saved", filepath.name
+
+
+def download_song_task(song_url, titre_slug, artist_dir, delay, logger, state=None):
     """Tâche individuelle de téléchargement d'une chanson pour multi-threading."""
+    slug = artist_dir.name
+
     # Vérifier si déjà scrapé (resume)
-    expected_file = artist_dir / (sanitize_filename(titre_slug) + ".txt")
-    if expected_file.exists():
-        return "skipped", expected_file.name
+    existing = existing_song(artist_dir, titre_slug)
+    if existing:
+        if state:
+            state.record_song(slug, song_url, "saved")
+        return "skipped", existing
 
-    html = fetch_page(song_url)
+    html, http_code = fetch_with_status(song_url, delay=delay)
     if not html:
-        return "failed", titre_slug
+        result = ("failed", titre_slug)
+    else:
+        result = process_song_html(html, song_url, titre_slug, artist_dir)
 
-    song_info = extract_song_info(html, song_url)
-    if not song_info or len(song_info["lyrics"]) < 50:
-        return "too_short", titre_slug
+    if state:
+        state.record_song(slug, song_url, result[0], http_code)
+    return result
 
-    filepath = save_song(artist_dir, titre_slug, song_info, song_url)
-    return "saved", filepath.name
 
+def discover_artist_songs(artist_data, delay=1, state=None, retry_failed=False,
+                          incremental=False):
+    """Liste les chansons d'un artiste : [(url, titre_slug), ...] ou None si échec.
 
-def scrape_artist(artist_data, output_base, delay=1, logger=None, workers=5):
-    """Scrape toutes les chansons d'un artiste en utilisant le multi-threading."""
-    logger = logger or logging.getLogger(__name__)
+    Sans `state`, toutes les pages de liste sont parcourues. Avec `state`,
+    les pages déjà en base ne sont pas re-téléchargées (aucune requête si
+    l'artiste est entièrement listé) et seules les chansons encore à faire
+    sont renvoyées.
+
+    `incremental` force la re-visite des pages de liste, en requêtes
+    conditionnelles via HTTP_CACHE : une page déjà connue qui répond 304
+    n'est même pas parsée. Seules les nouvelles chansons sont renvoyées.
+    """
     slug = artist_data["slug"]
     name = artist_data["name"]
-
-    artist_dir = output_base / slug
-    artist_dir.mkdir(parents=True, exist_ok=True)
-
-    # Étape 1 : Découvrir toutes les chansons
     base_url = f"{BASE_URL}/mpihira/{slug}/hira"
-    html = fetch_page(base_url)
-    if not html:
-        return 0, 0, 1
 
-    last_page = get_last_page_number(html)
+    known = state.get_artist(slug) if state else None
+    if known and known[1] and not incremental:
+        return state.songs_to_fetch(slug, retry_failed)
+
+    if known and known[0] and not incremental:
+        last_page = known[0]
+    else:
+        html, http_code = fetch_with_status(base_url, delay=delay, cache=HTTP_CACHE)
+        if not html:
+            return None
+        if http_code == NOT_MODIFIED and known and known[0]:
+            last_page = known[0]
+        else:
+            last_page = get_last_page_number(html)
+            if state:
+                state.set_last_page(slug, name, last_page)
+
+    done = state.done_pages(slug) if state else set()
     all_songs = []
     for page in range(1, last_page + 1):
+        if page in done and not incremental:
+            continue
         page_url = f"{base_url}?page={page}"
-        page_html = fetch_page(page_url)
-        if page_html:
-            songs = extract_song_links(page_html)
+        page_html, http_code = fetch_with_status(page_url, delay=delay, cache=HTTP_CACHE)
+        if http_code == NOT_MODIFIED and page in done:
+            # Page inchangée : ses chansons sont déjà en base, pas de parsing
+            songs = []
+        else:
+            songs = extract_song_links(page_html) if page_html else None
+        if state:
+            state.record_listing_page(slug, page, http_code, songs)
+        if songs:
             all_songs.extend(songs)
-        if delay > 0: time.sleep(delay)
+
+    if state:
+        if state.done_pages(slug) >= set(range(1, last_page + 1)):
+            state.mark_artist_listed(slug)
+        return state.songs_to_fetch(slug, retry_failed)
 
     # Dédupliquer
     seen_urls = set()
@@ -262,15 +468,37 @@ def scrape_artist(artist_data, output_base, delay=1, logger=None, workers=5):
         if url not in seen_urls:
             seen_urls.add(url)
             unique_songs.append((url, titre))
+    return unique_songs
+
+
+def scrape_artist(artist_data, output_base, delay=1, logger=None, workers=5,
+                  state=None, retry_failed=False, incremental=False):
+    """Scrape toutes les chansons d'un artiste en utilisant le multi-threading."""
+    logger = logger or logging.getLogger(__name__)
+    slug = artist_data["slug"]
+    name = artist_data["name"]
+
+    artist_dir = output_base / slug
+    if SONG_STORE is None:
+        artist_dir.mkdir(parents=True, exist_ok=True)
+
+    # Étape 1 : Découvrir toutes les chansons
+    unique_songs = discover_artist_songs(artist_data, delay, state, retry_failed, incremental)
+    if unique_songs is None:
+        return 0, 0, 1
 
     # Étape 2 : Scraper chaque chanson en parallèle
     saved = 0
     skipped = 0
     failed = 0
 
+    # Chansons déjà traitées lors d'un run précédent (état persistant)
+    if state:
+        skipped = state.count_songs(slug) - len(unique_songs)
+
     with ThreadPoolExecutor(max_workers=workers) as executor:
         futures = {
-            executor.submit(download_song_task, url, titre, artist_dir, delay, logger): (url, titre)
+            executor.submit(download_song_task, url, titre, artist_dir, delay, logger, state): (url, titre)
             for url, titre in unique_songs
         }
 
@@ -291,14 +519,220 @@ def scrape_artist(artist_data, output_base, delay=1, logger=None, workers=5):
     return saved, skipped, failed
 
 
+# ============================================================
+# MOTEUR ASYNCIO
+# ============================================================
+
+async def download_song_async(session, inflight, song_url, titre_slug, artist_dir, state=None):
+    """Équivalent asyncio de download_song_task.
+
+    Le parsing, l'écriture disque et les écritures SQLite de `state` partent
+    dans un thread pour ne pas bloquer la boucle d'événements pendant les
+    téléchargements.
+    """
+    slug = artist_dir.name
+
+    existing = await asyncio.to_thread(existing_song, artist_dir, titre_slug)
+    if existing:
+        if state:
+            await asyncio.to_thread(state.record_song, slug, song_url, "saved")
+        return "skipped", existing
+
+    html, http_code = await fetch_with_status_async(session, song_url, inflight)
+    if not html:
+        result = ("failed", titre_slug)
+    else:
+        result = await asyncio.to_thread(process_song_html, html, song_url, titre_slug, artist_dir)
+
+    if state:
+        await asyncio.to_thread(state.record_song, slug, song_url, result[0], http_code)
+    return result
+
+
+async def scrape_artist_async(artist_data, output_base, session, inflight, logger,
+                              state=None, retry_failed=False, incremental=False):
+    """Scrape un artiste : chaque page de liste lance ses chansons dès qu'elle arrive.
+
+    La découverte des pages et les téléchargements de chansons s'entrelacent,
+    tous bornés par le même sémaphore global `inflight`. Avec `state`, les
+    pages déjà listées ne sont pas re-téléchargées, sauf en `incremental`
+    (cf. discover_artist_songs). Le parsing BeautifulSoup des pages de liste
+    et les accès à `state` (SQLite) passent par asyncio.to_thread.
+    """
+    slug = artist_data["slug"]
+    name = artist_data["name"]
+
+    artist_dir = output_base / slug
+    if SONG_STORE is None:
+        artist_dir.mkdir(parents=True, exist_ok=True)
+
+    base_url = f"{BASE_URL}/mpihira/{slug}/hira"
+    seen_urls = set()
+    counts = {"saved": 0, "skipped": 0, "failed": 0}
+
+    async def song(url, titre):
+        try:
+            status, info = await download_song_async(session, inflight, url, titre, artist_dir, state)
+        except Exception:
+            status = "failed"
+        if status in ("saved", "skipped"):
+            counts[status] += 1
+        else:
+            counts["failed"] += 1
+
+    known = await asyncio.to_thread(state.get_artist, slug) if state else None
+    done = await asyncio.to_thread(state.done_pages, slug) if state else set()
+    first_html = None
+    if known and known[0] and not incremental:
+        last_page = known[0]
+    else:
+        first_html, http_code = await fetch_with_status_async(
+            session, base_url, inflight, cache=HTTP_CACHE
+        )
+        if not first_html:
+            return 0, 0, 1
+        if http_code == NOT_MODIFIED and known and known[0]:
+            last_page = known[0]
+            first_html = None
+        else:
+            last_page = await asyncio.to_thread(get_last_page_number, first_html)
+            if state:
+                await asyncio.to_thread(state.set_last_page, slug, name, last_page)
+
+    # Chansons déjà connues en base : on relance celles à faire, les autres
+    # comptent comme "skip" et ne seront pas reprogrammées par les pages.
+    resumed = []
+    if state:
+        resumed = await asyncio.to_thread(state.songs_to_fetch, slug, retry_failed)
+        seen_urls.update(await asyncio.to_thread(state.song_urls, slug))
+        counts["skipped"] = len(seen_urls) - len(resumed)
+
+    async def listing(page):
+        # La page 1 est celle déjà chargée pour la pagination
+        if page == 1 and first_html is not None:
+            page_html, http_code = first_html, 200
+        else:
+            page_html, http_code = await fetch_with_status_async(
+                session, f"{base_url}?page={page}", inflight, cache=HTTP_CACHE
+            )
+        if http_code == NOT_MODIFIED and page in done:
+            # Page inchangée : ses chansons sont déjà en base, pas de parsing
+            songs = []
+        else:
+            songs = await asyncio.to_thread(extract_song_links, page_html) if page_html else None
+        if state:
+            await asyncio.to_thread(state.record_listing_page, slug, page, http_code, songs)
+        if not songs:
+            return
+        new_songs = []
+        for url, titre in songs:
+            if url not in seen_urls:
+                seen_urls.add(url)
+                new_songs.append((url, titre))
+        await asyncio.gather(*(song(url, titre) for url, titre in new_songs))
+
+    pages = range(1, last_page + 1)
+    if incremental:
+        pass
+    elif known and known[1]:
+        pages = []
+    elif state:
+        pages = [p for p in pages if p not in done]
+
+    await asyncio.gather(
+        *(song(url, titre) for url, titre in resumed),
+        *(listing(page) for page in pages)
+    )
+
+    if state and (incremental or not (known and known[1])):
+        if await asyncio.to_thread(state.done_pages, slug) >= set(range(1, last_page + 1)):
+            await asyncio.to_thread(state.mark_artist_listed, slug)
+
+    saved, skipped, failed = counts["saved"], counts["skipped"], counts["failed"]
+    message = f"✅ {name:25} | {saved:3} sauvées | {skipped:3} skip | {failed:3} failed"
+    logger.info(message)
+    return saved, skipped, failed
+
+
+async def scrape_all_async(artists, output_base, logger, max_inflight=20,
+                           state=None, retry_failed=False, incremental=False):
+    """Scrape tous les artistes avec un seul pool de connexions aiohttp.
+
+    `max_inflight` borne à la fois le nombre de sockets (connector) et le
+    nombre de requêtes en vol (sémaphore). Le nombre d'artistes ouverts en
+    même temps est borné de la même façon pour que les chansons ne restent
+    pas derrière des milliers de pages de liste.
+    """
+    inflight = asyncio.Semaphore(max_inflight)
+    artist_slots = asyncio.Semaphore(max_inflight)
+    connector = aiohttp.TCPConnector(limit=max_inflight)
+    timeout = aiohttp.ClientTimeout(total=20)
+
+    async with aiohttp.ClientSession(headers=HEADERS, connector=connector,
+                                     timeout=timeout) as session:
+
+        async def one_artist(artist):
+            async with artist_slots:
+                return await scrape_artist_async(artist, output_base, session, inflight, logger,
+                                                 state, retry_failed, incremental)
+
+        results = await asyncio.gather(*(one_artist(a) for a in artists),
+                                       return_exceptions=True)
+
+    total_saved = total_skipped = total_failed = 0
+    for result in results:
+        if isinstance(result, BaseException):
+            total_failed += 1
+            continue
+        saved, skipped, failed = result
+        total_saved += saved
+        total_skipped += skipped
+        total_failed += failed
+    return total_saved, total_skipped, total_failed
+
+
 # ============================================================
 # PIPELINE PRINCIPAL
 # ============================================================
 
 def run_scraping(artists_file="artists.json", output_dir="output",
                  delay=1.0, start_from=0, artist_slug=None, 
-                 song_workers=5, artist_workers=1):
-    """Pipeline principal : lit artists.json et scrape tout en Turbo Mode."""
+                 song_workers=5, artist_workers=1,
+                 engine="threads", max_inflight=20,
+                 rate=4.0, burst=8,
+                 state_db="crawl_state.sqlite", retry_failed=False,
+                 http_cache="http_cache.sqlite", incremental=False,
+                 parser="bs4", record=None, base_url=None, store=None):
+    """Pipeline principal : lit artists.json et scrape tout en Turbo Mode.
+
+    engine="threads" : pools imbriqués artistes × chansons (historique).
+    engine="async"   : boucle asyncio, un seul pool de connexions et une
+                       limite globale de `max_inflight` requêtes en vol.
+
+    Dans les deux cas, le débit vers le site est plafonné par RATE_LIMITER
+    (`rate` requêtes/s, rafales de `burst`), partagé par tous les workers.
+    `delay` n'est plus qu'un délai de base pour le backoff des retries.
+
+    `state_db` : base SQLite de l'état du crawl (None pour la désactiver).
+    Une reprise après crash ne refait aucune requête de liste déjà réussie ;
+    `retry_failed` relance uniquement les chansons en échec.
+
+    `http_cache` : cache conditionnel (ETag/Last-Modified) des pages de
+    liste. `incremental` re-visite toutes les pages de liste (les 304 ne
+    coûtent ni transfert ni parsing) et ne télécharge que les nouvelles
+    chansons : c'est le mode du rafraîchissement mensuel.
+
+    `parser` : backend d'extraction des paroles, "bs4" (défaut), "lxml" ou
+    "auto" (lxml s'il est installé).
+
+    `record` : archive SQLite où enregistrer toutes les réponses brutes
+    (rejouables avec replay_server.py). `base_url` remplace l'URL du site,
+    par exemple pour viser un serveur de rejeu local.
+
+    `store` : dossier d'un SongStore (song_store.py). Les chansons y sont
+    ajoutées en shards au lieu d'un fichier .txt chacune dans output_dir.
+    """
+    global HTTP_CACHE, SONG_PARSER, ARCHIVE, BASE_URL, SONG_STORE
     
     # Configuration du logging
     log_file = "scrape_lyrics.log"
@@ -312,11 +746,43 @@ def run_scraping(artists_file="artists.json", output_dir="output",
     )
     logger = logging.getLogger(__name__)
 
+    if engine == "async" and aiohttp is None:
+        logger.error("❌ Le moteur async nécessite aiohttp : pip install aiohttp")
+        return
+
+    if parser == "auto":
+        parser = "lxml" if lxml is not None else "bs4"
+    if parser == "lxml" and lxml is None:
+        logger.error("❌ Le parser lxml nécessite lxml : pip install lxml")
+        return
+    SONG_PARSER = SONG_PARSERS[parser]
+    if base_url:
+        BASE_URL = base_url.rstrip("/")
+
+    RATE_LIMITER.configure(rate, burst)
+
     logger.info("=" * 70)
     logger.info("🚀 PHASE 2 : SCRAPING TURBO MODE")
-    logger.info(f"   Artistes en parallèle : {artist_workers}")
-    logger.info(f"   Chansons en parallèle  : {song_workers}")
-    logger.info(f"   Total Threads         : {artist_workers * song_workers}")
+    if engine == "async":
+        logger.info(f"   Moteur                : asyncio (aiohttp)")
+        logger.info(f"   Requêtes en vol (max) : {max_inflight}")
+    else:
+        logger.info(f"   Artistes en parallèle : {artist_workers}")
+        logger.info(f"   Chansons en parallèle  : {song_workers}")
+        logger.info(f"   Total Threads         : {artist_workers * song_workers}")
+    if rate > 0:
+        logger.info(f"   Débit max             : {rate} req/s (rafale {burst})")
+    if state_db:
+        logger.info(f"   État du crawl         : {state_db}")
+    if incremental:
+        logger.info(f"   Mode                  : incrémental (requêtes conditionnelles)")
+    logger.info(f"   Parser                : {parser}")
+    if base_url:
+        logger.info(f"   Site                  : {BASE_URL}")
+    if record:
+        logger.info(f"   Enregistrement        : {record}")
+    if store:
+        logger.info(f"   Store de chansons     : {store}")
     logger.info("=" * 70)
 
     # Charger la liste des artistes
@@ -338,23 +804,37 @@ def run_scraping(artists_file="artists.json", output_dir="output",
         artists = artists[start_from:]
 
     output_base = Path(output_dir)
-    output_base.mkdir(parents=True, exist_ok=True)
+    if store:
+        SONG_STORE = SongStore(store)
+    else:
+        output_base.mkdir(parents=True, exist_ok=True)
+
+    state = CrawlState(state_db) if state_db else None
+    HTTP_CACHE = HttpCache(http_cache) if http_cache else None
+    ARCHIVE = CrawlArchive(record) if record else None
 
     total_saved = 0
     total_skipped = 0
     total_failed = 0
 
-    with ThreadPoolExecutor(max_workers=artist_workers) as executor:
-        futures = {
-            executor.submit(scrape_artist, artist, output_base, delay, logger, song_workers): artist
-            for artist in artists
-        }
-
-        for future in as_completed(futures):
-            saved, skipped, failed = future.result()
-            total_saved += saved
-            total_skipped += skipped
-            total_failed += failed
+    if engine == "async":
+        total_saved, total_skipped, total_failed = asyncio.run(
+            scrape_all_async(artists, output_base, logger, max_inflight=max_inflight,
+                             state=state, retry_failed=retry_failed, incremental=incremental)
+        )
+    else:
+        with ThreadPoolExecutor(max_workers=artist_workers) as executor:
+            futures = {
+                executor.submit(scrape_artist, artist, output_base, delay, logger, song_workers,
+                                state, retry_failed, incremental): artist
+                for artist in artists
+            }
+
+            for future in as_completed(futures):
+                saved, skipped, failed = future.result()
+                total_saved += saved
+                total_skipped += skipped
+                total_failed += failed
 
     # Résumé final
     logger.info("\n" + "=" * 70)
@@ -364,11 +844,31 @@ def run_scraping(artists_file="artists.json", output_dir="output",
     logger.info(f"  Chansons sauvées   : {total_saved}")
     logger.info(f"  Chansons existantes: {total_skipped} (skipped)")
     logger.info(f"  Échecs             : {total_failed}")
-    logger.info(f"  Dossier de sortie  : {output_base.resolve()}")
+    if state:
+        by_status = state.summary()
+        logger.info(f"  État en base       : " +
+                    ", ".join(f"{k}={v}" for k, v in sorted(by_status.items())))
+        state.close()
+    if HTTP_CACHE:
+        logger.info(f"  Cache HTTP         : {HTTP_CACHE.hits} pages inchangées (304), "
+                    f"{HTTP_CACHE.misses} re-téléchargées")
+        HTTP_CACHE.close()
+        HTTP_CACHE = None
+    if ARCHIVE:
+        logger.info(f"  Archive            : {ARCHIVE.count()} réponses dans {record}")
+        ARCHIVE.close()
+        ARCHIVE = None
+    if SONG_STORE:
+        logger.info(f"  Store de chansons  : {SONG_STORE.count()} chansons dans {store}")
+        SONG_STORE.close()
+        SONG_STORE = None
+    else:
+        logger.info(f"  Dossier de sortie  : {output_base.resolve()}")
     logger.info(f"  Fichier log         : {log_file}")
     logger.info("=" * 70)
     logger.info("✅ Phase 2 terminée ! Lancez 03_stats.py pour voir les statistiques.")
     logger.info("=" * 70)
+    return total_saved, total_skipped, total_failed
 
 
 if __name__ == "__main__":
@@ -385,7 +885,7 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--delay", type=float, default=2.0,
-        help="Délai entre les requêtes en secondes (défaut: 2.0)"
+        help="Délai de base du backoff entre deux tentatives en secondes (défaut: 2.0)"
     )
     parser.add_argument(
         "--start-from", type=int, default=0,
@@ -403,6 +903,62 @@ if __name__ == "__main__":
         "--artist-workers", type=int, default=1,
         help="Nombre d'artistes en parallèle (défaut: 1)"
     )
+    parser.add_argument(
+        "--engine", type=str, choices=["threads", "async"], default="threads",
+        help="Moteur de scraping : threads (pools imbriqués) ou async (aiohttp) (défaut: threads)"
+    )
+    parser.add_argument(
+        "--max-inflight", type=int, default=20,
+        help="Moteur async : nombre max de requêtes en vol, tous artistes confondus (défaut: 20)"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=4.0,
+        help="Requêtes/s max vers le site, tous workers confondus ; 0 = illimité (défaut: 4.0)"
+    )
+    parser.add_argument(
+        "--burst", type=int, default=8,
+        help="Rafale max autorisée par le token bucket (défaut: 8)"
+    )
+    parser.add_argument(
+        "--state-db", type=str, default="crawl_state.sqlite",
+        help="Base SQLite de l'état du crawl, pour la reprise (défaut: crawl_state.sqlite)"
+    )
+    parser.add_argument(
+        "--no-state", action="store_true",
+        help="Désactive la base d'état (reprise uniquement par fichiers existants)"
+    )
+    parser.add_argument(
+        "--retry-failed", action="store_true",
+        help="Relance les chansons dont le téléchargement a échoué lors d'un run précédent"
+    )
+    parser.add_argument(
+        "--http-cache", type=str, default="http_cache.sqlite",
+        help="Cache conditionnel (ETag/Last-Modified) des pages de liste (défaut: http_cache.sqlite)"
+    )
+    parser.add_argument(
+        "--no-http-cache", action="store_true",
+        help="Désactive le cache HTTP des pages de liste"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Rafraîchissement : re-visite les pages de liste et ne télécharge que les nouvelles chansons"
+    )
+    parser.add_argument(
+        "--parser", type=str, choices=["auto", "bs4", "lxml"], default="bs4",
+        help="Backend d'extraction des paroles ; auto = lxml s'il est installé (défaut: bs4)"
+    )
+    parser.add_argument(
+        "--record", type=str, default=None,
+        help="Enregistre toutes les réponses brutes dans cette archive SQLite (rejouable)"
+    )
+    parser.add_argument(
+        "--base-url", type=str, default=None,
+        help="URL du site à scraper, ex. un serveur de rejeu local (défaut: le vrai site)"
+    )
+    parser.add_argument(
+        "--store", type=str, default=None,
+        help="Écrit les chansons dans ce store en shards (song_store.py) au lieu de output/"
+    )
     args = parser.parse_args()
 
     run_scraping(
@@ -412,5 +968,17 @@ if __name__ == "__main__":
         start_from=args.start_from,
         artist_slug=args.artist,
         song_workers=args.song_workers,
-        artist_workers=args.artist_workers
+        artist_workers=args.artist_workers,
+        engine=args.engine,
+        max_inflight=args.max_inflight,
+        rate=args.rate,
+        burst=args.burst,
+        state_db=None if args.no_state else args.state_db,
+        retry_failed=args.retry_failed,
+        http_cache=None if args.no_http_cache else args.http_cache,
+        incremental=args.incremental,
+        parser=args.parser,
+        record=args.record,
+        base_url=args.base_url,
+        store=args.store
     )
@@ -2,45 +2,125 @@
 # -*- coding: utf-8 -*-
 """
 Phase 3 : Statistiques et vérification du scraping
-Analyse le dossier output/ et affiche un rapport détaillé.
+Analyse le dossier output/ (ou un store en shards) et affiche un rapport
+détaillé.
+
+Le dossier est lu en une seule passe os.scandir (la taille vient du cache
+stat des DirEntry). Le résultat par artiste est gardé dans un manifeste :
+au lancement suivant, seuls les dossiers dont le mtime a changé (chanson
+ajoutée, supprimée ou renommée) sont relus.
 """
 
+import os
+import json
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from song_store import SongStore, is_store
 
-def analyze_output(output_dir="output"):
-    """Analyse le dossier de sortie et affiche les statistiques."""
 
-    output_path = Path(output_dir)
+DISTRIBUTION = [
+    (100, None, "100+"),
+    (50, 99, "50-99"),
+    (20, 49, "20-49"),
+    (10, 19, "10-19"),
+    (5, 9, "5-9"),
+    (1, 4, "1-4"),
+]
 
-    if not output_path.exists():
-        print(f"❌ Dossier {output_dir} introuvable !")
-        print("💡 Exécutez d'abord : python3 02_scrape_lyrics.py")
-        return
 
-    print("=" * 70)
-    print("📊 STATISTIQUES DU SCRAPING")
-    print(f"   Dossier : {output_path.resolve()}")
-    print("=" * 70)
+def scan_artist(path):
+    """[(fichier, taille), ...] des .txt d'un dossier artiste, en un seul scandir."""
+    files = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name.endswith(".txt") and entry.is_file():
+                files.append((entry.name, entry.stat().st_size))
+    return files
+
+
+def load_manifest(manifest_file, output_path):
+    """Entrées du manifeste {artiste: {mtime_ns, files}} si elles concernent ce dossier."""
+    if not manifest_file or not os.path.exists(manifest_file):
+        return {}
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("output") != str(output_path.resolve()):
+        return {}
+    return manifest.get("artists", {})
+
+
+def save_manifest(manifest_file, output_path, artists):
+    tmp = f"{manifest_file}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"output": str(output_path.resolve()), "artists": artists}, f)
+    os.replace(tmp, manifest_file)
+
+
+def collect_from_folders(output_path, workers=1, manifest_file=None):
+    """{artiste: [(fichier, taille), ...]} depuis output/<artiste>/*.txt.
+
+    Retourne aussi le nombre de dossiers relus (les autres viennent du
+    manifeste). Avec workers > 1, les dossiers sont lus en parallèle :
+    utile surtout sur Drive ou un disque réseau, où chaque appel attend.
+    """
+    cached = load_manifest(manifest_file, output_path)
+
+    artists = {}
+    with os.scandir(output_path) as it:
+        for entry in it:
+            if entry.is_dir():
+                artists[entry.name] = (entry.path, entry.stat().st_mtime_ns)
 
-    # Collecter les stats par artiste
+    to_scan = [name for name, (_, mtime) in artists.items()
+               if name not in cached or cached[name]["mtime_ns"] != mtime]
+
+    if workers > 1 and len(to_scan) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            scanned = dict(zip(to_scan, executor.map(lambda n: scan_artist(artists[n][0]), to_scan)))
+    else:
+        scanned = {name: scan_artist(artists[name][0]) for name in to_scan}
+
+    songs = {}
+    manifest = {}
+    for name in sorted(artists):
+        files = scanned[name] if name in scanned else [tuple(f) for f in cached[name]["files"]]
+        songs[name] = files
+        manifest[name] = {"mtime_ns": artists[name][1], "files": files}
+
+    if manifest_file:
+        save_manifest(manifest_file, output_path, manifest)
+    return songs, len(to_scan)
+
+
+def collect_from_store(store_path):
+    """Même résultat que collect_from_folders, lu dans l'index du store (aucun shard ouvert)."""
+    store = SongStore(store_path)
+    songs = {}
+    for artist, name, size in store.entries():
+        songs.setdefault(artist, []).append((name + ".txt", size))
+    store.close()
+    return songs
+
+
+def compute_stats(songs):
+    """Agrège {artiste: [(fichier, taille)]} en un rapport sérialisable en JSON."""
     artist_stats = []
     total_files = 0
     total_size = 0
     empty_dirs = []
     small_files = []
 
-    for artist_dir in sorted(output_path.iterdir()):
-        if not artist_dir.is_dir():
-            continue
-
-        txt_files = list(artist_dir.glob("*.txt"))
-        count = len(txt_files)
-        size = sum(f.stat().st_size for f in txt_files)
+    for artist, files in songs.items():
+        count = len(files)
+        size = sum(s for _, s in files)
 
         artist_stats.append({
-            "name": artist_dir.name,
+            "name": artist,
             "count": count,
             "size": size
         })
@@ -49,18 +129,43 @@ def analyze_output(output_dir="output"):
         total_size += size
 
         if count == 0:
-            empty_dirs.append(artist_dir.name)
+            empty_dirs.append(artist)
 
         # Détecter les fichiers très petits (< 100 octets)
-        for f in txt_files:
-            if f.stat().st_size < 100:
-                small_files.append(f"{artist_dir.name}/{f.name}")
+        for name, s in files:
+            if s < 100:
+                small_files.append(f"{artist}/{name}")
 
     # Tri par nombre de chansons
     artist_stats.sort(key=lambda x: x["count"], reverse=True)
 
+    distribution = {}
+    for low, high, label in DISTRIBUTION:
+        distribution[label] = sum(
+            1 for a in artist_stats if a["count"] >= low and (high is None or a["count"] <= high)
+        )
+    distribution["0"] = len(empty_dirs)
+
+    return {
+        "artists": len(artist_stats),
+        "songs": total_files,
+        "total_size": total_size,
+        "artist_stats": artist_stats,
+        "distribution": distribution,
+        "empty_dirs": empty_dirs,
+        "small_files": small_files,
+    }
+
+
+def print_report(stats):
+    artist_stats = stats["artist_stats"]
+    total_files = stats["songs"]
+    total_size = stats["total_size"]
+    empty_dirs = stats["empty_dirs"]
+    small_files = stats["small_files"]
+
     # Affichage
-    print(f"\n📁 Nombre d'artistes : {len(artist_stats)}")
+    print(f"\n📁 Nombre d'artistes : {stats['artists']}")
     print(f"🎵 Nombre de chansons : {total_files:,}")
     print(f"💾 Taille totale      : {total_size / 1024 / 1024:.2f} MB")
 
@@ -77,24 +182,12 @@ def analyze_output(output_dir="output"):
 
     # Distribution
     print(f"\n📈 Distribution :")
-    ranges = [
-        (100, "100+"),
-        (50, "50-99"),
-        (20, "20-49"),
-        (10, "10-19"),
-        (5, "5-9"),
-        (1, "1-4"),
-    ]
-    for min_count, label in ranges:
-        if label.endswith("+"):
-            n = sum(1 for a in artist_stats if a["count"] >= min_count)
-        else:
-            low, high = map(int, label.split("-"))
-            n = sum(1 for a in artist_stats if low <= a["count"] <= high)
+    for _, _, label in DISTRIBUTION:
+        n = stats["distribution"][label]
         bar = "█" * (n // 2)
         print(f"  {label:>8} chansons : {n:4d} artistes {bar}")
 
-    zero = sum(1 for a in artist_stats if a["count"] == 0)
+    zero = stats["distribution"]["0"]
     print(f"  {'0':>8} chansons : {zero:4d} artistes (dossiers vides)")
 
     # Alertes
@@ -112,6 +205,51 @@ def analyze_output(output_dir="output"):
         if len(small_files) > 10:
             print(f"    ... et {len(small_files) - 10} autres")
 
+
+def analyze_output(output_dir="output", store=None, workers=1,
+                   manifest_file="stats_manifest.json", as_json=False):
+    """Analyse le dossier de sortie (ou le store) et affiche les statistiques.
+
+    `manifest_file` : cache des dossiers déjà lus (None pour tout relire).
+    `as_json` : écrit le rapport complet en JSON sur la sortie standard
+    (pour le monitoring) au lieu du rapport lisible.
+    """
+
+    output_path = Path(store or output_dir)
+
+    if not output_path.exists() or (store and not is_store(store)):
+        if as_json:
+            print(json.dumps({"error": f"{output_path} introuvable"}))
+            return
+        print(f"❌ {'Store' if store else 'Dossier'} {output_path} introuvable !")
+        print("💡 Exécutez d'abord : python3 02_scrape_lyrics.py")
+        return
+
+    if not as_json:
+        print("=" * 70)
+        print("📊 STATISTIQUES DU SCRAPING")
+        print(f"   {'Store' if store else 'Dossier'} : {output_path.resolve()}")
+        print("=" * 70)
+
+    if store:
+        songs = collect_from_store(output_path)
+        rescanned = None
+    else:
+        songs, rescanned = collect_from_folders(output_path, workers, manifest_file)
+
+    stats = compute_stats(songs)
+
+    if as_json:
+        stats["source"] = str(output_path.resolve())
+        stats["rescanned_dirs"] = rescanned
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return
+
+    if rescanned is not None:
+        print(f"🔎 Dossiers relus : {rescanned}/{len(songs)} (les autres viennent du manifeste)")
+
+    print_report(stats)
+
     print("\n" + "=" * 70)
     print("✅ Analyse terminée !")
     print("=" * 70)
@@ -125,6 +263,32 @@ if __name__ == "__main__":
         "--output", type=str, default="output",
         help="Dossier de sortie à analyser (défaut: output/)"
     )
+    parser.add_argument(
+        "--store", type=str, default=None,
+        help="Analyse ce store de chansons (song_store.py) au lieu du dossier"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8,
+        help="Dossiers artiste lus en parallèle (défaut: 8)"
+    )
+    parser.add_argument(
+        "--manifest", type=str, default="stats_manifest.json",
+        help="Cache des dossiers déjà analysés (défaut: stats_manifest.json)"
+    )
+    parser.add_argument(
+        "--no-manifest", action="store_true",
+        help="Relit tous les dossiers sans utiliser ni écrire le manifeste"
+    )
+    parser.add_argument(
+        "--json", action="store_true",
+        help="Rapport complet en JSON sur la sortie standard"
+    )
     args = parser.parse_args()
 
-    analyze_output(output_dir=args.output)
+    analyze_output(
+        output_dir=args.output,
+        store=args.store,
+        workers=args.workers,
+        manifest_file=None if args.no_manifest else args.manifest,
+        as_json=args.json
+    )
@@ -2,68 +2,171 @@
 # -*- coding: utf-8 -*-
 """
 Phase 4 : Fusion du Corpus
-Regroupe tous les fichiers .txt individuels en un seul grand fichier texte
-prêt pour l'entraînement d'un modèle NLP.
+Regroupe tous les fichiers .txt individuels (ou les shards d'un store, ou le
+bundle JSON) en un seul grand fichier texte prêt pour l'entraînement d'un
+modèle NLP.
+
+Les fichiers sont lus par un pool de threads borné (utile sur Drive où
+chaque ouverture attend le réseau) mais écrits dans l'ordre trié habituel :
+la sortie est identique à une lecture séquentielle.
 """
 
+import os
+import gzip
+import json
 import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def merge_corpus(output_dir="output", final_file="malagasy_lyrics_corpus.txt", raw_only=True):
+try:
+    import zstandard  # Optionnel : sortie .zst
+except ImportError:
+    zstandard = None
+
+from song_store import SongStore, is_store
+
+
+# Tampon d'écriture de la sortie
+WRITE_BUFFER = 8 * 1024 * 1024
+
+
+def read_song(path):
+    """(nom, contenu, erreur) d'un fichier chanson ; appelé dans le pool de threads."""
+    try:
+        with open(path, "r", encoding="utf-8") as infile:
+            return os.path.basename(path), infile.read(), None
+    except Exception as e:
+        return os.path.basename(path), None, e
+
+
+def iter_song_paths(output_path):
+    """Chemins de output/<artiste>/*.txt, artistes et fichiers triés par nom."""
+    with os.scandir(output_path) as it:
+        artists = sorted(e.path for e in it if e.is_dir())
+    for artist_path in artists:
+        with os.scandir(artist_path) as it:
+            yield from sorted(e.path for e in it if e.name.endswith(".txt") and e.is_file())
+
+
+def iter_folder_songs(output_path, workers=8):
+    """(nom, contenu) de chaque output/<artiste>/*.txt, dans l'ordre trié.
+
+    Au plus 4 × workers lectures sont en vol ; les résultats sont rendus
+    dans l'ordre de soumission.
+    """
+    paths = iter_song_paths(output_path)
+    if workers <= 1:
+        results = map(read_song, paths)
+    else:
+        results = _ordered_pool(read_song, paths, workers)
+    for name, content, error in results:
+        if error is not None:
+            print(f"   ⚠️ Erreur sur {name} : {error}")
+            continue
+        yield name, content
+
+
+def _ordered_pool(fn, items, workers):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= 4 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_store_songs(store_path):
+    """(nom, contenu) de chaque chanson du store, lue séquentiellement shard par shard."""
+    store = SongStore(store_path)
+    try:
+        for song in store.iter_songs():
+            yield song["name"] + ".txt", song["content"]
+    finally:
+        store.close()
+
+
+def iter_bundle_songs(bundle_path):
+    """(nom, contenu) de chaque chanson du bundle JSON de 13_bundle_songs.py (contenu déjà strippé)."""
+    with open(bundle_path, "r", encoding="utf-8") as f:
+        songs = json.load(f)
+    for song in songs:
+        yield song["title"] + ".txt", song["content"]
+
+
+def open_output(final_path):
+    """Fichier texte de sortie, compressé selon l'extension (.gz, .zst)."""
+    if final_path.suffix == ".gz":
+        return gzip.open(final_path, "wt", encoding="utf-8", compresslevel=6)
+    if final_path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError("La sortie .zst nécessite zstandard : pip install zstandard")
+        return zstandard.open(final_path, "wt", cctx=zstandard.ZstdCompressor(level=10),
+                              encoding="utf-8")
+    return open(final_path, "w", encoding="utf-8", buffering=WRITE_BUFFER)
+
+
+def merge_corpus(output_dir="output", final_file="malagasy_lyrics_corpus.txt", raw_only=True,
+                 store=None, bundle=None, workers=8):
     """
     Parcourt le dossier output et fusionne tous les fichiers texte.
-    
+
     Args:
         output_dir: Dossier contenant les dossiers d'artistes.
-        final_file: Nom du fichier final de sortie.
+        final_file: Nom du fichier final de sortie (.gz ou .zst pour compresser).
         raw_only: Si True, ne garde que les paroles (enlève Titre/Artiste/Source).
+        store: Dossier d'un store en shards à lire à la place de output_dir
+            (chansons dans l'ordre du crawl).
+        bundle: Bundle JSON (13_bundle_songs.py) à lire à la place de output_dir.
+        workers: Threads de lecture des fichiers du dossier (1 = séquentiel).
     """
-    output_path = Path(output_dir)
+    output_path = Path(bundle or store or output_dir)
     final_path = Path(final_file)
+    kind = "Bundle" if bundle else "Store" if store else "Dossier"
 
-    if not output_path.exists():
-        print(f"❌ Dossier {output_dir} introuvable !")
+    if not output_path.exists() or (store and not is_store(store)):
+        print(f"❌ {kind} {output_path} introuvable !")
+        return
+
+    if final_path.suffix == ".zst" and zstandard is None:
+        print("❌ La sortie .zst nécessite zstandard : pip install zstandard")
         return
 
     print("=" * 70)
     print("🚀 FUSION DU CORPUS")
-    print(f"   Source : {output_path.resolve()}")
+    print(f"   Source : {output_path.resolve()} ({kind.lower()})")
     print(f"   Destination : {final_path.resolve()}")
     print("=" * 70)
 
+    if bundle:
+        songs = iter_bundle_songs(output_path)
+    elif store:
+        songs = iter_store_songs(output_path)
+    else:
+        songs = iter_folder_songs(output_path, workers)
+
     count = 0
-    with open(final_path, "w", encoding="utf-8") as outfile:
-        # On parcourt les dossiers d'artistes (triés par nom)
-        for artist_dir in sorted(output_path.iterdir()):
-            if not artist_dir.is_dir():
-                continue
-            
-            # On parcourt les fichiers .txt de l'artiste
-            for txt_file in sorted(artist_dir.glob("*.txt")):
-                try:
-                    with open(txt_file, "r", encoding="utf-8") as infile:
-                        content = infile.read()
-                        
-                        if raw_only:
-                            # On sépare les paroles du header (séparé par ---)
-                            parts = content.split("---", 1)
-                            if len(parts) > 1:
-                                lyrics = parts[1].strip()
-                            else:
-                                lyrics = content.strip()
-                            
-                            if lyrics:
-                                outfile.write(lyrics + "\n\n")
-                        else:
-                            # On garde tout, incluant les métadonnées
-                            outfile.write(content + "\n\n" + "="*30 + "\n\n")
-                        
-                        count += 1
-                        if count % 500 == 0:
-                            print(f"   🔄 {count} chansons traitées...")
-                            
-                except Exception as e:
-                    print(f"   ⚠️ Erreur sur {txt_file.name} : {e}")
+    with open_output(final_path) as outfile:
+        for name, content in songs:
+            if raw_only:
+                # On sépare les paroles du header (séparé par ---)
+                parts = content.split("---", 1)
+                if len(parts) > 1:
+                    lyrics = parts[1].strip()
+                else:
+                    lyrics = content.strip()
+
+                if lyrics:
+                    outfile.write(lyrics + "\n\n")
+            else:
+                # On garde tout, incluant les métadonnées
+                outfile.write(content + "\n\n" + "="*30 + "\n\n")
+
+            count += 1
+            if count % 500 == 0:
+                print(f"   🔄 {count} chansons traitées...")
 
     print("=" * 70)
     print(f"✅ TERMINÉ !")
@@ -74,10 +177,14 @@ def merge_corpus(output_dir="output", final_file="malagasy_lyrics_corpus.txt", r
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Phase 4 : Fusion du corpus Malagasy")
     parser.add_argument("--output", type=str, default="output", help="Dossier d'entrée (défaut: output)")
-    parser.add_argument("--final", type=str, default="malagasy_lyrics_corpus.txt", help="Nom du fichier final")
+    parser.add_argument("--final", type=str, default="malagasy_lyrics_corpus.txt", help="Nom du fichier final (.gz / .zst pour compresser)")
     parser.add_argument("--metadata", action="store_true", help="Garder les métadonnées (Titre/Artiste) dans le fichier final")
-    
+    parser.add_argument("--store", type=str, default=None, help="Lire ce store de chansons (song_store.py) au lieu du dossier")
+    parser.add_argument("--bundle", type=str, default=None, help="Lire ce bundle JSON (13_bundle_songs.py) au lieu du dossier")
+    parser.add_argument("--workers", type=int, default=8, help="Threads de lecture des fichiers (défaut: 8)")
+
     args = parser.parse_args()
-    
+
     # Par défaut, on ne garde que les paroles pour le NLP (raw_only=True)
-    merge_corpus(output_dir=args.output, final_file=args.final, raw_only=not args.metadata)
+    merge_corpus(output_dir=args.output, final_file=args.final, raw_only=not args.metadata,
+                 store=args.store, bundle=args.bundle, workers=args.workers)
@@ -3,12 +3,24 @@
 """
 Phase 5 : Nettoyage et Purification du Corpus
 Filtre les phrases non-malgaches (Français, Anglais) et normalise le texte.
+
+Le corpus est lu en flux, bloc par bloc, et les blocs sont filtrés par
+paquets dans un pool de processus. La mémoire reste bornée (quelques
+paquets en vol) et la sortie est écrite dans l'ordre d'origine, identique
+à un traitement séquentiel.
 """
 
+import os
 import argparse
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from near_dedup import iter_blocks
+
+STAT_KEYS = ("total_blocks", "kept_mg", "removed_fr", "removed_en", "removed_unknown")
+
 # Listes de mots outils pour la détection de langue
 MG_STOPWORDS = {
     "ny", "dia", "no", "sy", "ao", "eo", "tao", "teo", "koa", "raha", "fa", "nefa", 
@@ -57,10 +69,54 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text)
     return text.strip()
 
-def process_corpus(input_file, output_file, threshold=0.1):
+def iter_batches(blocks, batch_size):
+    batch = []
+    for block in blocks:
+        batch.append(block)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def filter_blocks(blocks):
+    """Filtre un paquet de blocs : retourne (texte à écrire, compteurs du paquet)."""
+    stats = dict.fromkeys(STAT_KEYS, 0)
+    stats["total_blocks"] = len(blocks)
+    out = []
+
+    for block in blocks:
+        if not block.strip():
+            continue
+
+        lang = detect_language_simple(block)
+
+        if lang == 'mg':
+            cleaned = clean_text(block)
+            if len(cleaned) > 20: # Filtrer les phrases trop courtes
+                out.append(cleaned + "\n\n")
+                stats["kept_mg"] += 1
+            else:
+                stats["removed_unknown"] += 1
+        elif lang == 'fr':
+            stats["removed_fr"] += 1
+        elif lang == 'en':
+            stats["removed_en"] += 1
+        else:
+            stats["removed_unknown"] += 1
+
+    return "".join(out), stats
+
+
+def process_corpus(input_file, output_file, threshold=0.1, workers=None, batch_size=2000):
     """
     Traite le corpus pour ne garder que le malgache.
     Traite bloc par bloc (séparés par \n\n).
+
+    Les blocs partent par paquets de `batch_size` dans `workers` processus
+    (tous les cœurs par défaut, 1 = séquentiel sans pool). Au plus
+    2 × workers paquets sont en vol ; les résultats sont écrits dans l'ordre.
     """
     input_path = Path(input_file)
     output_path = Path(output_file)
@@ -69,41 +125,41 @@ def process_corpus(input_file, output_file, threshold=0.1):
         print(f"❌ Fichier d'entrée {input_file} introuvable !")
         return
 
+    workers = workers or os.cpu_count() or 1
+
     print("=" * 70)
     print("🧹 PURIFICATION DU CORPUS")
     print(f"   Entrée : {input_file}")
     print(f"   Sortie : {output_file}")
+    print(f"   Processus : {workers} (paquets de {batch_size} blocs)")
     print("=" * 70)
 
-    stats = {"total_blocks": 0, "kept_mg": 0, "removed_fr": 0, "removed_en": 0, "removed_unknown": 0}
+    stats = dict.fromkeys(STAT_KEYS, 0)
+
+    def write_result(result):
+        text, batch_stats = result
+        fout.write(text)
+        for key, value in batch_stats.items():
+            stats[key] += value
 
     with open(input_path, "r", encoding="utf-8") as fin, \
          open(output_path, "w", encoding="utf-8") as fout:
-        
+
         # On lit par blocs séparés par une ligne vide (une chanson dans notre corpus fusionné)
-        content = fin.read()
-        blocks = content.split("\n\n")
-        stats["total_blocks"] = len(blocks)
-
-        for block in blocks:
-            if not block.strip():
-                continue
-            
-            lang = detect_language_simple(block)
-            
-            if lang == 'mg':
-                cleaned = clean_text(block)
-                if len(cleaned) > 20: # Filtrer les phrases trop courtes
-                    fout.write(cleaned + "\n\n")
-                    stats["kept_mg"] += 1
-                else:
-                    stats["removed_unknown"] += 1
-            elif lang == 'fr':
-                stats["removed_fr"] += 1
-            elif lang == 'en':
-                stats["removed_en"] += 1
-            else:
-                stats["removed_unknown"] += 1
+        batches = iter_batches(iter_blocks(fin), batch_size)
+
+        if workers == 1:
+            for batch in batches:
+                write_result(filter_blocks(batch))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for batch in batches:
+                    pending.append(executor.submit(filter_blocks, batch))
+                    if len(pending) >= 2 * workers:
+                        write_result(pending.popleft().result())
+                while pending:
+                    write_result(pending.popleft().result())
 
     print(f"📊 RÉSULTATS :")
     print(f"   Total blocs analysés : {stats['total_blocks']}")
@@ -117,6 +173,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Phase 5 : Purification du corpus")
     parser.add_argument("--input", type=str, default="malagasy_lyrics_corpus.txt", help="Fichier brut")
     parser.add_argument("--output", type=str, default="malagasy_lyrics_cleaned.txt", help="Fichier propre")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus (défaut: tous les cœurs, 1 = séquentiel)")
+    parser.add_argument("--batch-size", type=int, default=2000, help="Blocs par paquet envoyé aux processus (défaut: 2000)")
     
     args = parser.parse_args()
-    process_corpus(args.input, args.output)
+    process_corpus(args.input, args.output, workers=args.workers, batch_size=args.batch_size)
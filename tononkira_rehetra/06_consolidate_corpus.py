@@ -2,7 +2,82 @@ import os
 import json
 import argparse
 
-def consolidate_corpus(lyrics_path, bible_dir, wiki_path, output_path, deduplicate=True):
+from digest_set import DigestSet
+from near_dedup import near_dedup_file
+from script_tools import load_script
+
+def iter_wiki_file(wiki_path):
+    """(titre, paragraphe) du fichier texte écrit par 11_extract_wiki.py."""
+    title = None
+    with open(wiki_path, 'r', encoding='utf-8') as f_wiki:
+        # On traite par paragraphes
+        for line in f_wiki:
+            clean_line = line.strip()
+            # On ignore les lignes vides et les lignes de titre
+            if clean_line.startswith("--- "):
+                if clean_line.endswith(" ---"):
+                    title = clean_line[4:-4]
+                continue
+            if clean_line:
+                yield title, clean_line
+
+def iter_wiki_source(wiki_path, wiki_index=None, workers=None):
+    """Paragraphes Wikipedia : extraits à la volée d'un dump .bz2 (sans fichier
+    intermédiaire) ou relus depuis le texte déjà extrait."""
+    if wiki_path.endswith(".bz2"):
+        phase11 = load_script("11_extract_wiki.py", "extract_wiki")
+        return phase11.iter_wiki_paragraphs(wiki_path, index_path=wiki_index, workers=workers)
+    return iter_wiki_file(wiki_path)
+
+def iter_lyrics_blocks(lyrics_path):
+    """Blocs non vides (strippés) des lyrics nettoyés, séparés par une ligne vide."""
+    with open(lyrics_path, 'r', encoding='utf-8') as f_in:
+        content = f_in.read()
+    for block in content.split("\n\n"):
+        clean_b = block.strip()
+        if clean_b:
+            yield clean_b
+
+def iter_bible_verses(bible_dir):
+    """Versets non vides (strippés) des JSON de la Bible, Ancien puis Nouveau Testament."""
+    for root_dir in ['old_testament', 'new_testament']:
+        full_bible_path = os.path.join(bible_dir, root_dir)
+        if not os.path.exists(full_bible_path): continue
+        for filename in sorted(os.listdir(full_bible_path)):
+            if filename.endswith('.json'):
+                file_path = os.path.join(full_bible_path, filename)
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f_json:
+                        data = json.load(f_json)
+                except Exception as e:
+                    print(f"   ❌ Erreur sur {filename}: {e}")
+                    continue
+                for key, chapter in data.items():
+                    if key == "meta" or not isinstance(chapter, dict): continue
+                    for v_key, verse_text in chapter.items():
+                        if isinstance(verse_text, str):
+                            clean_text = verse_text.strip()
+                            if clean_text:
+                                yield clean_text
+
+def consolidate_corpus(lyrics_path, bible_dir, wiki_path, output_path, deduplicate=True,
+                       digest_size=8, memory_budget_mb=512, near_dedup=False,
+                       near_threshold=0.8, num_perm=64, shingle_size=5, workers=None,
+                       wiki_index=None):
+    """Fusionne lyrics, Bible et Wikipedia en un seul corpus.
+
+    Le dédoublonnage garde des empreintes blake2b de `digest_size` octets
+    (digest_set.py) au lieu des textes ; au-delà de `memory_budget_mb` MB,
+    les empreintes débordent dans une base SQLite temporaire.
+
+    `near_dedup` : retire ensuite les quasi-doublons (MinHash + LSH, cf.
+    near_dedup.py) dont la similarité de Jaccard atteint `near_threshold`.
+
+    `wiki_path` : texte extrait par 11_extract_wiki.py, ou directement le
+    dump .xml.bz2 ; les paragraphes sont alors extraits (dans `workers`
+    processus pour un dump multistream, index `wiki_index`) et dédoublonnés
+    au fil de l'eau, sans fichier texte intermédiaire.
+    """
     print("======================================================================")
     print("📚 CONSOLIDATION DU CORPUS FINAL (Lyrics + Bible + Wikipedia)")
     print(f"   Lyrics       : {lyrics_path}")
@@ -10,85 +85,71 @@ def consolidate_corpus(lyrics_path, bible_dir, wiki_path, output_path, deduplica
     print(f"   Wikipedia    : {wiki_path}")
     print(f"   Sortie       : {output_path}")
     print(f"   Dédoublonage : {'OUI' if deduplicate else 'NON'}")
+    if deduplicate:
+        print(f"   Empreintes   : blake2b {digest_size} octets, budget {memory_budget_mb} MB")
     print("======================================================================")
 
     total_blocks = 0
-    seen_blocks = set() if deduplicate else None
+    seen_blocks = DigestSet(digest_size, memory_budget_mb * 1024 * 1024,
+                            spill_path=f"{output_path}.dedup.sqlite") if deduplicate else None
     
-    with open(output_path, 'w', encoding='utf-8') as f_out:
-        # 1. Charger les Lyrics nettoyés
-        if os.path.exists(lyrics_path):
-            print("📖 Chargement des lyrics nettoyés...")
-            with open(lyrics_path, 'r', encoding='utf-8') as f_in:
-                content = f_in.read()
-                blocks = content.split("\n\n")
+    try:
+        with open(output_path, 'w', encoding='utf-8') as f_out:
+            # 1. Charger les Lyrics nettoyés
+            if os.path.exists(lyrics_path):
+                print("📖 Chargement des lyrics nettoyés...")
                 added = 0
-                for block in blocks:
-                    clean_b = block.strip()
-                    if not clean_b: continue
-                    if deduplicate:
-                        if clean_b in seen_blocks: continue
-                        seen_blocks.add(clean_b)
+                for clean_b in iter_lyrics_blocks(lyrics_path):
+                    if deduplicate and not seen_blocks.add(clean_b): continue
                     f_out.write(clean_b + "\n\n")
                     added += 1
                     total_blocks += 1
-            print(f"   ✅ {added} blocs de lyrics uniques ajoutés.")
-
-        # 2. Charger la Bible
-        bible_blocks = 0
-        print("📖 Chargement de la Bible...")
-        for root_dir in ['old_testament', 'new_testament']:
-            full_bible_path = os.path.join(bible_dir, root_dir)
-            if not os.path.exists(full_bible_path): continue
-            for filename in sorted(os.listdir(full_bible_path)):
-                if filename.endswith('.json'):
-                    file_path = os.path.join(full_bible_path, filename)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f_json:
-                            data = json.load(f_json)
-                            for key, chapter in data.items():
-                                if key == "meta" or not isinstance(chapter, dict): continue
-                                for v_key, verse_text in chapter.items():
-                                    if isinstance(verse_text, str):
-                                        clean_text = verse_text.strip()
-                                        if clean_text:
-                                            if deduplicate:
-                                                if clean_text in seen_blocks: continue
-                                                seen_blocks.add(clean_text)
-                                            f_out.write(clean_text + "\n\n")
-                                            bible_blocks += 1
-                                            total_blocks += 1
-                    except Exception as e:
-                        print(f"   ❌ Erreur sur {filename}: {e}")
-        print(f"   ✅ {bible_blocks} versets de la Bible ajoutés.")
-
-        # 3. Charger Wikipedia
-        if os.path.exists(wiki_path):
-            print("📖 Chargement de Wikipedia Malagasy...")
-            wiki_added = 0
-            with open(wiki_path, 'r', encoding='utf-8') as f_wiki:
-                # On traite par paragraphes
-                for line in f_wiki:
-                    clean_line = line.strip()
-                    # On ignore les lignes vides et les lignes de titre
-                    if not clean_line or clean_line.startswith("--- "):
+                print(f"   ✅ {added} blocs de lyrics uniques ajoutés.")
+
+            # 2. Charger la Bible
+            bible_blocks = 0
+            print("📖 Chargement de la Bible...")
+            for clean_text in iter_bible_verses(bible_dir):
+                if deduplicate and not seen_blocks.add(clean_text): continue
+                f_out.write(clean_text + "\n\n")
+                bible_blocks += 1
+                total_blocks += 1
+            print(f"   ✅ {bible_blocks} versets de la Bible ajoutés.")
+
+            # 3. Charger Wikipedia
+            if os.path.exists(wiki_path):
+                print("📖 Chargement de Wikipedia Malagasy...")
+                wiki_added = 0
+                for title, paragraph in iter_wiki_source(wiki_path, wiki_index, workers):
+                    if deduplicate and not seen_blocks.add(paragraph):
                         continue
-                    
-                    if deduplicate:
-                        if clean_line in seen_blocks:
-                            continue
-                        seen_blocks.add(clean_line)
-                    
-                    f_out.write(clean_line + "\n\n")
+
+                    f_out.write(paragraph + "\n\n")
                     wiki_added += 1
                     total_blocks += 1
-            print(f"   ✅ {wiki_added} paragraphes Wikipedia ajoutés.")
-        else:
-            print(f"   ⚠️ Wikipedia ({wiki_path}) non trouvé. Saut de l'étape.")
+                print(f"   ✅ {wiki_added} paragraphes Wikipedia ajoutés.")
+            else:
+                print(f"   ⚠️ Wikipedia ({wiki_path}) non trouvé. Saut de l'étape.")
+    finally:
+        # Base de débordement supprimée même si la consolidation échoue
+        if seen_blocks is not None:
+            seen_blocks.close()
 
     print("======================================================================")
     print(f"🚀 CONSOLIDATION TERMINÉE !")
     print(f"📊 Total blocs UNIQUES dans le corpus : {total_blocks}")
+    if deduplicate:
+        print(f"🔁 Doublons supprimés : {seen_blocks.duplicates}")
+        print(f"🧮 Mémoire empreintes : {seen_blocks.memory_bytes() / 1024 / 1024:.1f} MB"
+              + (f", {seen_blocks.spilled} déversées sur disque ({seen_blocks.spills} fois)"
+                 if seen_blocks.spills else ""))
+        print(f"🎲 Collisions attendues : {seen_blocks.expected_collisions():.2e} "
+              f"(blocs distincts pris à tort pour des doublons)")
+    if near_dedup:
+        near_stats = near_dedup_file(output_path, threshold=near_threshold, num_perm=num_perm,
+                                     shingle_size=shingle_size, workers=workers)
+        if near_stats:
+            print(f"📊 Total blocs après quasi-doublons : {total_blocks - near_stats['removed']}")
     print(f"💾 Fichier sauvegardé : {output_path}")
     print("======================================================================")
 
@@ -96,9 +157,22 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Consolide les différentes sources de texte.')
     parser.add_argument('--lyrics', type=str, default='malagasy_lyrics_cleaned.txt', help='Lyrics nettoyés')
     parser.add_argument('--bible', type=str, default='../from_bible_json', help='Dossier Bible')
-    parser.add_argument('--wiki', type=str, default='../malagasy_wikipedia_raw.txt', help='Wikipedia extrait')
+    parser.add_argument('--wiki', type=str, default='../malagasy_wikipedia_raw.txt', help='Wikipedia extrait, ou le dump .xml.bz2 pour extraire à la volée')
+    parser.add_argument('--wiki-index', type=str, default=None, help='Index du dump multistream (défaut: <dump>-index.txt.bz2 s\'il existe)')
     parser.add_argument('--output', type=str, default='malagasy_corpus_v2_final.txt', help='Fichier de sortie')
     parser.add_argument('--no-dedup', action='store_true', help='Désactive le dédoublonage')
+    parser.add_argument('--digest-size', type=int, default=8, choices=[8, 16], help='Taille des empreintes blake2b en octets (défaut: 8)')
+    parser.add_argument('--dedup-memory', type=int, default=512, help='Budget mémoire des empreintes en MB avant débordement sur disque (défaut: 512)')
+
+    parser.add_argument('--near-dedup', action='store_true', help='Retire aussi les quasi-doublons (MinHash + LSH, nécessite numpy)')
+    parser.add_argument('--near-threshold', type=float, default=0.8, help='Similarité de Jaccard des quasi-doublons (défaut: 0.8)')
+    parser.add_argument('--num-perm', type=int, default=64, help='Permutations MinHash (défaut: 64)')
+    parser.add_argument('--shingle-size', type=int, default=5, help='Taille des shingles en caractères (défaut: 5)')
+    parser.add_argument('--workers', type=int, default=None, help='Processus pour l\'extraction du dump et les signatures MinHash (défaut: tous les cœurs)')
 
     args = parser.parse_args()
-    consolidate_corpus(args.lyrics, args.bible, args.wiki, args.output, deduplicate=not args.no_dedup)
+    consolidate_corpus(args.lyrics, args.bible, args.wiki, args.output, deduplicate=not args.no_dedup,
+                       digest_size=args.digest_size, memory_budget_mb=args.dedup_memory,
+                       near_dedup=args.near_dedup, near_threshold=args.near_threshold,
+                       num_perm=args.num_perm, shingle_size=args.shingle_size, workers=args.workers,
+                       wiki_index=args.wiki_index)
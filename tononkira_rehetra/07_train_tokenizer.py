@@ -1,21 +1,66 @@
 import os
+import json
+import random
 import argparse
+from itertools import islice
 from tokenizers import Tokenizer
 from tokenizers.models import BPE
 from tokenizers.trainers import BpeTrainer
 from tokenizers.pre_tokenizers import Whitespace
 
-def train_tokenizer(corpus_path, output_dir, vocab_size=30000):
-    print("======================================================================")
-    print("🧠 ENTRAÎNEMENT DU TOKENIZER (BPE - Morphologie Malgache)")
-    print(f"   Corpus : {corpus_path}")
-    print(f"   Vocab  : {vocab_size} mots/sous-mots")
-    print("======================================================================")
+from script_tools import load_script, measured
 
-    if not os.path.exists(corpus_path):
-        print(f"❌ Erreur : Le fichier {corpus_path} est introuvable.")
+# ============================================================
+# Textes d'entraînement en flux
+# ============================================================
+
+def iter_shard(path):
+    """Textes d'un shard : lignes non vides d'un fichier texte, ou paragraphes
+    d'un dump Wikipédia .bz2 extraits à la volée (11_extract_wiki.py)."""
+    if path.endswith(".bz2"):
+        for _, paragraph in load_script("11_extract_wiki.py", "extract_wiki").iter_wiki_paragraphs(path):
+            yield paragraph
         return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+def iter_texts(shards, bible_dir=None, sample=1.0, seed=42):
+    """Textes de tous les shards puis des versets de la Bible, sans fichier
+    intermédiaire. `sample` < 1 garde chaque texte avec cette probabilité
+    (tirage reproductible par `seed`)."""
+    def sources():
+        for path in shards:
+            yield from iter_shard(path)
+        if bible_dir:
+            consolidate = load_script("06_consolidate_corpus.py", "consolidate_corpus")
+            yield from consolidate.iter_bible_verses(bible_dir)
 
+    if sample >= 1.0:
+        yield from sources()
+        return
+    rng = random.Random(seed)
+    for text in sources():
+        if rng.random() < sample:
+            yield text
+
+def iter_batches(texts, batch_size):
+    """Listes de `batch_size` textes pour train_from_iterator."""
+    texts = iter(texts)
+    while True:
+        batch = list(islice(texts, batch_size))
+        if not batch:
+            return
+        yield batch
+
+# ============================================================
+# Entraînement
+# ============================================================
+
+def train_one(shards, bible_dir, output_path, vocab_size, batch_size, sample, seed, min_frequency):
+    """Entraîne et sauvegarde un tokenizer BPE ; retourne le nombre de textes vus."""
     # 1. Initialiser le modèle BPE
     tokenizer = Tokenizer(BPE(unk_token="[UNK]"))
     tokenizer.pre_tokenizer = Whitespace()
@@ -23,30 +68,89 @@ def train_tokenizer(corpus_path, output_dir, vocab_size=30000):
     # 2. Configurer l'entraîneur (Trainer)
     trainer = BpeTrainer(
         vocab_size=vocab_size,
-        min_frequency=2,
+        min_frequency=min_frequency,
         show_progress=True,
         special_tokens=["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
     )
 
-    # 3. Entraîner sur le corpus
-    print("📖 Apprentissage des patterns linguistiques...")
-    tokenizer.train(files=[corpus_path], trainer=trainer)
+    # 3. Entraîner sur les textes, lus en flux par paquets
+    seen = [0]
+    def counted(batches):
+        for batch in batches:
+            seen[0] += len(batch)
+            yield batch
+    batches = iter_batches(iter_texts(shards, bible_dir, sample, seed), batch_size)
+    tokenizer.train_from_iterator(counted(batches), trainer=trainer)
 
     # 4. Sauvegarder
+    tokenizer.save(output_path)
+    return seen[0]
+
+def tokenizer_filename(vocab_size, several):
+    return f"tokenizer-mg-{vocab_size}.json" if several else "tokenizer-mg.json"
+
+def train_tokenizer(corpus_paths, output_dir, vocab_sizes=(30000,), bible_dir=None,
+                    batch_size=1000, sample=1.0, seed=42, min_frequency=2):
+    """Entraîne un tokenizer BPE par taille de vocabulaire.
+
+    `corpus_paths` : shards (fichiers texte, un texte par ligne, ou dump
+    Wikipédia .bz2) lus en flux par train_from_iterator, avec les versets
+    de `bible_dir` s'il est donné. Le temps et le pic mémoire de chaque
+    entraînement sont écrits dans <output_dir>/train_metrics.json.
+    """
+    if isinstance(corpus_paths, str):
+        corpus_paths = [corpus_paths]
+    if isinstance(vocab_sizes, int):
+        vocab_sizes = [vocab_sizes]
+
+    print("======================================================================")
+    print("🧠 ENTRAÎNEMENT DU TOKENIZER (BPE - Morphologie Malgache)")
+    for path in corpus_paths:
+        print(f"   Corpus : {path}")
+    if bible_dir:
+        print(f"   Bible  : {bible_dir}")
+    print(f"   Vocab  : {', '.join(str(v) for v in vocab_sizes)} mots/sous-mots")
+    print(f"   Flux   : paquets de {batch_size} textes, échantillon {sample:.0%}")
+    print("======================================================================")
+
+    missing = [p for p in corpus_paths + ([bible_dir] if bible_dir else []) if not os.path.exists(p)]
+    if missing:
+        print(f"❌ Erreur : Le fichier {missing[0]} est introuvable.")
+        return
+
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-    
-    tokenizer_path = os.path.join(output_dir, "tokenizer-mg.json")
-    tokenizer.save(tokenizer_path)
-    
+
+    several = len(vocab_sizes) > 1
+    metrics = []
+    for vocab_size in vocab_sizes:
+        tokenizer_path = os.path.join(output_dir, tokenizer_filename(vocab_size, several))
+        print(f"📖 Apprentissage des patterns linguistiques (vocab {vocab_size})...")
+        texts, seconds, peak = measured(train_one, corpus_paths, bible_dir, tokenizer_path,
+                                        vocab_size, batch_size, sample, seed, min_frequency)
+        metrics.append({"vocab_size": vocab_size, "texts": texts, "seconds": round(seconds, 2),
+                        "peak_rss_mb": round(peak, 1), "path": tokenizer_path})
+        print(f"   ⏱️ {seconds:.1f}s, pic mémoire {peak:.0f} MB, {texts} textes")
+
+    metrics_path = os.path.join(output_dir, "train_metrics.json")
+    with open(metrics_path, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=2)
+
     print("======================================================================")
     print(f"✅ TOKENIZER ENTRAÎNÉ AVEC SUCCÈS !")
-    print(f"💾 Sauvegardé dans : {tokenizer_path}")
+    if several:
+        print(f"{'Vocab':>8} {'Textes':>10} {'Temps':>9} {'RSS max':>10}")
+        for m in metrics:
+            print(f"{m['vocab_size']:>8} {m['texts']:>10} {m['seconds']:>8.1f}s {m['peak_rss_mb']:>7.0f} MB")
+    for m in metrics:
+        print(f"💾 Sauvegardé dans : {m['path']}")
+    print(f"📊 Mesures : {metrics_path}")
     print("   Ce fichier contient maintenant l'intelligence pour découper")
     print("   les tovona (préfixes) et tovana (suffixes) malgaches.")
     print("======================================================================")
 
     # Test rapide
+    tokenizer = Tokenizer.from_file(metrics[0]["path"])
     test_text = "Ny fifankatiavana no fototry ny fiainana."
     output = tokenizer.encode(test_text)
     print(f"🔍 Test sur : '{test_text}'")
@@ -54,9 +158,18 @@ def train_tokenizer(corpus_path, output_dir, vocab_size=30000):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Entraîne un tokenizer sur le corpus malgache.')
-    parser.add_argument('--corpus', type=str, default='malagasy_corpus_v1_fixed.txt', help='Chemin vers le corpus consolidé')
+    parser.add_argument('--corpus', type=str, nargs='+', default=['malagasy_corpus_v2_final.txt'],
+                        help='Corpus consolidé, ou plusieurs shards (lyrics nettoyés, dump Wikipédia .bz2...)')
+    parser.add_argument('--bible', type=str, default=None, help='Ajoute les versets de ce dossier Bible JSON')
     parser.add_argument('--output', type=str, default='tokenizer_mg', help='Dossier de sortie')
-    parser.add_argument('--vocab', type=int, default=30000, help='Taille du vocabulaire')
+    parser.add_argument('--vocab', type=int, nargs='+', default=[30000],
+                        help='Taille(s) du vocabulaire (un tokenizer par taille)')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Textes par paquet envoyé au trainer (défaut: 1000)')
+    parser.add_argument('--sample', type=float, default=1.0, help='Fraction des textes gardés (défaut: 1.0 = tout)')
+    parser.add_argument('--seed', type=int, default=42, help='Graine de l\'échantillonnage')
+    parser.add_argument('--min-frequency', type=int, default=2, help='Fréquence minimale d\'une fusion BPE (défaut: 2)')
 
     args = parser.parse_args()
-    train_tokenizer(args.corpus, args.output, args.vocab)
+    train_tokenizer(args.corpus, args.output, args.vocab, bible_dir=args.bible,
+                    batch_size=args.batch_size, sample=args.sample, seed=args.seed,
+                    min_frequency=args.min_frequency)
@@ -1,55 +1,282 @@
 import argparse
 import os
+import json
+import time
+import shutil
 import multiprocessing
+from collections import Counter
 from gensim.models import FastText
+from gensim.models.callbacks import CallbackAny2Vec
 from gensim.models.word2vec import LineSentence
 
-def train_embeddings(corpus_path, output_dir, vector_size=100, window=5, min_count=5):
+from embedding_store import export_vectors
+from script_tools import peak_rss_mb
+
+# Longueur max d'une phrase pour gensim (LineSentence et corpus_file découpent au-delà)
+MAX_WORDS_IN_BATCH = 10000
+
+def scan_vocab(corpus_path):
+    """Compte les mots du corpus (un texte tokenisé par espaces par ligne) en une passe."""
+    counts = Counter()
+    sentences = 0
+    with open(corpus_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            words = line.split()
+            if words:
+                counts.update(words)
+                sentences += (len(words) + MAX_WORDS_IN_BATCH - 1) // MAX_WORDS_IN_BATCH
+    return {"sentences": sentences, "words": sum(counts.values()), "counts": dict(counts)}
+
+def corpus_stamp(corpus_path):
+    st = os.stat(corpus_path)
+    return {"corpus": os.path.abspath(corpus_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def load_vocab(corpus_path, cache_path):
+    """Comptes des mots du corpus, relus depuis `cache_path` s'il correspond
+    toujours au même fichier (taille, mtime), sinon recalculés et mis en cache.
+
+    Les comptes bruts (avant min_count) servent à tous les hyperparamètres :
+    un balayage ne relit pas le corpus pour construire le vocabulaire.
+    """
+    stamp = corpus_stamp(corpus_path)
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get("stamp") == stamp:
+                print(f"♻️ Vocabulaire relu depuis le cache : {cache_path}")
+                return cached
+        except (OSError, ValueError):
+            pass
+
+    print("📖 Comptage du vocabulaire (une passe sur le corpus)...")
+    vocab = scan_vocab(corpus_path)
+    vocab["stamp"] = stamp
+    if cache_path:
+        tmp = cache_path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(vocab, f, ensure_ascii=False)
+        os.replace(tmp, cache_path)
+        print(f"💾 Vocabulaire mis en cache : {cache_path}")
+    return vocab
+
+def checkpoint_name(epoch):
+    return f"epoch-{epoch:03d}"
+
+def latest_checkpoint(checkpoint_dir):
+    """(dossier, état) du dernier checkpoint complet, ou (None, None)."""
+    if not os.path.isdir(checkpoint_dir):
+        return None, None
+    names = sorted(n for n in os.listdir(checkpoint_dir)
+                   if n.startswith("epoch-") and not n.endswith(".tmp"))
+    for name in reversed(names):
+        path = os.path.join(checkpoint_dir, name)
+        try:
+            with open(os.path.join(path, "state.json"), 'r', encoding='utf-8') as f:
+                return path, json.load(f)
+        except (OSError, ValueError):
+            continue
+    return None, None
+
+class EpochCheckpoint(CallbackAny2Vec):
+    """Après chaque epoch : checkpoint atomique et une ligne de métriques JSONL.
+
+    Le checkpoint est écrit dans epoch-NNN.tmp/ puis renommé : un dossier
+    epoch-NNN/ est toujours complet (modèle + state.json). Seuls les `keep`
+    derniers sont gardés ; keep=0 désactive les checkpoints.
+    """
+
+    def __init__(self, checkpoint_dir, metrics_path, state, keep=2):
+        self.checkpoint_dir = checkpoint_dir
+        self.metrics_path = metrics_path
+        self.state = state   # epoch faite, epochs, alpha, min_alpha, elapsed, params
+        self.keep = keep
+        self.epoch_start = None
+        self.loss = 0.0
+
+    def on_epoch_begin(self, model):
+        self.epoch_start = time.time()
+
+    def on_epoch_end(self, model):
+        seconds = time.time() - self.epoch_start
+        self.state["epoch"] += 1
+        self.state["elapsed"] = round(self.state["elapsed"] + seconds, 2)
+
+        # FastText de gensim ne calcule pas de perte (reste à 0) : null dans ce cas
+        loss = model.get_latest_training_loss()
+        epoch_loss = loss - self.loss if loss else None
+        self.loss = loss
+
+        path = None
+        if self.keep > 0:
+            path = self.save(model)
+        with open(self.metrics_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                "epoch": self.state["epoch"],
+                "epochs": self.state["epochs"],
+                "seconds": round(seconds, 2),
+                "elapsed": self.state["elapsed"],
+                "words_per_sec": round(model.corpus_total_words / max(seconds, 1e-9)),
+                "peak_rss_mb": peak_rss_mb(),
+                "loss": epoch_loss,
+                "checkpoint": path,
+            }) + "\n")
+        print(f"   📍 Epoch {self.state['epoch']}/{self.state['epochs']} : {seconds:.1f}s, "
+              f"{model.corpus_total_words / max(seconds, 1e-9):,.0f} mots/s"
+              + (f", checkpoint {path}" if path else ""))
+
+    def save(self, model):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        final = os.path.join(self.checkpoint_dir, checkpoint_name(self.state["epoch"]))
+        tmp = final + ".tmp"
+        for stale in (tmp, final):
+            if os.path.exists(stale):
+                shutil.rmtree(stale)
+        os.makedirs(tmp)
+        model.save(os.path.join(tmp, "malagasy_fasttext.model"))
+        with open(os.path.join(tmp, "state.json"), 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, final)
+
+        old = sorted(n for n in os.listdir(self.checkpoint_dir)
+                     if n.startswith("epoch-") and not n.endswith(".tmp"))
+        for name in old[:-self.keep]:
+            shutil.rmtree(os.path.join(self.checkpoint_dir, name))
+        return final
+
+def train_embeddings(corpus_path, output_dir, vector_size=100, window=5, min_count=5,
+                     epochs=10, sg=1, workers=None, corpus_file=False, vocab_cache=None,
+                     resume=False, keep_checkpoints=2):
+    """Entraîne FastText sur un corpus normalisé (09_normalize_corpus.py).
+
+    `corpus_file` : gensim lit lui-même le fichier, découpé en une portion
+    par worker, sans itération Python ni GIL ; le débit suit alors le nombre
+    de cœurs. Sinon, les phrases passent par LineSentence.
+
+    Le vocabulaire vient de `vocab_cache` (par défaut <corpus>.vocab.json),
+    calculé en une passe au premier lancement.
+
+    Après chaque epoch, un checkpoint est écrit dans <output_dir>/checkpoints
+    et une ligne dans <output_dir>/train_metrics.jsonl. `resume` repart du
+    dernier checkpoint, avec le taux d'apprentissage où il s'était arrêté.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    if vocab_cache is None:
+        vocab_cache = corpus_path + ".vocab.json"
+    checkpoint_dir = os.path.join(output_dir, "checkpoints")
+    metrics_path = os.path.join(output_dir, "train_metrics.jsonl")
+    params = {"vector_size": vector_size, "window": window, "min_count": min_count, "sg": sg}
+
     print("======================================================================")
     print("🚀 ENTRAÎNEMENT DES WORD EMBEDDINGS (FastText)")
     print(f"   Corpus : {corpus_path}")
     print(f"   Dimension : {vector_size}")
     print(f"   Fenêtre   : {window}")
+    print(f"   Mode      : {'corpus_file' if corpus_file else 'LineSentence'}, {workers} workers")
     print("======================================================================")
 
     if not os.path.exists(corpus_path):
         print(f"❌ Erreur : Le fichier {corpus_path} est introuvable.")
         return
 
-    # 1. Configurer le modèle FastText
-    # On utilise FastText car il gère les "Subwords" (morphologie malgache)
-    print("🧠 Initialisation du modèle FastText...")
-    model = FastText(
-        vector_size=vector_size,
-        window=window,
-        min_count=min_count,
-        workers=multiprocessing.cpu_count(),
-        sg=1 # Skip-gram (souvent meilleur pour de petits/moyens corpus)
-    )
-
-    # 2. Construire le vocabulaire
-    print("📖 Construction du vocabulaire...")
-    sentences = LineSentence(corpus_path)
-    model.build_vocab(corpus_iterable=sentences)
-
-    # 3. Entraîner
-    print("🔥 Entraînement en cours (cela peut prendre quelques minutes)...")
-    model.train(
-        corpus_iterable=sentences,
-        total_examples=model.corpus_count,
-        epochs=10
-    )
-
-    # 4. Sauvegarder
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-    
+
+    checkpoint, state = latest_checkpoint(checkpoint_dir) if resume else (None, None)
+    if checkpoint:
+        # 1-2. Reprendre le modèle (vocabulaire compris) du dernier checkpoint
+        print(f"🔁 Reprise depuis {checkpoint} (epoch {state['epoch']}/{state['epochs']})")
+        if state["params"] != params:
+            print(f"❌ Le checkpoint a été entraîné avec d'autres paramètres : {state['params']}")
+            print(f"   Relancer avec ces paramètres, ou sans --resume pour repartir de zéro.")
+            return
+        model = FastText.load(os.path.join(checkpoint, "malagasy_fasttext.model"))
+        model.workers = workers
+        epochs = state["epochs"]
+    else:
+        if resume:
+            print("ℹ️ Aucun checkpoint à reprendre : entraînement depuis le début.")
+        # Nouveau départ : les checkpoints et métriques d'un run précédent ne
+        # doivent ni être repris ni faire élaguer les nouveaux checkpoints
+        if os.path.exists(checkpoint_dir):
+            shutil.rmtree(checkpoint_dir)
+        if os.path.exists(metrics_path):
+            os.remove(metrics_path)
+
+        # 1. Configurer le modèle FastText
+        # On utilise FastText car il gère les "Subwords" (morphologie malgache)
+        print("🧠 Initialisation du modèle FastText...")
+        model = FastText(
+            vector_size=vector_size,
+            window=window,
+            min_count=min_count,
+            workers=workers,
+            sg=sg # Skip-gram (souvent meilleur pour de petits/moyens corpus)
+        )
+
+        # 2. Construire le vocabulaire (comptes en cache : pas de passe de build_vocab)
+        vocab = load_vocab(corpus_path, vocab_cache)
+        model.build_vocab_from_freq(vocab["counts"], corpus_count=vocab["sentences"])
+        model.corpus_total_words = vocab["words"]
+        print(f"   {len(model.wv)} mots gardés (min_count={min_count}) sur {len(vocab['counts'])}, "
+              f"{vocab['words']} mots au total")
+        state = {"epoch": 0, "epochs": epochs, "alpha": model.alpha, "min_alpha": model.min_alpha,
+                 "elapsed": 0.0, "params": params}
+
+    # 3. Entraîner les epochs restantes. La décroissance linéaire du taux
+    # d'apprentissage reprend au point atteint : même calendrier qu'en une fois.
+    done = state["epoch"]
+    remaining = epochs - done
+    alpha, min_alpha = state["alpha"], state["min_alpha"]
+    start_alpha = alpha - (alpha - min_alpha) * done / epochs
+    callback = EpochCheckpoint(checkpoint_dir, metrics_path, state, keep=keep_checkpoints)
+
+    start = time.time()
+    trained = raw = 0
+    if remaining > 0:
+        print("🔥 Entraînement en cours (cela peut prendre quelques minutes)...")
+        if corpus_file:
+            trained, raw = model.train(
+                corpus_file=corpus_path,
+                total_words=model.corpus_total_words,
+                epochs=remaining,
+                start_alpha=start_alpha,
+                end_alpha=min_alpha,
+                compute_loss=True,
+                callbacks=[callback]
+            )
+        else:
+            trained, raw = model.train(
+                corpus_iterable=LineSentence(corpus_path),
+                total_examples=model.corpus_count,
+                epochs=remaining,
+                start_alpha=start_alpha,
+                end_alpha=min_alpha,
+                compute_loss=True,
+                callbacks=[callback]
+            )
+    elapsed = time.time() - start
+    words_per_sec = raw / max(elapsed, 1e-9)
+    # Valeurs du calendrier complet (train() garde celles de la dernière reprise)
+    model.alpha, model.epochs = alpha, epochs
+
+    # 4. Sauvegarder
     model_path = os.path.join(output_dir, "malagasy_fasttext.model")
     model.save(model_path)
-    
+    # Le modèle final est complet : les checkpoints ne servent plus
+    if os.path.exists(checkpoint_dir):
+        shutil.rmtree(checkpoint_dir)
+
+    # 5. Exporter les vecteurs seuls pour le service (chargement mmap)
+    serving_dir = export_vectors(model.wv, os.path.join(output_dir, "serving"))
+
     print("======================================================================")
     print(f"✅ EMBEDDINGS ENTRAÎNÉS AVEC SUCCÈS !")
+    print(f"⏱️ {elapsed:.1f}s pour {remaining} epochs : {words_per_sec:,.0f} mots/s "
+          f"({words_per_sec / workers:,.0f} par worker), {trained} mots effectifs")
     print(f"💾 Sauvegardé dans : {model_path}")
+    print(f"📦 Vecteurs de service : {serving_dir} (web_app, 12_test_app.py)")
+    print(f"📊 Métriques par epoch : {metrics_path}")
     print("======================================================================")
 
     # Test de similarité
@@ -64,9 +291,23 @@ def train_embeddings(corpus_path, output_dir, vector_size=100, window=5, min_cou
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Entraîne des embeddings FastText sur le corpus malgache.')
-    parser.add_argument('--corpus', type=str, default='malagasy_corpus_v1_fixed.txt', help='Chemin vers le corpus consolidé')
+    parser.add_argument('--corpus', type=str, default='malagasy_corpus_normalized.txt', help='Corpus normalisé (09_normalize_corpus.py)')
     parser.add_argument('--output', type=str, default='embeddings_mg', help='Dossier de sortie')
     parser.add_argument('--size', type=int, default=100, help='Taille des vecteurs')
+    parser.add_argument('--window', type=int, default=5, help='Taille de la fenêtre de contexte')
+    parser.add_argument('--min-count', type=int, default=5, help='Fréquence minimale d\'un mot')
+    parser.add_argument('--epochs', type=int, default=10, help='Nombre d\'epochs (défaut: 10)')
+    parser.add_argument('--workers', type=int, default=None, help='Threads d\'entraînement (défaut: tous les cœurs)')
+    parser.add_argument('--corpus-file', action='store_true',
+                        help='Mode corpus_file de gensim : lecture du fichier sans GIL, débit proportionnel aux cœurs')
+    parser.add_argument('--vocab-cache', type=str, default=None,
+                        help='Cache des comptes de mots (défaut: <corpus>.vocab.json)')
+    parser.add_argument('--resume', action='store_true', help='Reprend depuis le dernier checkpoint de <output>/checkpoints')
+    parser.add_argument('--keep-checkpoints', type=int, default=2,
+                        help='Checkpoints gardés (défaut: 2, 0 = aucun checkpoint)')
 
     args = parser.parse_args()
-    train_embeddings(args.corpus, args.output, vector_size=args.size)
+    train_embeddings(args.corpus, args.output, vector_size=args.size, window=args.window,
+                     min_count=args.min_count, epochs=args.epochs, workers=args.workers,
+                     corpus_file=args.corpus_file, vocab_cache=args.vocab_cache,
+                     resume=args.resume, keep_checkpoints=args.keep_checkpoints)
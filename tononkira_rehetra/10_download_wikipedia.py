@@ -1,39 +1,274 @@
+"""
+Téléchargement du dump de Wikipédia Malagasy.
+
+Le dump est écrit dans un fichier temporaire <sortie>.part par gros
+morceaux. Si le serveur accepte les requêtes Range, le fichier est découpé
+en plages téléchargées en parallèle ; les plages terminées sont notées dans
+<sortie>.part.json, si bien qu'un téléchargement interrompu reprend où il
+s'était arrêté. Le sha1 (ou md5) publié par Wikimedia est vérifié avant de
+renommer atomiquement le .part en fichier final : un fichier final présent
+est donc toujours complet.
+
+--base-url permet de viser un serveur local pour les tests.
+"""
+
 import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 
-def download_wikipedia_dump(output_path):
-    # URL du dump officiel de Wikipédia Malagasy (les articles actuels)
-    url = "https://dumps.wikimedia.org/mgwiki/latest/mgwiki-latest-pages-articles.xml.bz2"
-    
+# Dossier "latest" des dumps officiels de Wikipédia Malagasy
+BASE_URL = "https://dumps.wikimedia.org/mgwiki/latest"
+DUMP_FILE = "mgwiki-latest-pages-articles.xml.bz2"
+MULTISTREAM_FILES = ["mgwiki-latest-pages-articles-multistream.xml.bz2",
+                     "mgwiki-latest-pages-articles-multistream-index.txt.bz2"]
+
+# Sommes de contrôle publiées à côté des dumps, par ordre de préférence
+CHECKSUM_FILES = [("sha1", "mgwiki-latest-sha1sums.txt"), ("md5", "mgwiki-latest-md5sums.txt")]
+
+CHUNK_SIZE = 16 * 1024 * 1024   # Taille d'une plage Range
+WRITE_SIZE = 1024 * 1024        # Taille des écritures sur disque
+
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": "voambolana-malagasy/1.0 (dump downloader)"})
+
+
+# ============================================================
+# Sommes de contrôle
+# ============================================================
+
+def published_checksum(base_url, filename):
+    """(algorithme, somme hexadécimale) publiés pour `filename`, ou (None, None).
+
+    Dans le dossier "latest", les fichiers de sommes citent les noms datés
+    (mgwiki-20240101-...) : la date est remplacée par "latest" pour comparer.
+    """
+    for algo, sums_file in CHECKSUM_FILES:
+        try:
+            r = SESSION.get(f"{base_url}/{sums_file}", timeout=30)
+            if r.status_code != 200:
+                continue
+        except requests.RequestException:
+            continue
+        for line in r.text.splitlines():
+            parts = line.split()
+            if len(parts) == 2 and re.sub(r"-\d{8}-", "-latest-", parts[1]) == filename:
+                return algo, parts[0].lower()
+    return None, None
+
+
+def file_checksum(path, algo):
+    digest = hashlib.new(algo)
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(8 * 1024 * 1024)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ============================================================
+# Reprise : état du fichier .part
+# ============================================================
+
+def load_part_state(state_path, remote):
+    """Plages déjà téléchargées, si le .part correspond toujours au même fichier distant."""
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    same = all(state.get(k) == remote[k] for k in ("url", "size", "etag", "last_modified", "chunk_size"))
+    return set(state.get("done", [])) if same else set()
+
+
+def save_part_state(state_path, remote, done):
+    tmp = state_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dict(remote, done=sorted(done)), f)
+    os.replace(tmp, state_path)
+
+
+# ============================================================
+# Téléchargement
+# ============================================================
+
+def probe(url):
+    """Taille, validateurs et support des Range du fichier distant (requête HEAD)."""
+    r = SESSION.head(url, allow_redirects=True, timeout=30)
+    r.raise_for_status()
+    size = r.headers.get("Content-Length")
+    return {
+        "url": url,
+        "size": int(size) if size is not None else None,
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "ranges": r.headers.get("Accept-Ranges", "").lower() == "bytes",
+    }
+
+
+def fetch_range(url, fd, start, end, bar, retries=3, delay=2):
+    """Télécharge les octets [start, end] dans `fd` à leur position ; relance en cas d'échec."""
+    for attempt in range(1, retries + 1):
+        written = 0
+        try:
+            with SESSION.get(url, headers={"Range": f"bytes={start}-{end}"},
+                             stream=True, timeout=60) as r:
+                if r.status_code != 206:
+                    raise requests.RequestException(f"HTTP {r.status_code} au lieu de 206")
+                for data in r.iter_content(chunk_size=WRITE_SIZE):
+                    os.pwrite(fd, data, start + written)
+                    written += len(data)
+                    bar.update(len(data))
+            if written != end - start + 1:
+                raise requests.RequestException(f"plage incomplète ({written}/{end - start + 1} octets)")
+            return
+        except requests.RequestException as e:
+            bar.update(-written)
+            if attempt == retries:
+                raise
+            tqdm.write(f"  ⚠️  Tentative {attempt}/{retries} échouée pour {start}-{end} : {e}")
+            time.sleep(delay * (2 ** (attempt - 1)))
+
+
+def download_ranges(remote, part_path, workers, chunk_size):
+    """Téléchargement parallèle et reprenable par plages Range."""
+    state_path = part_path + ".json"
+    size = remote["size"]
+    remote_id = {k: remote[k] for k in ("url", "size", "etag", "last_modified")}
+    remote_id["chunk_size"] = chunk_size
+
+    chunks = [(i, i * chunk_size, min(size, (i + 1) * chunk_size) - 1)
+              for i in range((size + chunk_size - 1) // chunk_size)]
+    done = load_part_state(state_path, remote_id) if os.path.exists(part_path) else set()
+    if not done and os.path.exists(part_path):
+        os.remove(part_path)
+    pending = [c for c in chunks if c[0] not in done]
+
+    already = sum(end - start + 1 for i, start, end in chunks if i in done)
+    if already:
+        print(f"🔁 Reprise : {already / 1024 / 1024:.1f} MB déjà téléchargés")
+
+    fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o644)
+    lock = threading.Lock()
+    try:
+        os.ftruncate(fd, size)
+        with tqdm(desc="Téléchargement", total=size, initial=already,
+                  unit="iB", unit_scale=True, unit_divisor=1024) as bar:
+
+            def fetch(chunk):
+                i, start, end = chunk
+                fetch_range(remote["url"], fd, start, end, bar)
+                with lock:
+                    done.add(i)
+                    save_part_state(state_path, remote_id, done)
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(fetch, pending))
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def download_stream(remote, part_path):
+    """Téléchargement d'un seul flux, sans reprise (serveur sans Range)."""
+    with SESSION.get(remote["url"], stream=True, timeout=60) as r:
+        r.raise_for_status()
+        with open(part_path, "wb") as f, tqdm(desc="Téléchargement", total=remote["size"],
+                                              unit="iB", unit_scale=True, unit_divisor=1024) as bar:
+            for data in r.iter_content(chunk_size=WRITE_SIZE):
+                bar.update(f.write(data))
+
+
+def download_wikipedia_dump(output_path, url=None, base_url=BASE_URL, workers=4,
+                            chunk_size=CHUNK_SIZE, verify=True):
+    """Télécharge `url` (par défaut <base_url>/<nom de output_path>) vers output_path.
+
+    Retourne True si le fichier final est présent et vérifié.
+    """
+    url = url or f"{base_url}/{os.path.basename(output_path)}"
+    part_path = output_path + ".part"
+
     print("======================================================================")
     print("🌍 TÉLÉCHARGEMENT DE WIKIPÉDIA MALAGASY")
     print(f"   Source : {url}")
     print("======================================================================")
 
     if os.path.exists(output_path):
+        # Le fichier final n'apparaît qu'après vérification : il est complet
         print(f"ℹ️ Le fichier {output_path} existe déjà. Saut de l'étape.")
-        return
-
-    response = requests.get(url, stream=True)
-    total_size = int(response.headers.get('content-length', 0))
-    
-    with open(output_path, 'wb') as f, tqdm(
-        desc="Téléchargement",
-        total=total_size,
-        unit='iB',
-        unit_scale=True,
-        unit_divisor=1024,
-    ) as bar:
-        for data in response.iter_content(chunk_size=1024):
-            size = f.write(data)
-            bar.update(size)
+        return True
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    try:
+        remote = probe(url)
+        if remote["ranges"] and remote["size"]:
+            print(f"   Taille : {remote['size'] / 1024 / 1024:.1f} MB, "
+                  f"{workers} connexions, plages de {chunk_size // 1024 // 1024} MB")
+            SESSION.mount(url, HTTPAdapter(pool_connections=1, pool_maxsize=workers))
+            download_ranges(remote, part_path, workers, chunk_size)
+        else:
+            print("   ⚠️ Le serveur n'accepte pas les requêtes Range : téléchargement d'un seul flux, sans reprise")
+            download_stream(remote, part_path)
+    except (requests.RequestException, OSError) as e:
+        print(f"\n❌ Téléchargement interrompu : {e}")
+        print("   Relancer la commande pour reprendre.")
+        return False
+
+    if remote["size"] is not None and os.path.getsize(part_path) != remote["size"]:
+        print(f"\n❌ Taille inattendue : {os.path.getsize(part_path)} octets au lieu de {remote['size']}")
+        return False
+
+    if verify:
+        algo, expected = published_checksum(url.rsplit("/", 1)[0], os.path.basename(url))
+        if expected is None:
+            print("\n⚠️ Aucune somme de contrôle publiée trouvée : vérification sautée.")
+        else:
+            got = file_checksum(part_path, algo)
+            if got != expected:
+                print(f"\n❌ {algo} invalide : {got} au lieu de {expected}. Fichier partiel supprimé.")
+                os.remove(part_path)
+                if os.path.exists(part_path + ".json"):
+                    os.remove(part_path + ".json")
+                return False
+            print(f"\n🔒 {algo} vérifié : {got}")
+
+    os.replace(part_path, output_path)
+    if os.path.exists(part_path + ".json"):
+        os.remove(part_path + ".json")
 
     print(f"\n✅ Téléchargement terminé : {output_path}")
-    print("⚠️ Prochaine étape : Extraire le texte avec 'wikiextractor'.")
+    print("⚠️ Prochaine étape : Extraire le texte avec '11_extract_wiki.py'.")
     print("======================================================================")
+    return True
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Téléchargement du dump Wikipédia Malagasy")
     # On sauvegarde dans le dossier parent (bible/wiki) pour ne pas polluer 'tononkira_rehetra'
-    output_file = "../mgwiki-latest-pages-articles.xml.bz2"
-    download_wikipedia_dump(output_file)
+    parser.add_argument("--output-dir", type=str, default="..", help="Dossier de destination (défaut: ..)")
+    parser.add_argument("--base-url", type=str, default=BASE_URL,
+                        help="Dossier des dumps (défaut: dumps.wikimedia.org, ou un serveur local pour tester)")
+    parser.add_argument("--multistream", action="store_true",
+                        help="Télécharger le dump multistream et son index (extraction parallèle en Phase 11)")
+    parser.add_argument("--workers", type=int, default=4, help="Connexions parallèles (défaut: 4)")
+    parser.add_argument("--chunk-mb", type=int, default=CHUNK_SIZE // 1024 // 1024,
+                        help="Taille des plages Range en MB (défaut: 16)")
+    parser.add_argument("--no-verify", action="store_true", help="Ne pas vérifier le sha1/md5 publié")
+
+    args = parser.parse_args()
+    files = MULTISTREAM_FILES if args.multistream else [DUMP_FILE]
+    ok = True
+    for name in files:
+        ok = download_wikipedia_dump(os.path.join(args.output_dir, name), base_url=args.base_url.rstrip("/"),
+                                     workers=args.workers, chunk_size=args.chunk_mb * 1024 * 1024,
+                                     verify=not args.no_verify) and ok
+    raise SystemExit(0 if ok else 1)
@@ -1,10 +1,46 @@
+"""
+Extraction du texte des articles du dump Wikipédia Malagasy.
+
+Les dumps « multistream » de Wikimedia sont une suite de flux bz2
+indépendants (~100 pages chacun), dont les positions sont listées dans le
+fichier index (offset:page_id:titre). Chaque groupe de flux est décompressé,
+parsé et nettoyé dans un pool de processus ; les articles sont écrits dans
+l'ordre des pages, comme avec une lecture séquentielle.
+
+Sans index, les débuts de flux sont retrouvés en cherchant leur en-tête bz2.
+Ils ne sont alors utilisés que si chaque tâche commence sur une balise
+<page> : un dump recompressé par pbzip2 / lbzip2 est lui aussi une suite de
+flux, mais coupés tous les ~900 KB en plein milieu des pages. Sinon, et pour
+un dump à flux unique (pages-articles.xml.bz2 classique), lecture
+séquentielle.
+"""
+
 import bz2
+import mmap
 import xml.etree.ElementTree as ET
 import re
 import os
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 
+from wikitext import strip_wikitext
+
+# En-tête de flux bz2 ("BZh" + taille de bloc) suivi de la signature du premier bloc
+STREAM_MAGIC = re.compile(rb"BZh[1-9]\x31\x41\x59\x26\x53\x59")
+
+# Taille compressée visée par tâche envoyée au pool
+CHUNK_BYTES = 4 * 1024 * 1024
+# Lecture compressée pour décoder le début d'un flux (vérification d'alignement)
+PROBE_BYTES = 64 * 1024
+
 def clean_wiki_text(text):
+    # Nettoyage du balisage Wiki en une passe (modèles et tableaux imbriqués, refs, liens)
+    return strip_wikitext(text)
+
+def clean_wiki_text_regex(text):
+    """Ancienne version par re.sub successifs, gardée comme référence pour bench_wikitext.py."""
     # Suppression élémentaire du balisage Wiki
     text = re.sub(r'\[\[(?:[^|\]]*\|)?([^\]]+)\]\]', r'\1', text) # Liens [[A|B]] -> B
     text = re.sub(r"'''+", "", text) # Gras/Italique
@@ -12,52 +48,223 @@ def clean_wiki_text(text):
     text = re.sub(r'==+[^=]+==+', '', text) # Titres de sections
     text = re.sub(r'\[http[^\s]+ ([^\]]+)\]', r'\1', text) # Liens externes
     text = re.sub(r'<[^>]+>', '', text) # Balises HTML restant
-    
+
     # Nettoyage des espaces
     text = re.sub(r'\n\s*\n', '\n', text)
     return text.strip()
 
-def extract_wiki(input_bz2, output_txt):
-    print("======================================================================")
-    print("🏗️ EXTRACTION PERSONNALISÉE DE WIKIPÉDIA MALAGASY")
-    print(f"   Source : {input_bz2}")
-    print("======================================================================")
+def page_article(elem):
+    """(titre, texte nettoyé) d'un élément <page>, ou None si la page est ignorée."""
+    title = elem.find('.//{*}title').text
+    # On ignore les pages spéciales (Utilisateur, Discussion, etc.)
+    if title and ':' not in title:
+        revision = elem.find('.//{*}revision')
+        if revision is not None:
+            text_elem = revision.find('.//{*}text')
+            if text_elem is not None and text_elem.text:
+                content = clean_wiki_text(text_elem.text)
+                if len(content) > 100: # On ignore les ébauches trop courtes
+                    return title, content
+    return None
 
-    if not os.path.exists(input_bz2):
-        print(f"❌ Erreur : {input_bz2} introuvable.")
-        return
+# ============================================================
+# Découpage du dump multistream
+# ============================================================
 
-    count = 0
-    with bz2.open(input_bz2, 'rb') as f_in, open(output_txt, 'w', encoding='utf-8') as f_out:
+def default_index_path(input_bz2):
+    """Index Wikimedia associé : xxx-multistream.xml.bz2 -> xxx-multistream-index.txt.bz2."""
+    if input_bz2.endswith(".xml.bz2"):
+        return input_bz2[:-len(".xml.bz2")] + "-index.txt.bz2"
+    return None
+
+def read_stream_offsets(index_path):
+    """Débuts de flux distincts listés dans l'index (lignes offset:page_id:titre)."""
+    offsets = set()
+    with bz2.open(index_path, "rt", encoding="utf-8") as f:
+        for line in f:
+            offset, _, _ = line.partition(":")
+            if offset:
+                offsets.add(int(offset))
+    return offsets
+
+def scan_stream_offsets(input_bz2):
+    """Débuts de flux retrouvés en cherchant l'en-tête bz2 dans le fichier."""
+    with open(input_bz2, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return {m.start() for m in STREAM_MAGIC.finditer(data)}
+
+def stream_ranges(input_bz2, index_path=None):
+    """Plages (début, fin) des flux bz2 du fichier, dans l'ordre."""
+    size = os.path.getsize(input_bz2)
+    if index_path and os.path.exists(index_path):
+        offsets = read_stream_offsets(index_path)
+        # L'index ne liste que les flux de pages : l'en-tête <siteinfo> est au début
+        offsets.add(0)
+    else:
+        offsets = scan_stream_offsets(input_bz2)
+    offsets = sorted(o for o in offsets if o < size)
+    return list(zip(offsets, offsets[1:] + [size]))
+
+def group_ranges(ranges, chunk_bytes=None):
+    """Regroupe les flux consécutifs en tâches d'environ chunk_bytes compressés."""
+    chunk_bytes = chunk_bytes or CHUNK_BYTES
+    groups = []
+    start = end = None
+    for s, e in ranges:
+        if start is None:
+            start = s
+        end = e
+        if end - start >= chunk_bytes:
+            groups.append((start, end))
+            start = None
+    if start is not None:
+        groups.append((start, end))
+    return groups
+
+def stream_head(f, offset, size=len(b"<page>")):
+    """Premiers octets non blancs du flux bz2 qui commence en `offset`
+    (b"" s'il ne se décode pas : faux en-tête trouvé par la recherche)."""
+    f.seek(offset)
+    decompressor = bz2.BZ2Decompressor()
+    head = b""
+    try:
+        while len(head) < size and not decompressor.eof:
+            data = f.read(PROBE_BYTES)
+            if not data:
+                break
+            head += decompressor.decompress(data).lstrip()
+    except (OSError, ValueError):
+        return b""
+    return head[:size]
+
+def chunks_aligned(input_bz2, chunks):
+    """True si chaque tâche (hors la première, qui porte l'en-tête <siteinfo>)
+    commence sur une <page> : elle finit alors aussi après un </page>, puisque
+    la suivante commence là où elle s'arrête."""
+    with open(input_bz2, "rb") as f:
+        return all(stream_head(f, start) == b"<page>" for start, _ in chunks[1:])
+
+def extract_chunk(input_bz2, start, end):
+    """Articles des flux compris entre start et end ; appelé dans le pool de processus."""
+    with open(input_bz2, "rb") as f:
+        f.seek(start)
+        data = bz2.decompress(f.read(end - start))
+
+    # Les flux ne contiennent que des <page> complètes (plus l'en-tête et la
+    # fermeture </mediawiki> pour le premier et le dernier) : on les enveloppe
+    first = data.find(b"<page>")
+    last = data.rfind(b"</page>")
+    if first < 0 or last < 0:
+        return []
+    root = ET.fromstring(b"<pages>" + data[first:last + len(b"</page>")] + b"</pages>")
+
+    articles = []
+    for elem in root:
+        article = page_article(elem)
+        if article:
+            articles.append(article)
+    return articles
+
+def iter_articles_parallel(input_bz2, chunks, workers):
+    """Articles de chaque tâche, dans l'ordre des pages (au plus 2 × workers tâches en vol)."""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for start, end in chunks:
+            pending.append(executor.submit(extract_chunk, input_bz2, start, end))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def iter_articles_sequential(input_bz2):
+    with bz2.open(input_bz2, 'rb') as f_in:
         # On itère sur les tags <page> du XML
         context = ET.iterparse(f_in, events=('end',))
-        
+
         for event, elem in tqdm(context, desc="Extraction des articles"):
             # Enlever les namespaces du tag (ex: {http://www.mediawiki.org/xml/export-0.10/}page)
             tag = elem.tag.split('}')[-1]
-            
+
             if tag == 'page':
-                title = elem.find('.//{*}title').text
-                # On ignore les pages spéciales (Utilisateur, Discussion, etc.)
-                if title and ':' not in title:
-                    revision = elem.find('.//{*}revision')
-                    if revision is not None:
-                        text_elem = revision.find('.//{*}text')
-                        if text_elem is not None and text_elem.text:
-                            content = clean_wiki_text(text_elem.text)
-                            if len(content) > 100: # On ignore les ébauches trop courtes
-                                f_out.write(f"--- {title} ---\n")
-                                f_out.write(content + "\n\n")
-                                count += 1
-                
+                article = page_article(elem)
+                if article:
+                    yield article
+
                 # Libérer la mémoire
                 elem.clear()
-            
+
+def iter_wiki_articles(input_bz2, index_path=None, workers=None):
+    """(titre, texte nettoyé) de chaque article du dump, dans l'ordre des pages.
+
+    Dump multistream : flux décodés dans `workers` processus ; sinon lecture
+    séquentielle. Utilisé par extract_wiki et directement par
+    06_consolidate_corpus.py (sans fichier texte intermédiaire).
+    """
+    workers = workers or os.cpu_count() or 1
+    index_path = index_path or default_index_path(input_bz2)
+    indexed = bool(index_path) and os.path.exists(index_path)
+    ranges = stream_ranges(input_bz2, index_path)
+    chunks = group_ranges(ranges)
+
+    # Flux trouvés sans index : extract_chunk perdrait sans bruit les pages
+    # coupées aux bords des tâches s'ils ne suivent pas les pages
+    if len(ranges) > 1 and not indexed and not chunks_aligned(input_bz2, chunks):
+        print(f"   ⚠️ {len(ranges)} flux non alignés sur les pages (pbzip2 / lbzip2 ?) : lecture séquentielle")
+        ranges = chunks = [(0, os.path.getsize(input_bz2))]
+
+    if len(ranges) > 1 and workers > 1:
+        print(f"   Multistream : {len(ranges)} flux en {len(chunks)} tâches, {workers} processus")
+        results = iter_articles_parallel(input_bz2, chunks, workers)
+        for batch in tqdm(results, total=len(chunks), desc="Extraction des articles"):
+            yield from batch
+    elif len(ranges) > 1:
+        for start, end in tqdm(chunks, desc="Extraction des articles"):
+            yield from extract_chunk(input_bz2, start, end)
+    else:
+        yield from iter_articles_sequential(input_bz2)
+
+def iter_wiki_paragraphs(input_bz2, index_path=None, workers=None):
+    """(titre, paragraphe) de chaque ligne non vide des articles du dump.
+
+    Mêmes paragraphes, dans le même ordre, que la relecture ligne à ligne
+    du fichier écrit par extract_wiki (lignes "--- titre ---" exclues).
+    """
+    for title, content in iter_wiki_articles(input_bz2, index_path, workers):
+        # Découpage des lignes identique à la relecture du fichier texte
+        for line in content.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+            paragraph = line.strip()
+            if paragraph and not paragraph.startswith("--- "):
+                yield title, paragraph
+
+def extract_wiki(input_bz2, output_txt, index_path=None, workers=None):
+    print("======================================================================")
+    print("🏗️ EXTRACTION PERSONNALISÉE DE WIKIPÉDIA MALAGASY")
+    print(f"   Source : {input_bz2}")
+    print("======================================================================")
+
+    if not os.path.exists(input_bz2):
+        print(f"❌ Erreur : {input_bz2} introuvable.")
+        return
+
+    count = 0
+    with open(output_txt, 'w', encoding='utf-8') as f_out:
+        articles = iter_wiki_articles(input_bz2, index_path=index_path, workers=workers)
+        for title, content in articles:
+            f_out.write(f"--- {title} ---\n")
+            f_out.write(content + "\n\n")
+            count += 1
+
     print(f"\n✅ Extraction terminée !")
     print(f"📊 {count} articles extraits dans {output_txt}")
     print("======================================================================")
 
 if __name__ == "__main__":
-    input_file = "../mgwiki-latest-pages-articles.xml.bz2"
-    output_file = "../malagasy_wikipedia_raw.txt"
-    extract_wiki(input_file, output_file)
+    parser = argparse.ArgumentParser(description="Extraction du texte du dump Wikipédia Malagasy")
+    parser.add_argument("--input", type=str, default="../mgwiki-latest-pages-articles.xml.bz2",
+                        help="Dump .xml.bz2 (multistream de préférence)")
+    parser.add_argument("--output", type=str, default="../malagasy_wikipedia_raw.txt", help="Fichier texte de sortie")
+    parser.add_argument("--index", type=str, default=None,
+                        help="Index multistream (défaut: <dump>-index.txt.bz2 s'il existe, sinon recherche des flux)")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus (défaut: tous les cœurs)")
+
+    args = parser.parse_args()
+    extract_wiki(args.input, args.output, index_path=args.index, workers=args.workers)
@@ -5,30 +5,64 @@ from gensim.models import FastText
 from tqdm import tqdm
 import argparse
 
+from song_store import SongStore, is_store
+from embedding_store import is_vector_store, load_vectors
+
 class MalagasyNLPApp:
-    def __init__(self, model_path, corpus_dir):
-        print(f"📦 Chargement du modèle {model_path}...")
-        self.model = FastText.load(model_path)
+    def __init__(self, model_path, corpus_dir, store_dir="song_store"):
+        # Vecteurs de service exportés à côté du modèle (mmap, chargement instantané)
+        vectors_path = os.path.join(os.path.dirname(model_path), "serving")
+        if is_vector_store(vectors_path):
+            print(f"📦 Chargement des vecteurs {vectors_path} (mmap)...")
+            self.wv = load_vectors(vectors_path)
+        else:
+            print(f"📦 Chargement du modèle {model_path}...")
+            self.wv = FastText.load(model_path).wv
         self.corpus_dir = corpus_dir
+        self.store_dir = store_dir
         self.index_path = "semantic_index.json"
         self.song_index = []
 
     def get_sentence_vector(self, text):
         """Calcule le vecteur moyen d'une phrase/paragraphe."""
         words = text.lower().replace('.', '').replace(',', '').split()
-        vectors = [self.model.wv[w] for w in words if w in self.model.wv]
+        vectors = [self.wv[w] for w in words if w in self.wv]
         if not vectors:
-            return np.zeros(self.model.vector_size)
+            return np.zeros(self.wv.vector_size)
         return np.mean(vectors, axis=0)
 
+    def index_song(self, artist, title, content):
+        return {
+            "artist": artist,
+            "title": title,
+            "vector": self.get_sentence_vector(content).tolist(),
+            "snippet": content[:200] + "..."
+        }
+
     def build_index(self):
-        """Indexe sémantiquement les chansons (via bundle ou fichiers)."""
+        """Indexe sémantiquement les chansons (via store, bundle ou fichiers)."""
         if os.path.exists(self.index_path):
             print(f"ℹ️ Index existant trouvé ({self.index_path}). Chargement...")
             with open(self.index_path, 'r', encoding='utf-8') as f:
                 self.song_index = json.load(f)
             return
 
+        # Store en shards : lecture séquentielle de quelques gros fichiers
+        if self.store_dir and is_store(self.store_dir):
+            print(f"🚀 Chargement via le STORE ({self.store_dir})...")
+            store = SongStore(self.store_dir)
+            indexed_data = [
+                self.index_song(song["artist"], song["name"], song["content"].strip())
+                for song in tqdm(store.iter_songs(), total=store.count(), desc="Indexation sémantique")
+            ]
+            store.close()
+
+            self.song_index = indexed_data
+            with open(self.index_path, 'w', encoding='utf-8') as f:
+                json.dump(indexed_data, f)
+            print(f"✅ Indexation terminée : {len(indexed_data)} chansons indexées.")
+            return
+
         # Tentative de chargement via le bundle JSON (beaucoup plus rapide sur Drive)
         bundle_path = "songs_bundle.json"
         if os.path.exists(bundle_path):
@@ -38,13 +72,7 @@ class MalagasyNLPApp:
             
             indexed_data = []
             for song in tqdm(all_songs, desc="Indexation sémantique"):
-                vector = self.get_sentence_vector(song["content"])
-                indexed_data.append({
-                    "artist": song["artist"],
-                    "title": song["title"],
-                    "vector": vector.tolist(),
-                    "snippet": song["content"][:200] + "..."
-                })
+                indexed_data.append(self.index_song(song["artist"], song["title"], song["content"]))
             
             self.song_index = indexed_data
             with open(self.index_path, 'w', encoding='utf-8') as f:
@@ -67,13 +95,7 @@ class MalagasyNLPApp:
                     try:
                         with open(path, 'r', encoding='utf-8') as f:
                             content = f.read()
-                            vector = self.get_sentence_vector(content)
-                            indexed_data.append({
-                                "artist": artist,
-                                "title": song_file.replace(".txt", ""),
-                                "vector": vector.tolist(),
-                                "snippet": content[:200] + "..."
-                            })
+                            indexed_data.append(self.index_song(artist, song_file.replace(".txt", ""), content))
                     except:
                         continue
         
@@ -98,21 +120,21 @@ class MalagasyNLPApp:
     def spell_check(self, word):
         """Suggère des corrections."""
         try:
-            return [s[0] for s in self.model.wv.most_similar(word, topn=3)]
+            return [s[0] for s in self.wv.most_similar(word, topn=3)]
         except:
             return []
 
     def explore_concept(self, word):
         """Affiche le 'nuage' sémantique."""
         try:
-            return self.model.wv.most_similar(word, topn=10)
+            return self.wv.most_similar(word, topn=10)
         except:
             return []
 
     def solve_analogy(self, a, b, c):
         """A est à B ce que C est à ?"""
         try:
-            return [r[0] for r in self.model.wv.most_similar(positive=[b, c], negative=[a], topn=3)]
+            return [r[0] for r in self.wv.most_similar(positive=[b, c], negative=[a], topn=3)]
         except:
             return []
 
@@ -2,14 +2,33 @@ import os
 import json
 from tqdm import tqdm
 
-def bundle_songs(output_dir, bundle_path):
+from song_store import SongStore, is_store
+
+def bundle_from_store(store_dir, all_songs, processed_artists):
+    """Ajoute à all_songs les chansons du store, lues d'une traite shard par shard."""
+    store = SongStore(store_dir)
+    try:
+        for song in tqdm(store.iter_songs(), total=store.count(), desc="Lecture du store"):
+            if song["artist"] in processed_artists:
+                continue
+            content = song["content"].strip()
+            if content:
+                all_songs.append({
+                    "artist": song["artist"],
+                    "title": song["name"],
+                    "content": content
+                })
+    finally:
+        store.close()
+
+def bundle_songs(output_dir, bundle_path, store=None):
     print("======================================================================")
     print("🚀 BUNDLE TURBO 2.0 : Regroupement optimisé")
-    print(f"   Source : {output_dir}")
+    print(f"   Source : {store or output_dir}")
     print(f"   Cible  : {bundle_path}")
     print("======================================================================")
 
-    if not os.path.exists(output_dir):
+    if not store and not os.path.exists(output_dir):
         print(f"❌ Erreur : Dossier {output_dir} introuvable.")
         return
 
@@ -25,6 +44,20 @@ def bundle_songs(output_dir, bundle_path):
         except:
             print("⚠️ Impossible de lire le bundle existant, on repart à zéro.")
 
+    if store:
+        # Pas de sauvegarde intermédiaire : la lecture séquentielle du store est rapide
+        try:
+            bundle_from_store(store, all_songs, processed_artists)
+        except KeyboardInterrupt:
+            print("\n🛑 Interruption détectée ! Sauvegarde en cours...")
+        finally:
+            with open(bundle_path, 'w', encoding='utf-8') as f:
+                json.dump(all_songs, f, ensure_ascii=False)
+        print(f"\n✅ Terminé ! Total : {len(all_songs)} chansons dans {bundle_path}")
+        print(f"📍 Taille finale : {os.path.getsize(bundle_path) / (1024*1024):.2f} MB")
+        print("======================================================================")
+        return
+
     try:
         # scandir est plus rapide que listdir pour les métadonnées
         with os.scandir(output_dir) as it:
@@ -81,4 +114,6 @@ def bundle_songs(output_dir, bundle_path):
     print("======================================================================")
 
 if __name__ == "__main__":
-    bundle_songs("output", "songs_bundle.json")
+    # Le store en shards (02_scrape_lyrics.py --store song_store) est prioritaire s'il existe
+    bundle_songs("output", "songs_bundle.json",
+                 store="song_store" if is_store("song_store") else None)
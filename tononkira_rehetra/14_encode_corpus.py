@@ -0,0 +1,131 @@
+"""
+Pré-tokenisation du corpus consolidé avec le tokenizer de la Phase 5.
+
+Les blocs du corpus sont encodés par paquets avec encode_batch, qui répartit
+le paquet sur tous les cœurs (sans le GIL) ; pendant ce temps, le paquet
+suivant est lu et le précédent écrit. Les identifiants vont dans un store
+memmap (token_store.py) : les expériences suivantes le chargent
+instantanément au lieu de retokeniser le corpus.
+
+Le store est écrit sous des noms temporaires et meta.json en dernier : un
+store lisible est toujours complet.
+"""
+
+import os
+import json
+import time
+import argparse
+from array import array
+from collections import deque
+from itertools import chain, islice
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from tokenizers import Tokenizer
+
+from near_dedup import iter_blocks
+from token_store import TOKENS_FILE, OFFSETS_FILE, META_FILE, token_dtype
+
+def iter_documents(corpus_path):
+    """Blocs non vides (strippés) du corpus consolidé, lus en flux."""
+    with open(corpus_path, 'r', encoding='utf-8') as f_in:
+        for block in iter_blocks(f_in):
+            block = block.strip()
+            if block:
+                yield block
+
+def encode_batch(tokenizer, texts, dtype):
+    """(identifiants bout à bout, longueur de chaque document) d'un paquet."""
+    encodings = tokenizer.encode_batch(texts, add_special_tokens=False)
+    lengths = [len(e.ids) for e in encodings]
+    ids = np.fromiter(chain.from_iterable(e.ids for e in encodings), dtype=dtype, count=sum(lengths))
+    return ids, lengths, sum(len(t) for t in texts)
+
+def encode_corpus(corpus_path, tokenizer_path, output_dir, batch_size=2000):
+    print("======================================================================")
+    print("🔢 PRÉ-TOKENISATION DU CORPUS")
+    print(f"   Corpus    : {corpus_path}")
+    print(f"   Tokenizer : {tokenizer_path}")
+    print(f"   Sortie    : {output_dir}")
+    print("======================================================================")
+
+    for path in (corpus_path, tokenizer_path):
+        if not os.path.exists(path):
+            print(f"❌ Erreur : Le fichier {path} est introuvable.")
+            return
+
+    tokenizer = Tokenizer.from_file(tokenizer_path)
+    vocab_size = tokenizer.get_vocab_size()
+    dtype = token_dtype(vocab_size)
+    print(f"📖 Vocabulaire : {vocab_size} -> identifiants {np.dtype(dtype).name}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokens_path = os.path.join(output_dir, TOKENS_FILE)
+    offsets_path = os.path.join(output_dir, OFFSETS_FILE)
+    meta_path = os.path.join(output_dir, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    start = time.time()
+    offsets = array('q', [0])
+    total_chars = 0
+
+    def write(future):
+        nonlocal total_chars
+        ids, lengths, chars = future.result()
+        f_tokens.write(ids.tobytes())
+        for length in lengths:
+            offsets.append(offsets[-1] + length)
+        total_chars += chars
+
+    documents = iter_documents(corpus_path)
+    with open(tokens_path + ".tmp", 'wb') as f_tokens, ThreadPoolExecutor(max_workers=1) as executor:
+        # Un paquet en cours d'encodage pendant qu'on lit le suivant
+        pending = deque()
+        for number, batch in enumerate(iter(lambda: list(islice(documents, batch_size)), []), 1):
+            pending.append(executor.submit(encode_batch, tokenizer, batch, dtype))
+            if len(pending) > 1:
+                write(pending.popleft())
+            if number % 25 == 0:
+                print(f"   ⏳ {number * batch_size} documents lus...")
+        while pending:
+            write(pending.popleft())
+
+    np.save(offsets_path + ".tmp.npy", np.frombuffer(offsets, dtype=np.int64))
+    os.replace(tokens_path + ".tmp", tokens_path)
+    os.replace(offsets_path + ".tmp.npy", offsets_path)
+
+    documents_count = len(offsets) - 1
+    total_tokens = offsets[-1]
+    meta = {
+        "dtype": np.dtype(dtype).name,
+        "vocab_size": vocab_size,
+        "documents": documents_count,
+        "tokens": total_tokens,
+        "tokenizer": os.path.abspath(tokenizer_path),
+        "corpus": os.path.abspath(corpus_path),
+        "corpus_size": os.path.getsize(corpus_path),
+    }
+    with open(meta_path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+
+    elapsed = time.time() - start
+    print("======================================================================")
+    print(f"✅ CORPUS ENCODÉ !")
+    print(f"📊 {documents_count} documents, {total_tokens} tokens "
+          f"({total_chars / max(total_tokens, 1):.2f} caractères/token)")
+    print(f"⏱️ {elapsed:.1f}s ({total_tokens / max(elapsed, 1e-9):,.0f} tokens/s)")
+    print(f"💾 Store : {output_dir} ({os.path.getsize(tokens_path) / 1024 / 1024:.1f} MB de tokens)")
+    print(f"   Lecture : TokenCorpus(\"{output_dir}\") dans token_store.py")
+    print("======================================================================")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Encode le corpus en identifiants de tokens (store memmap).')
+    parser.add_argument('--corpus', type=str, default='malagasy_corpus_v2_final.txt', help='Corpus consolidé')
+    parser.add_argument('--tokenizer', type=str, default='tokenizer_mg/tokenizer-mg.json', help='Tokenizer de la Phase 5')
+    parser.add_argument('--output', type=str, default='corpus_tokens', help='Dossier du store de tokens')
+    parser.add_argument('--batch-size', type=int, default=2000, help='Documents par appel à encode_batch (défaut: 2000)')
+
+    args = parser.parse_args()
+    encode_corpus(args.corpus, args.tokenizer, args.output, batch_size=args.batch_size)
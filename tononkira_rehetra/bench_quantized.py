@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark des vecteurs quantifiés (quantized_store.py) face au float32.
+
+Pour chaque codage (int8, pq), construit le store à partir du modèle puis
+mesure, sur un échantillon de mots du vocabulaire et de fautes de frappe
+(mots hors vocabulaire, comme dans le correcteur de web_app) :
+  - la mémoire des tableaux (ce qui doit tenir en RAM pour servir) ;
+  - la latence de most_similar (moyenne et p95) ;
+  - le recouvrement des 10 plus proches voisins avec le modèle float ;
+  - l'accord avec le float du correcteur (spell_check.py) sur des non-mots
+    tirés au hasard : un codage qui leur donne le vecteur d'un vrai mot les
+    laisserait passer. Code de sortie 1 si l'accord est sous NONWORD_AGREEMENT.
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+from embedding_store import is_vector_store, load_vectors
+from quantized_store import QuantizedVectors, quantize, store_bytes
+from spell_check import check_word
+
+
+SEED = 42
+# Lettres absentes de l'alphabet malgache : des non-mots sûrs
+NONWORD_LETTERS = "cquwx"
+NONWORD_AGREEMENT = 0.95
+
+
+def load_float(model_path):
+    """Vecteurs float32 de référence : store de service ou modèle complet."""
+    if os.path.isdir(model_path) and is_vector_store(model_path):
+        return load_vectors(model_path)
+    from gensim.models import FastText
+    return FastText.load(model_path).wv
+
+
+def sample_queries(wv, count, rng):
+    """Mots du vocabulaire (tous rangs de fréquence) et fautes de frappe dérivées."""
+    words = wv.index_to_key
+    picked = [words[i] for i in rng.choice(len(words), min(count, len(words)), replace=False)]
+    typos = []
+    for word in picked:
+        if len(word) > 3:
+            i = int(rng.integers(1, len(word) - 1))
+            typo = word[:i] + word[i + 1:]
+            if typo not in wv.key_to_index:
+                typos.append(typo)
+    return picked, typos
+
+
+def random_nonwords(count, rng):
+    """`count` chaînes de 6 à 12 lettres étrangères au malgache."""
+    letters = list(NONWORD_LETTERS)
+    return ["".join(rng.choice(letters, int(rng.integers(6, 13)))) for _ in range(count)]
+
+
+def spelling_agreement(vectors, words, reference):
+    """Part des mots dont le verdict du correcteur est celui de `reference`."""
+    return float(np.mean([check_word(vectors, w)[0] == ref for w, ref in zip(words, reference)]))
+
+
+def time_queries(vectors, queries, topn):
+    """(résultats, latences en ms) de most_similar pour chaque requête."""
+    results, latencies = [], []
+    for word in queries:
+        start = time.perf_counter()
+        results.append([w for w, _ in vectors.most_similar(word, topn=topn)])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, np.array(latencies)
+
+
+def overlap(reference, results):
+    """Part moyenne des voisins de référence retrouvés."""
+    return float(np.mean([len(set(a) & set(b)) / max(len(a), 1) for a, b in zip(reference, results)]))
+
+
+def run_benchmark(model_path, words=200, topn=10, m=None, keep=None):
+    if not os.path.exists(model_path):
+        print(f"❌ Modèle {model_path} introuvable !")
+        return 1
+
+    wv = load_float(model_path)
+    rng = np.random.default_rng(SEED)
+    in_vocab, typos = sample_queries(wv, words, rng)
+    nonwords = random_nonwords(words, rng)
+    ref_nonwords = [check_word(wv, w)[0] for w in nonwords]
+    float_mb = (wv.vectors.nbytes + wv.vectors_ngrams.nbytes) / 1024 / 1024
+
+    print("=" * 70)
+    print("⏱️  BENCHMARK DES VECTEURS QUANTIFIÉS")
+    print(f"   Modèle   : {model_path}")
+    print(f"   Vecteurs : {len(wv)} mots + {wv.bucket} buckets, dimension {wv.vector_size}")
+    print(f"   Requêtes : {len(in_vocab)} mots du vocabulaire, {len(typos)} fautes de frappe, top-{topn}")
+    print(f"   Non-mots : {len(nonwords)} ({sum(ref_nonwords)} signalés par le correcteur en float)")
+    print("=" * 70)
+
+    ref_vocab, float_vocab_ms = time_queries(wv, in_vocab, topn)
+    ref_typos, float_typos_ms = time_queries(wv, typos, topn)
+    rows = [("float32", float_mb, 0.0, np.concatenate([float_vocab_ms, float_typos_ms]), 1.0, 1.0, 1.0)]
+
+    workdir = keep or tempfile.mkdtemp(prefix="quantized_")
+    try:
+        for method in ("int8", "pq"):
+            path = os.path.join(workdir, method)
+            start = time.perf_counter()
+            quantize(wv, path, method=method, m=m)
+            build = time.perf_counter() - start
+            vectors = QuantizedVectors(path)
+            got_vocab, vocab_ms = time_queries(vectors, in_vocab, topn)
+            got_typos, typos_ms = time_queries(vectors, typos, topn)
+            rows.append((method, store_bytes(path) / 1024 / 1024, build,
+                         np.concatenate([vocab_ms, typos_ms]),
+                         overlap(ref_vocab, got_vocab), overlap(ref_typos, got_typos),
+                         spelling_agreement(vectors, nonwords, ref_nonwords)))
+    finally:
+        if keep is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'Version':<9} {'Mémoire':>10} {'Gain':>6} {'Création':>9} {'Moy.':>8} {'p95':>8} "
+          f"{'Top-10 voc.':>12} {'Top-10 fautes':>14} {'Non-mots':>9}")
+    print("-" * 70)
+    for name, mb, build, latencies, ov_vocab, ov_typos, agreement in rows:
+        print(f"{name:<9} {mb:>8.1f}MB {float_mb / mb:>5.1f}x {build:>8.1f}s "
+              f"{latencies.mean():>6.2f}ms {np.percentile(latencies, 95):>6.2f}ms "
+              f"{ov_vocab:>11.1%} {ov_typos:>13.1%} {agreement:>8.1%}")
+    print("=" * 70)
+    if keep:
+        print(f"💾 Stores gardés dans {keep}")
+
+    failing = [row[0] for row in rows if row[6] < NONWORD_AGREEMENT]
+    if failing:
+        print(f"❌ Correcteur en désaccord avec le float sur les non-mots : {', '.join(failing)} "
+              f"(minimum {NONWORD_AGREEMENT:.0%})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark mémoire / latence / qualité des vecteurs int8 et pq"
+    )
+    parser.add_argument(
+        "--model", type=str, default="embeddings_mg/malagasy_fasttext.model",
+        help="Modèle FastText ou store de service (embeddings_mg/serving)"
+    )
+    parser.add_argument(
+        "--words", type=int, default=200,
+        help="Nombre de mots du vocabulaire interrogés (défaut: 200)"
+    )
+    parser.add_argument(
+        "--topn", type=int, default=10,
+        help="Voisins comparés au modèle float (défaut: 10)"
+    )
+    parser.add_argument(
+        "--m", type=int, default=None,
+        help="Sous-vecteurs en pq (défaut: dimension / 4)"
+    )
+    parser.add_argument(
+        "--keep", type=str, default=None,
+        help="Garder les stores construits dans ce dossier"
+    )
+    args = parser.parse_args()
+    sys.exit(run_benchmark(args.model, words=args.words, topn=args.topn, m=args.m, keep=args.keep))
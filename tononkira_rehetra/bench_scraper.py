@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark hors-ligne du scraper (Phase 2) contre une archive rejouée.
+Démarre replay_server.py en local avec une latence / un taux d'erreur
+donnés, lance 02_scrape_lyrics.py avec chaque moteur (threads, async) sur
+les artistes de l'archive, et compare chansons/s et latences p50/p95/p99.
+
+L'archive se crée une fois sur le vrai site :
+    python3 02_scrape_lyrics.py --artist <slug> --record crawl_archive.sqlite
+"""
+
+import sys
+import time
+import json
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+from replay_server import CrawlArchive, start_server, ORIGIN
+from script_tools import load_script
+
+
+def percentile(values, q):
+    """Percentile `q` (0-100) par rang le plus proche ; 0 si pas de valeurs."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_engine(phase2, engine, artists_file, base_url, workdir, options):
+    """Un crawl complet depuis zéro ; retourne (chansons sauvées, durée, latences)."""
+    output_dir = workdir / f"output_{engine}"
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+    phase2.REQUEST_LATENCIES = []
+    start = time.perf_counter()
+    result = phase2.run_scraping(
+        artists_file=str(artists_file),
+        output_dir=str(output_dir),
+        delay=options["delay"],
+        song_workers=options["song_workers"],
+        artist_workers=options["artist_workers"],
+        engine=engine,
+        max_inflight=options["max_inflight"],
+        rate=0,
+        state_db=None,
+        http_cache=None,
+        parser=options["parser"],
+        base_url=base_url
+    )
+    elapsed = time.perf_counter() - start
+    latencies, phase2.REQUEST_LATENCIES = phase2.REQUEST_LATENCIES, None
+    saved = result[0] if result else 0
+    return saved, elapsed, latencies
+
+
+def run_benchmark(archive_path, engines, latency=0.05, jitter=0.0, error_rate=0.0,
+                  origin=ORIGIN, **options):
+    archive = CrawlArchive(archive_path)
+    slugs = archive.artist_slugs()
+    if not slugs:
+        print(f"❌ Aucune page d'artiste dans {archive_path} (enregistrez avec --record)")
+        archive.close()
+        return 1
+
+    server, base_url = start_server(archive, latency=latency, jitter=jitter,
+                                    error_rate=error_rate, origin=origin)
+    phase2 = load_script("02_scrape_lyrics.py", "scrape_lyrics")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_scraper_") as tmp:
+        workdir = Path(tmp)
+        artists_file = workdir / "artists.json"
+        with open(artists_file, "w", encoding="utf-8") as f:
+            json.dump([{"name": slug, "slug": slug} for slug in slugs], f)
+
+        print("=" * 70)
+        print("⏱️  BENCHMARK DU SCRAPER (REJEU LOCAL)")
+        print(f"   Archive  : {archive_path} ({archive.count()} réponses, {len(slugs)} artistes)")
+        print(f"   Serveur  : {base_url}")
+        print(f"   Latence  : {latency * 1000:.0f} ms (+ jitter {jitter * 1000:.0f} ms)")
+        print(f"   Erreurs  : {error_rate:.1%}")
+        print("=" * 70)
+
+        for engine in engines:
+            saved, elapsed, latencies = run_engine(phase2, engine, artists_file,
+                                                   base_url, workdir, options)
+            results.append((engine, saved, elapsed, latencies))
+
+    server.shutdown()
+    archive.close()
+
+    print(f"\n{'Moteur':<10} {'Chansons':>9} {'Durée':>9} {'Chansons/s':>11} "
+          f"{'p50':>8} {'p95':>8} {'p99':>8}")
+    print("-" * 70)
+    for engine, saved, elapsed, latencies in results:
+        p50, p95, p99 = (percentile(latencies, q) * 1000 for q in (50, 95, 99))
+        print(f"{engine:<10} {saved:>9} {elapsed:>8.2f}s {saved / elapsed:>11.1f} "
+              f"{p50:>6.0f}ms {p95:>6.0f}ms {p99:>6.0f}ms")
+    print("=" * 70)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark du scraper (threads vs async) contre une archive rejouée"
+    )
+    parser.add_argument("--archive", type=str, default="crawl_archive.sqlite",
+                        help="Archive SQLite créée par 02_scrape_lyrics.py --record")
+    parser.add_argument("--engines", type=str, default="threads,async",
+                        help="Moteurs à comparer, séparés par des virgules (défaut: threads,async)")
+    parser.add_argument("--latency", type=float, default=50.0,
+                        help="Latence simulée par réponse, en ms (défaut: 50)")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="Latence aléatoire supplémentaire max, en ms (défaut: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Probabilité de répondre 503 (défaut: 0)")
+    parser.add_argument("--origin", type=str, default=ORIGIN,
+                        help="Site d'origine de l'archive, réécrit vers le serveur local")
+    parser.add_argument("--song-workers", type=int, default=5,
+                        help="Moteur threads : chansons en parallèle (défaut: 5)")
+    parser.add_argument("--artist-workers", type=int, default=2,
+                        help="Moteur threads : artistes en parallèle (défaut: 2)")
+    parser.add_argument("--max-inflight", type=int, default=20,
+                        help="Moteur async : requêtes en vol max (défaut: 20)")
+    parser.add_argument("--delay", type=float, default=0.2,
+                        help="Délai de base du backoff des retries (défaut: 0.2)")
+    parser.add_argument("--parser", type=str, default="bs4", choices=["auto", "bs4", "lxml"],
+                        help="Backend d'extraction des paroles (défaut: bs4)")
+    args = parser.parse_args()
+
+    sys.exit(run_benchmark(
+        args.archive,
+        [e.strip() for e in args.engines.split(",") if e.strip()],
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        origin=args.origin,
+        delay=args.delay,
+        song_workers=args.song_workers,
+        artist_workers=args.artist_workers,
+        max_inflight=args.max_inflight,
+        parser=args.parser
+    ))
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark du parser de pages de chanson : bs4 (historique) vs lxml.
+Vérifie sur des pages HTML sauvegardées que chaque backend produit
+exactement le même fichier .txt (octet par octet) que bs4, puis mesure le
+débit de chacun.
+
+Les fixtures sont des fichiers .html dans un dossier. --download N en
+récupère N depuis les chansons déjà sauvées dans crawl_state.sqlite.
+"""
+
+import sys
+import time
+import argparse
+import hashlib
+import sqlite3
+from pathlib import Path
+
+from script_tools import load_script
+
+
+def download_fixtures(phase2, fixtures_dir, state_db, count):
+    """Sauvegarde `count` pages de chanson (déjà scrapées avec succès) comme fixtures."""
+    conn = sqlite3.connect(state_db)
+    urls = [r[0] for r in conn.execute(
+        "SELECT url FROM songs WHERE status = 'saved' ORDER BY RANDOM() LIMIT ?", (count,)
+    )]
+    conn.close()
+
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    saved = 0
+    for url in urls:
+        html = phase2.fetch_page(url)
+        if not html:
+            continue
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+        (fixtures_dir / f"{name}.html").write_text(f"<!-- {url} -->\n{html}", encoding="utf-8")
+        saved += 1
+    print(f"📥 {saved} fixtures sauvegardées dans {fixtures_dir}")
+
+
+def load_fixtures(fixtures_dir):
+    """Retourne [(nom, url, html)] ; l'URL est lue dans le commentaire de tête s'il existe."""
+    pages = []
+    for path in sorted(fixtures_dir.glob("*.html")):
+        html = path.read_text(encoding="utf-8")
+        url = path.stem
+        if html.startswith("<!-- "):
+            url = html[5:html.index(" -->")]
+        pages.append((path.name, url, html))
+    return pages
+
+
+def render(phase2, song_info, url):
+    return None if song_info is None else phase2.format_song(song_info, url).encode("utf-8")
+
+
+def time_backend(fn, pages, repeat):
+    """Meilleur temps (secondes) sur `repeat` passes complètes des fixtures."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _, url, html in pages:
+            fn(html, url)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(fixtures_dir, repeat=5):
+    phase2 = load_script("02_scrape_lyrics.py", "scrape_lyrics")
+    pages = load_fixtures(fixtures_dir)
+    if not pages:
+        print(f"❌ Aucune fixture .html dans {fixtures_dir}")
+        return 1
+
+    total_bytes = sum(len(html.encode("utf-8")) for _, _, html in pages)
+
+    print("=" * 70)
+    print("⏱️  BENCHMARK DU PARSER DE CHANSONS")
+    print(f"   Fixtures : {len(pages)} pages ({total_bytes / 1024 / 1024:.2f} MB)")
+    print(f"   Passes   : {repeat}")
+    print("=" * 70)
+
+    reference = phase2.SONG_PARSERS["bs4"]
+    mismatches = 0
+    for name, fn in phase2.SONG_PARSERS.items():
+        if name == "bs4":
+            continue
+        for page_name, url, html in pages:
+            expected = render(phase2, reference(html, url), url)
+            got = render(phase2, fn(html, url), url)
+            if expected != got:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"   ❌ {name} diffère sur {page_name}")
+                    print(f"      bs4  : {expected[:120]!r}" if expected else "      bs4  : None")
+                    print(f"      {name:<5}: {got[:120]!r}" if got else f"      {name:<5}: None")
+
+    print(f"\n🔍 Conformité : {len(pages) - mismatches}/{len(pages)} pages identiques octet par octet")
+
+    print(f"\n{'Backend':<10} {'Temps':>10} {'Pages/s':>10} {'MB/s':>8} {'Speedup':>9}")
+    print("-" * 70)
+    base_time = None
+    for name, fn in phase2.SONG_PARSERS.items():
+        elapsed = time_backend(fn, pages, repeat)
+        if base_time is None:
+            base_time = elapsed
+        print(f"{name:<10} {elapsed:>9.3f}s {len(pages) / elapsed:>10.1f} "
+              f"{total_bytes / 1024 / 1024 / elapsed:>8.2f} {base_time / elapsed:>8.2f}x")
+
+    print("=" * 70)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark et conformité des parsers de pages de chanson"
+    )
+    parser.add_argument(
+        "--fixtures", type=str, default="fixtures/songs",
+        help="Dossier des pages .html sauvegardées (défaut: fixtures/songs)"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5,
+        help="Nombre de passes chronométrées, on garde la meilleure (défaut: 5)"
+    )
+    parser.add_argument(
+        "--download", type=int, default=0,
+        help="Télécharge d'abord N pages de chansons déjà scrapées comme fixtures"
+    )
+    parser.add_argument(
+        "--state-db", type=str, default="crawl_state.sqlite",
+        help="Base d'état du crawl où piocher les URLs pour --download"
+    )
+    args = parser.parse_args()
+
+    fixtures_dir = Path(args.fixtures)
+    if args.download > 0:
+        phase2 = load_script("02_scrape_lyrics.py", "scrape_lyrics")
+        download_fixtures(phase2, fixtures_dir, args.state_db, args.download)
+    sys.exit(run_benchmark(fixtures_dir, repeat=args.repeat))
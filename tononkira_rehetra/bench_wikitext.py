@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark du nettoyage de wikitext : suite de re.sub (historique)
+vs nettoyeur en une passe (wikitext.py).
+
+Lit le wikitext brut des N premiers articles du dump, mesure le débit
+(MB/s de wikitext en entrée) de chaque version et compte le balisage
+resté dans le texte produit ({{, }}, [[, {|, <ref...) : les deux versions
+ne donnent pas le même texte, la nouvelle gère les modèles imbriqués.
+
+--check vérifie sans dump les régressions de débit : sur de la prose sans
+balisage, la version en une passe doit rester au moins à MIN_RATIO du débit
+de la suite de re.sub, et les entrées pathologiques (délimiteurs jamais
+refermés, caractère isolé après un long texte) doivent rester linéaires.
+Code de sortie 1 en cas de régression.
+"""
+
+import sys
+import bz2
+import time
+import random
+import argparse
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from script_tools import load_script
+
+
+# Restes de balisage comptés dans la sortie
+RESIDUE = ("{{", "}}", "[[", "]]", "{|", "|}", "<ref", "&lt;ref")
+
+# --check : débit minimal face aux re.sub, et croissance maximale du temps
+# quand l'entrée est multipliée par SCALE (linéaire : SCALE)
+MIN_RATIO = 0.5
+SCALE = 4
+MAX_GROWTH = 2 * SCALE
+# Motifs répétés jusqu'à former une entrée pathologique
+PATHOLOGICAL = {
+    "[[ non refermés": "[[a ",
+    "[http non refermés": "[http://x a ",
+    "{{ non refermés": "{{a ",
+    "{| en milieu de ligne": "x {| ",
+    "{ isolé": "{" + "a" * 50,
+}
+PROSE_WORDS = ("ny", "fiainana", "tanàna", "Madagasikara", "izy", "ary", "nanao",
+               "ho", "amin'ny", "teny", "olona", "tamin'ny")
+
+
+def load_sample(dump_path, pages):
+    """Wikitext brut des `pages` premiers articles du dump (hors pages spéciales)."""
+    texts = []
+    with bz2.open(dump_path, "rb") as f:
+        for event, elem in ET.iterparse(f, events=("end",)):
+            if elem.tag.split("}")[-1] != "page":
+                continue
+            title = elem.find(".//{*}title").text
+            text_elem = elem.find(".//{*}revision/{*}text")
+            if title and ":" not in title and text_elem is not None and text_elem.text:
+                texts.append(text_elem.text)
+            elem.clear()
+            if len(texts) >= pages:
+                break
+    return texts
+
+
+def time_cleaner(fn, texts, repeat):
+    """Meilleur temps (secondes) sur `repeat` passes complètes de l'échantillon."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def make_prose(paragraphs=2000, seed=0):
+    """Texte sans balisage : des paragraphes de mots malgaches séparés par des lignes vides."""
+    rng = random.Random(seed)
+    return "\n\n".join(" ".join(rng.choice(PROSE_WORDS) for _ in range(120)) + "."
+                       for _ in range(paragraphs))
+
+
+def run_checks(repeat=3):
+    """Régressions de débit de la version en une passe ; 0 si tout passe, 1 sinon."""
+    phase11 = load_script("11_extract_wiki.py", "extract_wiki")
+    prose = make_prose()
+    mb = len(prose.encode("utf-8")) / 1024 / 1024
+    failures = 0
+
+    print("=" * 70)
+    print("🔍 RÉGRESSIONS DE DÉBIT DU NETTOYAGE WIKITEXT")
+    print("=" * 70)
+
+    regex_rate = mb / time_cleaner(phase11.clean_wiki_text_regex, [prose], repeat)
+    new_rate = mb / time_cleaner(phase11.clean_wiki_text, [prose], repeat)
+    ok = new_rate >= MIN_RATIO * regex_rate
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} Prose ({mb:.1f} MB) : une passe {new_rate:.1f} MB/s, "
+          f"regex {regex_rate:.1f} MB/s (minimum {MIN_RATIO:.0%})")
+
+    for name, piece in PATHOLOGICAL.items():
+        small = time_cleaner(phase11.clean_wiki_text, [piece * 4000], repeat)
+        large = time_cleaner(phase11.clean_wiki_text, [piece * 4000 * SCALE], repeat)
+        growth = large / small
+        ok = growth <= MAX_GROWTH
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {name:<22} : x{SCALE} en entrée -> x{growth:.1f} en temps "
+              f"({large * 1000:.0f} ms, maximum x{MAX_GROWTH})")
+
+    print("=" * 70)
+    return 1 if failures else 0
+
+
+def run_benchmark(dump_path, pages=2000, repeat=3):
+    if not Path(dump_path).exists():
+        print(f"❌ Dump {dump_path} introuvable !")
+        return 1
+
+    phase11 = load_script("11_extract_wiki.py", "extract_wiki")
+    texts = load_sample(dump_path, pages)
+    if not texts:
+        print(f"❌ Aucun article dans {dump_path}")
+        return 1
+    total_bytes = sum(len(t.encode("utf-8")) for t in texts)
+
+    print("=" * 70)
+    print("⏱️  BENCHMARK DU NETTOYAGE WIKITEXT")
+    print(f"   Échantillon : {len(texts)} articles ({total_bytes / 1024 / 1024:.2f} MB)")
+    print(f"   Passes      : {repeat}")
+    print("=" * 70)
+
+    cleaners = {
+        "regex": phase11.clean_wiki_text_regex,
+        "une passe": phase11.clean_wiki_text,
+    }
+
+    print(f"\n{'Version':<10} {'Temps':>9} {'MB/s':>8} {'Speedup':>8} {'Sortie':>10} {'Restes':>8}")
+    print("-" * 70)
+    base_time = None
+    residues = {}
+    for name, fn in cleaners.items():
+        elapsed = time_cleaner(fn, texts, repeat)
+        if base_time is None:
+            base_time = elapsed
+        outputs = [fn(t) for t in texts]
+        residues[name] = {r: sum(o.count(r) for o in outputs) for r in RESIDUE}
+        out_mb = sum(len(o.encode("utf-8")) for o in outputs) / 1024 / 1024
+        print(f"{name:<10} {elapsed:>8.3f}s {total_bytes / 1024 / 1024 / elapsed:>8.2f} "
+              f"{base_time / elapsed:>7.2f}x {out_mb:>8.2f}MB {sum(residues[name].values()):>8}")
+
+    print("\n🔍 Balisage restant dans la sortie :")
+    print("   " + " " * 10 + " ".join(f"{r:>7}" for r in RESIDUE))
+    for name, counts in residues.items():
+        print(f"   {name:<10}" + " ".join(f"{counts[r]:>7}" for r in RESIDUE))
+    print("=" * 70)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark du nettoyage wikitext : re.sub successifs vs une passe"
+    )
+    parser.add_argument(
+        "--dump", type=str, default="../mgwiki-latest-pages-articles.xml.bz2",
+        help="Dump .xml.bz2 où prendre l'échantillon"
+    )
+    parser.add_argument(
+        "--pages", type=int, default=2000,
+        help="Nombre d'articles de l'échantillon (défaut: 2000)"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Nombre de passes chronométrées, on garde la meilleure (défaut: 3)"
+    )
+    parser.add_argument(
+        "--check", action="store_true",
+        help="Vérifie les régressions de débit sur des entrées synthétiques (sans dump)"
+    )
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(run_checks(repeat=args.repeat))
+    sys.exit(run_benchmark(args.dump, pages=args.pages, repeat=args.repeat))
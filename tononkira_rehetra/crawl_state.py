@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+État persistant du crawl (SQLite) pour la Phase 2.
+Garde la trace des artistes, des pages de liste et de chaque URL de chanson
+(statut, code HTTP, nombre de tentatives, date du dernier fetch).
+
+Après un crash, un artiste dont toutes les pages de liste sont déjà en base
+ne génère plus aucune requête de liste : on repart directement des chansons
+encore à faire. Les échecs sont enregistrés et peuvent être relancés seuls.
+"""
+
+import sqlite3
+import threading
+from datetime import datetime
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artists (
+    slug        TEXT PRIMARY KEY,
+    name        TEXT,
+    last_page   INTEGER,
+    listed      INTEGER NOT NULL DEFAULT 0,
+    updated_at  TEXT
+);
+
+CREATE TABLE IF NOT EXISTS listing_pages (
+    artist_slug TEXT NOT NULL,
+    page        INTEGER NOT NULL,
+    status      TEXT NOT NULL,
+    http_code   INTEGER,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    fetched_at  TEXT,
+    PRIMARY KEY (artist_slug, page)
+);
+
+CREATE TABLE IF NOT EXISTS songs (
+    artist_slug TEXT NOT NULL,
+    url         TEXT NOT NULL,
+    titre_slug  TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',
+    http_code   INTEGER,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    fetched_at  TEXT,
+    PRIMARY KEY (artist_slug, url)
+);
+
+CREATE INDEX IF NOT EXISTS idx_songs_status ON songs (artist_slug, status);
+"""
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class CrawlState:
+    """Accès thread-safe à la base d'état du crawl.
+
+    Une seule connexion partagée, protégée par un verrou : les écritures
+    sont minuscules et bien plus rares que les requêtes HTTP.
+    """
+
+    def __init__(self, db_path="crawl_state.sqlite"):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # --------------------------------------------------------
+    # Artistes
+    # --------------------------------------------------------
+
+    def get_artist(self, slug):
+        """Retourne (last_page, listed) ou None si l'artiste est inconnu."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT last_page, listed FROM artists WHERE slug = ?", (slug,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], bool(row[1])
+
+    def set_last_page(self, slug, name, last_page):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO artists (slug, name, last_page, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(slug) DO UPDATE SET name = excluded.name, "
+                "last_page = excluded.last_page, updated_at = excluded.updated_at",
+                (slug, name, last_page, _now())
+            )
+            self.conn.commit()
+
+    def mark_artist_listed(self, slug):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE artists SET listed = 1, updated_at = ? WHERE slug = ?",
+                (_now(), slug)
+            )
+            self.conn.commit()
+
+    # --------------------------------------------------------
+    # Pages de liste
+    # --------------------------------------------------------
+
+    def done_pages(self, slug):
+        """Numéros des pages de liste déjà parcourues avec succès."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT page FROM listing_pages WHERE artist_slug = ? AND status = 'done'",
+                (slug,)
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def record_listing_page(self, slug, page, http_code, songs=None):
+        """Enregistre le résultat d'une page de liste et les chansons trouvées.
+
+        `songs` est la liste de tuples (url, titre_slug) extraite de la page,
+        ou None si le téléchargement a échoué. Tout est écrit dans une seule
+        transaction : une page n'est "done" que si ses chansons sont en base.
+        """
+        status = "done" if songs is not None else "failed"
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO listing_pages (artist_slug, page, status, http_code, attempts, fetched_at) "
+                "VALUES (?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT(artist_slug, page) DO UPDATE SET status = excluded.status, "
+                "http_code = excluded.http_code, attempts = attempts + 1, "
+                "fetched_at = excluded.fetched_at",
+                (slug, page, status, http_code, _now())
+            )
+            if songs:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO songs (artist_slug, url, titre_slug) VALUES (?, ?, ?)",
+                    [(slug, url, titre) for url, titre in songs]
+                )
+            self.conn.commit()
+
+    # --------------------------------------------------------
+    # Chansons
+    # --------------------------------------------------------
+
+    def songs_to_fetch(self, slug, retry_failed=False):
+        """Chansons de l'artiste encore à télécharger, sous forme (url, titre_slug).
+
+        Par défaut seules les chansons jamais tentées ('pending') sont
+        renvoyées ; avec retry_failed les échecs réseau sont relancés aussi.
+        """
+        statuses = ("pending", "failed") if retry_failed else ("pending",)
+        placeholders = ", ".join("?" for _ in statuses)
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT url, titre_slug FROM songs WHERE artist_slug = ? "
+                f"AND status IN ({placeholders}) ORDER BY rowid",
+                (slug, *statuses)
+            ).fetchall()
+        return [(r[0], r[1]) for r in rows]
+
+    def song_urls(self, slug):
+        """Toutes les URLs de chansons connues pour l'artiste, quel que soit leur statut."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url FROM songs WHERE artist_slug = ?", (slug,)
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    def count_songs(self, slug):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM songs WHERE artist_slug = ?", (slug,)
+            ).fetchone()[0]
+
+    def record_song(self, slug, url, status, http_code=None):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE songs SET status = ?, http_code = ?, attempts = attempts + 1, "
+                "fetched_at = ? WHERE artist_slug = ? AND url = ?",
+                (status, http_code, _now(), slug, url)
+            )
+            self.conn.commit()
+
+    def summary(self):
+        """Nombre de chansons par statut, pour le résumé final."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT status, COUNT(*) FROM songs GROUP BY status"
+            ).fetchall()
+        return dict(rows)
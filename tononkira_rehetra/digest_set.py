@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ensemble compact d'empreintes blake2b pour le dédoublonnage du corpus.
+
+Au lieu de garder chaque bloc de texte en entier dans un set(), on ne garde
+que son empreinte de 8 (ou 16) octets, dans une table à adressage ouvert
+stockée dans un array('Q') : ~12 à 16 octets par bloc au lieu de la
+taille du texte plus ~100 octets d'objets Python.
+
+Au-delà du budget mémoire, la table est déversée dans une base SQLite
+temporaire et vidée ; les recherches consultent alors la table puis le
+disque. Le résultat est celui d'un dédoublonnage exact, sauf collision
+d'empreintes (probabilité estimée par expected_collisions()).
+"""
+
+import os
+import struct
+import sqlite3
+import hashlib
+from array import array
+
+
+INITIAL_CAPACITY = 1 << 16
+MAX_LOAD = 0.6
+
+
+class DigestSet:
+    """Ensemble d'empreintes de textes, en mémoire bornée.
+
+    `digest_size` : 8 ou 16 octets. `memory_budget` : taille max de la table
+    en octets. `spill_path` : base SQLite utilisée au-delà du budget (créée à
+    la demande, supprimée par close()). Une base laissée par un run
+    interrompu est effacée à la création : ses empreintes ne comptent pas.
+    """
+
+    def __init__(self, digest_size=8, memory_budget=512 * 1024 * 1024, spill_path=None):
+        if digest_size not in (8, 16):
+            raise ValueError("digest_size doit valoir 8 ou 16")
+        self.digest_size = digest_size
+        self.words = digest_size // 8
+        self.format = f"<{self.words}Q"
+        self.memory_budget = memory_budget
+        self.spill_path = spill_path or "dedup_spill.sqlite"
+        self.conn = None
+        self._remove_spill()
+        self.spilled = 0
+        self.spills = 0
+        self.total = 0
+        self.duplicates = 0
+        capacity = INITIAL_CAPACITY
+        while capacity > 1024 and capacity * digest_size > memory_budget:
+            capacity //= 2
+        self._reset(capacity)
+
+    def _reset(self, capacity):
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.table = array("Q", bytes(8 * self.words * capacity))
+        self.count = 0
+
+    # --------------------------------------------------------
+    # Table en mémoire
+    # --------------------------------------------------------
+
+    def _find(self, key):
+        """Position du slot de `key` (tuple de mots) : (index, déjà présent)."""
+        table, words = self.table, self.words
+        i = key[0] & self.mask
+        while True:
+            base = i * words
+            current = table[base]
+            if current == 0:
+                return base, False
+            if current == key[0] and (words == 1 or table[base + 1] == key[1]):
+                return base, True
+            i = (i + 1) & self.mask
+
+    def _insert(self, base, key):
+        self.table[base] = key[0]
+        if self.words == 2:
+            self.table[base + 1] = key[1]
+        self.count += 1
+
+    def _keys(self):
+        table, words = self.table, self.words
+        for base in range(0, len(table), words):
+            if table[base]:
+                yield tuple(table[base:base + words])
+
+    def _grow(self):
+        """Double la table, ou la déverse sur disque si le budget serait dépassé."""
+        if 2 * self.capacity * 8 * self.words > self.memory_budget:
+            self._spill()
+            return
+        keys = list(self._keys())
+        self._reset(2 * self.capacity)
+        for key in keys:
+            self._insert(self._find(key)[0], key)
+
+    # --------------------------------------------------------
+    # Débordement sur disque
+    # --------------------------------------------------------
+
+    def _spill(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.spill_path)
+            self.conn.execute("PRAGMA journal_mode=OFF")
+            self.conn.execute("PRAGMA synchronous=OFF")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS digests (d BLOB PRIMARY KEY) WITHOUT ROWID"
+            )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO digests (d) VALUES (?)",
+            ((struct.pack(self.format, *key),) for key in self._keys())
+        )
+        self.conn.commit()
+        self.spilled += self.count
+        self.spills += 1
+        self._reset(self.capacity)
+
+    def _remove_spill(self):
+        if os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+
+    def _on_disk(self, key):
+        return self.conn.execute(
+            "SELECT 1 FROM digests WHERE d = ?", (struct.pack(self.format, *key),)
+        ).fetchone() is not None
+
+    # --------------------------------------------------------
+    # API
+    # --------------------------------------------------------
+
+    def key(self, text):
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=self.digest_size).digest()
+        key = struct.unpack(self.format, digest)
+        # 0 marque un slot vide : l'empreinte 0 est confondue avec 1
+        return key if key[0] else (1,) + key[1:]
+
+    def add(self, text):
+        """Ajoute `text` ; retourne True s'il était nouveau, False si doublon."""
+        key = self.key(text)
+        base, found = self._find(key)
+        if found or (self.conn is not None and self._on_disk(key)):
+            self.duplicates += 1
+            return False
+        self._insert(base, key)
+        self.total += 1
+        if self.count > MAX_LOAD * self.capacity:
+            self._grow()
+        return True
+
+    def __len__(self):
+        return self.total
+
+    def memory_bytes(self):
+        return self.table.itemsize * len(self.table)
+
+    def expected_collisions(self):
+        """Nombre attendu de paires de blocs distincts à la même empreinte (paradoxe des anniversaires)."""
+        n = self.total
+        return n * (n - 1) / 2 / float(2 ** (8 * self.digest_size))
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        self._remove_spill()
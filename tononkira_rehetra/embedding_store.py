@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vecteurs FastText allégés pour le service (web_app/app.py, 12_test_app.py).
+
+FastText.load() charge tout le modèle d'entraînement (poids de sortie,
+buckets de n-grammes par mot, comptes...) et recompose chaque vecteur de
+mot en Python : démarrage lent et plusieurs centaines de MB de RSS par
+processus. Le store ne garde que ce qu'il faut pour les requêtes :
+
+    embeddings_mg/serving/
+    ├── meta.json           # dimension, min_n / max_n, nombre de buckets, mots (ordre de fréquence)
+    ├── vectors.npy         # vecteurs des mots (déjà recomposés avec leurs n-grammes)
+    ├── vectors_ngrams.npy  # buckets de n-grammes (mots hors vocabulaire)
+    ├── norms.npy           # normes des vecteurs (most_similar)
+    └── counts.npy          # fréquence de chaque mot dans le corpus
+
+Les tableaux sont ouverts avec mmap='r' : le chargement ne lit presque rien,
+et plusieurs processus (workers Flask/gunicorn) partagent les mêmes pages
+via le cache du système. L'objet rendu est un FastTextKeyedVectors gensim :
+most_similar, get_vecattr(mot, "count"), vecteurs hors vocabulaire...
+
+Usage :
+    python3 embedding_store.py --model embeddings_mg/malagasy_fasttext.model --output embeddings_mg/serving
+"""
+
+import os
+import json
+import shutil
+import argparse
+
+import numpy as np
+from gensim.models.fasttext import FastTextKeyedVectors
+
+
+META_FILE = "meta.json"
+ARRAYS = ("vectors", "vectors_ngrams", "norms", "counts")
+
+
+def is_vector_store(path):
+    return os.path.exists(os.path.join(path, META_FILE))
+
+
+def export_vectors(wv, output_dir):
+    """Écrit le store de service de `wv` (FastTextKeyedVectors d'un modèle entraîné).
+
+    Écrit dans <output_dir>.tmp puis renommé : un store présent est complet.
+    """
+    tmp = output_dir.rstrip("/\\") + ".tmp"
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+
+    wv.fill_norms()
+    arrays = {
+        "vectors": wv.vectors,
+        "vectors_ngrams": wv.vectors_ngrams,
+        "norms": wv.norms,
+        "counts": np.array([wv.get_vecattr(w, "count") for w in wv.index_to_key], dtype=np.int64),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(array))
+    with open(os.path.join(tmp, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({"vector_size": wv.vector_size, "min_n": wv.min_n, "max_n": wv.max_n,
+                   "bucket": wv.bucket, "words": wv.index_to_key}, f, ensure_ascii=False)
+
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.replace(tmp, output_dir)
+    return output_dir
+
+
+def load_vectors(path, mmap='r'):
+    """FastTextKeyedVectors en lecture seule sur les tableaux du store (mmap='r'
+    par défaut ; mmap=None les charge en RAM)."""
+    with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap) for name in ARRAYS}
+
+    wv = FastTextKeyedVectors(meta["vector_size"], meta["min_n"], meta["max_n"], meta["bucket"])
+    wv.index_to_key = meta["words"]
+    wv.key_to_index = {word: i for i, word in enumerate(wv.index_to_key)}
+    wv.next_index = len(wv.index_to_key)
+    wv.vectors = arrays["vectors"]
+    wv.vectors_ngrams = arrays["vectors_ngrams"]
+    wv.norms = arrays["norms"]
+    wv.expandos["count"] = arrays["counts"]
+    return wv
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporte les vecteurs d'un modèle FastText pour le service")
+    parser.add_argument("--model", type=str, default="embeddings_mg/malagasy_fasttext.model",
+                        help="Modèle FastText entraîné (08_train_embeddings.py)")
+    parser.add_argument("--output", type=str, default="embeddings_mg/serving", help="Dossier du store")
+    args = parser.parse_args()
+
+    from gensim.models import FastText
+    model = FastText.load(args.model)
+    export_vectors(model.wv, args.output)
+    print(f"✅ {len(model.wv)} vecteurs exportés dans {args.output} "
+          f"({directory_size(args.output) / 1024 / 1024:.1f} MB)")
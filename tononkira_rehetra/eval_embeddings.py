@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Évaluation des hyperparamètres FastText (08_train_embeddings.py).
+
+Entraîne une grille de configurations (dimension, fenêtre, min_count,
+skip-gram / CBOW, epochs), chacune dans son propre processus : la mémoire
+d'un modèle est rendue au système avant le suivant, le pic RSS est propre
+à chaque configuration et un plantage n'arrête pas le balayage. Chaque
+modèle est noté sur :
+  - eval_mg/similarity_mg.tsv : corrélation de Spearman entre des notes de
+    proximité données à la main et les cosinus du modèle ;
+  - eval_mg/analogies_mg.txt : analogies a:b :: c:d (masculin/féminin,
+    contraires, verbe mi-/man- -> nom fi-/fan- -ana, possessif -ko,
+    ordinaux faha-) ;
+  - le correcteur de web_app (spell_check.py) : précision / rappel sur des
+    mots du vocabulaire biblique (from_bible_json) et des fautes de frappe
+    qui en sont dérivées ;
+  - le temps d'entraînement et la taille des vecteurs de service.
+
+Les résultats sont ajoutés à <output>/results.jsonl : une configuration
+déjà évaluée sur le même corpus n'est pas réentraînée (--force pour la
+refaire).
+
+Usage :
+    python3 eval_embeddings.py --corpus malagasy_corpus_normalized.txt \\
+        --size 50 100 --window 3 5 --sg 0 1 --epochs 5 10
+    python3 eval_embeddings.py --model embeddings_mg/serving   # modèle existant seul
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import itertools
+import contextlib
+
+from embedding_store import directory_size, is_vector_store, load_vectors
+from script_tools import load_script, measured
+from spell_check import check_word
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SIMILARITY_FILE = os.path.join(HERE, "eval_mg", "similarity_mg.tsv")
+ANALOGY_FILE = os.path.join(HERE, "eval_mg", "analogies_mg.txt")
+BIBLE_VOCAB_DIR = os.path.join(os.path.dirname(HERE), "from_bible_json")
+
+# Mots corrects : vocabulaire biblique sans noms propres
+VOCAB_FILE = "vocabulaire_malgache_sans_noms_v2.txt"
+# Une faute générée qui tombe sur un mot de ces listes n'est pas une faute
+KNOWN_FILES = (
+    "vocabulaire_malgache.txt",
+    "vocabulaire_malgache_sans_noms_v2.txt",
+    "noms_propres_malgaches_v2.txt",
+    "nouveaux_vocabulaires_malgaches_complementaire_scrapping.txt",
+)
+# Alphabet malgache (ni c, q, u, w, x)
+ALPHABET = "abdefghijklmnoprstvyz"
+SEED = 42
+
+
+# ============================================================
+# Jeu de test du correcteur
+# ============================================================
+
+def load_word_list(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip().lower() for line in f if line.strip()]
+
+def make_typo(word, rng):
+    """Une faute de frappe : lettre supprimée, ajoutée, remplacée ou deux lettres inversées."""
+    i = rng.randrange(len(word))
+    op = rng.choice(("delete", "insert", "replace", "swap"))
+    if op == "delete":
+        return word[:i] + word[i + 1:]
+    if op == "insert":
+        return word[:i] + rng.choice(ALPHABET) + word[i:]
+    if op == "replace":
+        return word[:i] + rng.choice(ALPHABET.replace(word[i], "")) + word[i + 1:]
+    i = min(i, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+def spelling_set(vocab_dir, count, seed=SEED):
+    """(mots corrects, fautes) : `count` mots du vocabulaire biblique et une
+    faute dérivée de chacun, absente de toutes les listes de vocabulaire."""
+    words = sorted({w for w in load_word_list(os.path.join(vocab_dir, VOCAB_FILE))
+                    if len(w) >= 4 and w.isalpha()})
+    known = set()
+    for name in KNOWN_FILES:
+        path = os.path.join(vocab_dir, name)
+        if os.path.exists(path):
+            known.update(load_word_list(path))
+
+    rng = random.Random(seed)
+    correct = rng.sample(words, min(count, len(words)))
+    typos = []
+    for word in correct:
+        for _ in range(10):
+            typo = make_typo(word, rng)
+            if typo not in known:
+                typos.append(typo)
+                break
+    return correct, typos
+
+# ============================================================
+# Notes d'un modèle
+# ============================================================
+
+def spelling_scores(wv, correct, typos):
+    """Précision / rappel du correcteur : une faute signalée est un vrai positif."""
+    false_alarms = sum(check_word(wv, w)[0] for w in correct)
+    caught = sum(check_word(wv, w)[0] for w in typos)
+    precision = caught / (caught + false_alarms) if caught + false_alarms else 0.0
+    recall = caught / len(typos) if typos else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4),
+            "false_alarms": false_alarms, "caught": caught}
+
+def similarity_scores(wv, path=SIMILARITY_FILE):
+    try:
+        _, spearman, oov = wv.evaluate_word_pairs(path)
+    except ValueError:
+        # Toutes les paires hors vocabulaire
+        return {"spearman": None, "similarity_oov": 100.0}
+    return {"spearman": round(float(spearman[0]), 4), "similarity_oov": round(oov, 1)}
+
+def analogy_scores(wv, path=ANALOGY_FILE):
+    """Exactitude sur les analogies dont les quatre mots sont dans le vocabulaire."""
+    with open(path, 'r', encoding='utf-8') as f:
+        total = sum(1 for line in f if line.strip() and not line.startswith(": "))
+    score, sections = wv.evaluate_word_analogies(path)
+    answered = len(sections[-1]["correct"]) + len(sections[-1]["incorrect"])
+    per_section = {s["section"]: round(len(s["correct"]) / max(len(s["correct"]) + len(s["incorrect"]), 1), 4)
+                   for s in sections[:-1]}
+    return {"analogies": round(score, 4) if answered else None,
+            "analogy_coverage": round(answered / total, 4) if total else 0.0,
+            "analogy_sections": per_section}
+
+def evaluate(wv, correct, typos):
+    scores = {"words": len(wv)}
+    scores.update(similarity_scores(wv))
+    scores.update(analogy_scores(wv))
+    scores.update(spelling_scores(wv, correct, typos))
+    return scores
+
+# ============================================================
+# Balayage
+# ============================================================
+
+def config_name(config):
+    return (f"d{config['vector_size']}_w{config['window']}_m{config['min_count']}_"
+            f"{'sg' if config['sg'] else 'cbow'}_e{config['epochs']}")
+
+def make_grid(sizes, windows, min_counts, sgs, epochs):
+    return [{"vector_size": d, "window": w, "min_count": m, "sg": sg, "epochs": e}
+            for d, w, m, sg, e in itertools.product(sizes, windows, min_counts, sgs, epochs)]
+
+def train_and_evaluate(corpus, run_dir, config, workers, corpus_file, vocab_cache,
+                       correct, typos, keep_models):
+    """Dans le processus fils : entraîne une configuration puis la note."""
+    trainer = load_script("08_train_embeddings.py", "train_embeddings")
+    os.makedirs(run_dir, exist_ok=True)
+    start = time.time()
+    with open(os.path.join(run_dir, "train.log"), 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log):
+        trainer.train_embeddings(corpus, run_dir, vector_size=config["vector_size"],
+                                 window=config["window"], min_count=config["min_count"],
+                                 epochs=config["epochs"], sg=config["sg"], workers=workers,
+                                 corpus_file=corpus_file, vocab_cache=vocab_cache,
+                                 keep_checkpoints=0)
+    wall = time.time() - start
+
+    serving = os.path.join(run_dir, "serving")
+    if not is_vector_store(serving):
+        raise RuntimeError(f"pas de vecteurs dans {serving} (voir {run_dir}/train.log)")
+    # Temps des epochs seules (train_metrics.jsonl), sans vocabulaire ni sauvegarde
+    with open(os.path.join(run_dir, "train_metrics.jsonl"), 'r', encoding='utf-8') as f:
+        train_seconds = [json.loads(line) for line in f][-1]["elapsed"]
+
+    result = {"train_seconds": train_seconds, "wall_seconds": round(wall, 1),
+              "size_mb": round(directory_size(serving) / 1024 / 1024, 1)}
+    result.update(evaluate(load_vectors(serving), correct, typos))
+
+    if not keep_models:
+        for name in os.listdir(run_dir):
+            path = os.path.join(run_dir, name)
+            if name.startswith("malagasy_fasttext.model"):
+                os.remove(path)
+            elif name == "serving":
+                shutil.rmtree(path)
+    return result
+
+def load_results(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return {(row["name"], row["corpus"]): row for row in rows}
+
+def fmt(value, pattern):
+    return "-" if value is None else pattern.format(value)
+
+def print_table(rows, sort_key):
+    rows = sorted(rows, key=lambda r: (r.get(sort_key) is None, -(r.get(sort_key) or 0)))
+    print(f"\n{'Configuration':<24} {'Temps':>7} {'RSS':>8} {'Taille':>8} {'Mots':>7} "
+          f"{'Spearman':>8} {'Analog.':>8} {'Préc.':>6} {'Rappel':>6} {'F1':>6}")
+    print("-" * 100)
+    for r in rows:
+        print(f"{r['name']:<24} {r['train_seconds']:>6.1f}s {fmt(r.get('peak_rss_mb'), '{:.0f}MB'):>8} "
+              f"{r['size_mb']:>6.1f}MB {r['words']:>7} {fmt(r['spearman'], '{:.3f}'):>8} "
+              f"{fmt(r['analogies'], '{:.1%}'):>8} {r['precision']:>6.1%} {r['recall']:>6.1%} "
+              f"{r['f1']:>6.1%}")
+    print("-" * 100)
+    if rows:
+        r = rows[0]
+        print(f"   Couverture : similarité {100 - (r['similarity_oov'] or 0):.0f}% des paires, "
+              f"analogies {r['analogy_coverage']:.0%} des questions ({r['name']})")
+
+def evaluate_model(model_path, vocab_dir, spelling_words):
+    """Note un modèle existant (store de service ou modèle complet) sans entraîner."""
+    if os.path.isdir(model_path) and is_vector_store(model_path):
+        wv = load_vectors(model_path)
+        size = directory_size(model_path)
+    else:
+        from gensim.models import FastText
+        wv = FastText.load(model_path).wv
+        size = os.path.getsize(model_path)
+    correct, typos = spelling_set(vocab_dir, spelling_words)
+    row = {"name": os.path.basename(model_path.rstrip("/\\")), "train_seconds": 0.0,
+           "size_mb": round(size / 1024 / 1024, 1)}
+    row.update(evaluate(wv, correct, typos))
+    print_table([row], "f1")
+    print(f"   Sections d'analogies : {row['analogy_sections']}")
+    return 0
+
+def run_sweep(corpus, output_dir, grid, vocab_dir=BIBLE_VOCAB_DIR, spelling_words=1000,
+              workers=None, corpus_file=False, vocab_cache=None, force=False,
+              keep_models=False, sort_key="f1"):
+    if not os.path.exists(corpus):
+        print(f"❌ Corpus {corpus} introuvable !")
+        return 1
+    if not os.path.exists(os.path.join(vocab_dir, VOCAB_FILE)):
+        print(f"❌ Vocabulaire {os.path.join(vocab_dir, VOCAB_FILE)} introuvable !")
+        return 1
+
+    os.makedirs(output_dir, exist_ok=True)
+    results_path = os.path.join(output_dir, "results.jsonl")
+    corpus_key = os.path.abspath(corpus)
+    done = {} if force else load_results(results_path)
+    correct, typos = spelling_set(vocab_dir, spelling_words)
+
+    print("=" * 70)
+    print("🧪 ÉVALUATION DES HYPERPARAMÈTRES FASTTEXT")
+    print(f"   Corpus        : {corpus}")
+    print(f"   Grille        : {len(grid)} configurations")
+    print(f"   Correcteur    : {len(correct)} mots corrects, {len(typos)} fautes de frappe")
+    print(f"   Résultats     : {results_path}")
+    print("=" * 70)
+
+    # Comptes de mots calculés une fois, partagés par toutes les configurations
+    if vocab_cache is None:
+        vocab_cache = corpus + ".vocab.json"
+    trainer = load_script("08_train_embeddings.py", "train_embeddings")
+    trainer.load_vocab(corpus, vocab_cache)
+
+    rows, failed = [], 0
+    for i, config in enumerate(grid, 1):
+        name = config_name(config)
+        if (name, corpus_key) in done:
+            print(f"⏭️  [{i}/{len(grid)}] {name} : déjà évaluée")
+            rows.append(done[(name, corpus_key)])
+            continue
+        print(f"🔥 [{i}/{len(grid)}] {name}...")
+        run_dir = os.path.join(output_dir, name)
+        try:
+            result, _, peak = measured(train_and_evaluate, corpus, run_dir, config, workers,
+                                       corpus_file, vocab_cache, correct, typos, keep_models)
+        except RuntimeError as e:
+            print(f"   ❌ {e} (voir {os.path.join(run_dir, 'train.log')})")
+            failed += 1
+            continue
+        row = {"name": name, "corpus": corpus_key, **config, "peak_rss_mb": peak, **result}
+        with open(results_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        rows.append(row)
+        print(f"   ✅ {row['train_seconds']:.1f}s, {row['size_mb']:.1f}MB, "
+              f"spearman {fmt(row['spearman'], '{:.3f}')}, analogies {fmt(row['analogies'], '{:.1%}')}, "
+              f"F1 correcteur {row['f1']:.1%}")
+
+    print_table(rows, sort_key)
+    print("=" * 70)
+    if failed:
+        print(f"⚠️  {failed} configuration(s) en échec")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Balayage d'hyperparamètres FastText : qualité (similarité, analogies, correcteur), temps, taille"
+    )
+    parser.add_argument("--corpus", type=str, default="malagasy_corpus_normalized.txt",
+                        help="Corpus normalisé (09_normalize_corpus.py)")
+    parser.add_argument("--output", type=str, default="embeddings_eval",
+                        help="Dossier des entraînements et de results.jsonl")
+    parser.add_argument("--size", type=int, nargs="+", default=[100], help="Dimensions testées")
+    parser.add_argument("--window", type=int, nargs="+", default=[5], help="Fenêtres testées")
+    parser.add_argument("--min-count", type=int, nargs="+", default=[5], help="min_count testés")
+    parser.add_argument("--sg", type=int, nargs="+", default=[1], choices=[0, 1],
+                        help="1 = skip-gram, 0 = CBOW (défaut: 1)")
+    parser.add_argument("--epochs", type=int, nargs="+", default=[10], help="Nombres d'epochs testés")
+    parser.add_argument("--workers", type=int, default=None, help="Threads d'entraînement (défaut: tous les cœurs)")
+    parser.add_argument("--corpus-file", action="store_true", help="Mode corpus_file de gensim (voir 08)")
+    parser.add_argument("--vocab-cache", type=str, default=None,
+                        help="Cache des comptes de mots (défaut: <corpus>.vocab.json)")
+    parser.add_argument("--bible-vocab", type=str, default=BIBLE_VOCAB_DIR,
+                        help="Dossier des listes de vocabulaire (from_bible_json)")
+    parser.add_argument("--spelling-words", type=int, default=1000,
+                        help="Mots corrects tirés pour le correcteur, autant de fautes (défaut: 1000)")
+    parser.add_argument("--sort", type=str, default="f1",
+                        choices=["f1", "spearman", "analogies", "precision", "recall"],
+                        help="Colonne de tri du tableau (défaut: f1)")
+    parser.add_argument("--force", action="store_true", help="Réentraîne les configurations déjà évaluées")
+    parser.add_argument("--keep-models", action="store_true",
+                        help="Garde modèles et vecteurs de chaque configuration (sinon seulement logs et métriques)")
+    parser.add_argument("--model", type=str, default=None,
+                        help="Note seulement ce modèle existant (store de service ou .model), sans balayage")
+    args = parser.parse_args()
+
+    if args.model:
+        sys.exit(evaluate_model(args.model, args.bible_vocab, args.spelling_words))
+    grid = make_grid(args.size, args.window, args.min_count, args.sg, args.epochs)
+    sys.exit(run_sweep(args.corpus, args.output, grid, vocab_dir=args.bible_vocab,
+                       spelling_words=args.spelling_words, workers=args.workers,
+                       corpus_file=args.corpus_file, vocab_cache=args.vocab_cache,
+                       force=args.force, keep_models=args.keep_models, sort_key=args.sort))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache HTTP conditionnel sur disque (SQLite), indexé par URL.
+Stocke le corps (compressé zlib) et ses validateurs ETag / Last-Modified
+pour renvoyer If-None-Match / If-Modified-Since lors d'un re-crawl.
+
+Sur un 304, l'appelant récupère le corps en cache sans aucun transfert,
+et sait que la page n'a pas changé (il peut donc sauter le parsing).
+"""
+
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url           TEXT PRIMARY KEY,
+    etag          TEXT,
+    last_modified TEXT,
+    body          BLOB NOT NULL,
+    fetched_at    TEXT
+);
+"""
+
+
+class HttpCache:
+    """Cache de réponses thread-safe, partagé par tous les workers."""
+
+    def __init__(self, db_path="http_cache.sqlite"):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def conditional_headers(self, url):
+        """En-têtes If-None-Match / If-Modified-Since pour `url` ({} si absente)."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return {}
+        headers = {}
+        if row[0]:
+            headers["If-None-Match"] = row[0]
+        if row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def body(self, url):
+        """Corps en cache pour `url` (compte un hit), ou None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.hits += 1
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """Enregistre une réponse 200. Sans validateur, rien n'est gardé :
+        on ne pourrait de toute façon pas faire de requête conditionnelle."""
+        with self.lock:
+            self.misses += 1
+            if not etag and not last_modified:
+                return
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, body, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, zlib.compress(body.encode("utf-8")),
+                 datetime.now().isoformat(timespec="seconds"))
+            )
+            self.conn.commit()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Détection des quasi-doublons du corpus par MinHash + LSH.
+
+Reprises, même chanson sous deux artistes, variantes de refrain, versets ou
+paragraphes Wikipedia retouchés : le dédoublonnage exact de la Phase 4.5 ne
+les voit pas. Ici chaque bloc est réduit à une signature MinHash sur ses
+shingles de caractères, les signatures sont regroupées par bandes (LSH),
+et seules les paires candidates sont comparées.
+
+- Signatures calculées par paquets dans un pool de processus, en NumPy
+  vectorisé, stockées dans un fichier np.memmap (pas en RAM).
+- Dans chaque seau LSH, chaque bloc n'est comparé qu'au premier du seau :
+  le coût reste linéaire même pour les refrains très répétés.
+- Un bloc est retiré si sa similarité de Jaccard estimée avec un bloc
+  antérieur gardé atteint le seuil ; le premier bloc de chaque groupe reste.
+
+Usage direct (réécrit le fichier en place) :
+    python3 near_dedup.py --input malagasy_corpus_v2_final.txt --threshold 0.8
+"""
+
+import os
+import json
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # Optionnel : seulement pour --near-dedup
+    np = None
+
+
+# Graine des fonctions de hachage : mêmes signatures dans tous les processus
+SEED = 0x5EED
+READ_SIZE = 1024 * 1024
+# Taille max d'un paquet envoyé aux processus (caractères)
+BATCH_CHARS = 200_000
+# Permutations traitées ensemble (borne la matrice temporaire)
+PERM_CHUNK = 16
+
+
+def iter_blocks(fin, read_size=READ_SIZE):
+    """Blocs séparés par une ligne vide, lus en flux.
+
+    Donne exactement les mêmes blocs que fin.read().split("\\n\\n"), sans
+    jamais garder plus d'une lecture (plus le bloc en cours) en mémoire.
+    Seule la nouvelle lecture est découpée : un bloc très long sans ligne
+    vide reste linéaire.
+    """
+    pieces = []     # bloc en cours, sur plusieurs lectures (le dernier jamais vide)
+    while True:
+        chunk = fin.read(read_size)
+        if not chunk:
+            break
+        # Séparateur "\n\n" à cheval sur deux lectures
+        if pieces and pieces[-1].endswith("\n") and chunk.startswith("\n"):
+            pieces[-1] = pieces[-1][:-1]
+            yield "".join(pieces)
+            pieces = []
+            chunk = chunk[1:]
+        parts = chunk.split("\n\n")
+        if len(parts) > 1:
+            pieces.append(parts[0])
+            yield "".join(pieces)
+            yield from parts[1:-1]
+            pieces = []
+        if parts[-1]:
+            pieces.append(parts[-1])
+    yield "".join(pieces)
+
+
+def choose_bands(num_perm, threshold):
+    """(bandes, lignes) dont le seuil LSH (1/b)^(1/r) est le plus proche de `threshold`."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        gap = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or gap < best[0]:
+            best = (gap, bands, rows)
+    return best[1], best[2]
+
+
+def permutations(num_perm):
+    """Coefficients (a, b) des num_perm fonctions de hachage, identiques dans chaque processus."""
+    rng = np.random.default_rng(SEED)
+    a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def shingle_hashes(text, size):
+    """Hachages 64 bits des shingles de `size` octets du texte normalisé."""
+    data = np.frombuffer(" ".join(text.lower().split()).encode("utf-8"), dtype=np.uint8)
+    if len(data) < size:
+        data = np.concatenate([data, np.zeros(size - len(data), dtype=np.uint8)])
+    windows = np.lib.stride_tricks.sliding_window_view(data, size).astype(np.uint64)
+    powers = np.uint64(257) ** np.arange(size, dtype=np.uint64)
+    x = (windows * powers).sum(axis=1, dtype=np.uint64)
+    # splitmix64 : répartit les bits avant le hachage multiplicatif
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return x
+
+
+def minhash_batch(texts, num_perm, shingle_size):
+    """Signatures MinHash (uint32, len(texts) × num_perm) d'un paquet de blocs."""
+    a, b = permutations(num_perm)
+    hashes = [shingle_hashes(t, shingle_size) for t in texts]
+    starts = np.cumsum([0] + [len(h) for h in hashes[:-1]])
+    values = np.concatenate(hashes)
+
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    with np.errstate(over="ignore"):
+        for p in range(0, num_perm, PERM_CHUNK):
+            pa = a[p:p + PERM_CHUNK, None]
+            pb = b[p:p + PERM_CHUNK, None]
+            permuted = ((pa * values[None, :] + pb) >> np.uint64(32)).astype(np.uint32)
+            signatures[:, p:p + PERM_CHUNK] = np.minimum.reduceat(permuted, starts, axis=1).T
+    return signatures
+
+
+def iter_batches(blocks, max_chars=BATCH_CHARS):
+    """Paquets de (index de départ, [blocs]) d'au plus ~max_chars caractères."""
+    batch, size, start = [], 0, 0
+    for index, block in enumerate(blocks):
+        if not batch:
+            start = index
+        batch.append(block)
+        size += len(block)
+        if size >= max_chars:
+            yield start, batch
+            batch, size = [], 0
+    if batch:
+        yield start, batch
+
+
+def compute_signatures(input_path, signatures_path, num_perm, shingle_size, workers):
+    """Passe 1 : signatures de tous les blocs dans un memmap ; retourne (memmap, nombre de blocs)."""
+    with open(input_path, "r", encoding="utf-8") as fin:
+        count = sum(1 for _ in iter_blocks(fin))
+
+    signatures = np.lib.format.open_memmap(
+        signatures_path, mode="w+", dtype=np.uint32, shape=(max(count, 1), num_perm)
+    )
+
+    def store(start, result):
+        signatures[start:start + len(result)] = result
+
+    with open(input_path, "r", encoding="utf-8") as fin:
+        batches = iter_batches(iter_blocks(fin))
+        if workers == 1:
+            for start, batch in batches:
+                store(start, minhash_batch(batch, num_perm, shingle_size))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for start, batch in batches:
+                    pending.append((start, executor.submit(minhash_batch, batch, num_perm, shingle_size)))
+                    if len(pending) >= 2 * workers:
+                        start, future = pending.popleft()
+                        store(start, future.result())
+                while pending:
+                    start, future = pending.popleft()
+                    store(start, future.result())
+
+    signatures.flush()
+    return signatures, count
+
+
+def candidate_pairs(signatures, count, bands, rows):
+    """Paires (premier du seau, autre membre) pour chaque bande LSH, sans doublons."""
+    rng = np.random.default_rng(SEED + 1)
+    mix = rng.integers(1, 2 ** 63, size=rows, dtype=np.uint64) | np.uint64(1)
+    pairs = []
+    if count == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    with np.errstate(over="ignore"):
+        for band in range(bands):
+            block = np.asarray(signatures[:count, band * rows:(band + 1) * rows], dtype=np.uint64)
+            keys = (block * mix[None, :]).sum(axis=1, dtype=np.uint64)
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            new_group = np.empty(count, dtype=bool)
+            new_group[0] = True
+            new_group[1:] = sorted_keys[1:] != sorted_keys[:-1]
+            # Tri stable : le premier de chaque seau a le plus petit index
+            group_start = np.maximum.accumulate(np.where(new_group, np.arange(count), 0))
+            leaders = order[group_start]
+            members = ~new_group
+            if members.any():
+                pairs.append(np.stack([leaders[members], order[members]], axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def similar_pairs(signatures, pairs, threshold, chunk=100_000):
+    """Filtre les paires par similarité de Jaccard estimée ; retourne (paires, similarités)."""
+    kept, sims = [], []
+    for i in range(0, len(pairs), chunk):
+        part = pairs[i:i + chunk]
+        sim = (signatures[part[:, 0]] == signatures[part[:, 1]]).mean(axis=1)
+        mask = sim >= threshold
+        kept.append(part[mask])
+        sims.append(sim[mask])
+    if not kept:
+        return pairs, np.empty(0)
+    return np.concatenate(kept), np.concatenate(sims)
+
+
+def clusters(pairs, sims):
+    """Union-find : {bloc retiré: (bloc gardé du groupe, similarité)}."""
+    parent = {}
+
+    def find(x):
+        root = x
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while parent.get(x, x) != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    best = {}
+    for (i, j), sim in zip(pairs.tolist(), sims.tolist()):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+        best[j] = max(best.get(j, 0.0), sim)
+
+    return {j: (find(j), best[j]) for j in best if find(j) != j}
+
+
+def near_dedup_file(input_path, output_path=None, threshold=0.8, num_perm=64,
+                    shingle_size=5, workers=None, report_path=None):
+    """Retire les quasi-doublons d'un corpus en blocs séparés par une ligne vide.
+
+    Réécrit `output_path` (par défaut le fichier d'entrée, en place) et écrit
+    dans `report_path` un JSONL des groupes retirés. Retourne un dict de stats.
+    """
+    if np is None:
+        print("❌ --near-dedup nécessite numpy : pip install numpy")
+        return None
+
+    output_path = output_path or input_path
+    report_path = report_path or f"{output_path}.near_dups.jsonl"
+    workers = workers or os.cpu_count() or 1
+    bands, rows = choose_bands(num_perm, threshold)
+    signatures_path = f"{output_path}.minhash.npy"
+
+    print("🔬 Quasi-doublons (MinHash + LSH)...")
+    print(f"   Seuil Jaccard : {threshold} ({num_perm} permutations, {bands} bandes × {rows})")
+    print(f"   Shingles      : {shingle_size} caractères, {workers} processus")
+
+    try:
+        signatures, count = compute_signatures(input_path, signatures_path, num_perm,
+                                               shingle_size, workers)
+        pairs = candidate_pairs(signatures, count, bands, rows)
+        pairs, sims = similar_pairs(signatures, pairs, threshold)
+        removed = clusters(pairs, sims)
+    finally:
+        if os.path.exists(signatures_path):
+            os.remove(signatures_path)
+
+    # Passe 2 : réécriture sans les blocs retirés, et rapport des groupes
+    leaders = {root for root, _ in removed.values()}
+    tmp_path = f"{output_path}.tmp"
+    with open(input_path, "r", encoding="utf-8") as fin, \
+         open(tmp_path, "w", encoding="utf-8") as fout, \
+         open(report_path, "w", encoding="utf-8") as freport:
+        first = True
+        dropped = 0
+        for index, block in enumerate(iter_blocks(fin)):
+            # Le bloc vide final (corpus terminé par une ligne vide) est toujours gardé
+            if index in removed and block:
+                dropped += 1
+                root, sim = removed[index]
+                freport.write(json.dumps({"cluster": root, "index": index, "kept": False,
+                                          "similarity": round(sim, 4), "text": block},
+                                         ensure_ascii=False) + "\n")
+                continue
+            if index in leaders:
+                freport.write(json.dumps({"cluster": index, "index": index, "kept": True,
+                                          "text": block}, ensure_ascii=False) + "\n")
+            if not first:
+                fout.write("\n\n")
+            fout.write(block)
+            first = False
+    os.replace(tmp_path, output_path)
+
+    stats = {
+        "blocks": count,
+        "candidates": int(len(pairs)),
+        "removed": dropped,
+        "clusters": len(leaders),
+    }
+    print(f"   ✅ {stats['removed']} quasi-doublons retirés dans {stats['clusters']} groupes "
+          f"({count} blocs analysés)")
+    print(f"   📄 Rapport des groupes : {report_path}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Retire les quasi-doublons d'un corpus (blocs séparés par une ligne vide)"
+    )
+    parser.add_argument("--input", type=str, required=True, help="Corpus à traiter")
+    parser.add_argument("--output", type=str, default=None, help="Sortie (défaut: en place)")
+    parser.add_argument("--threshold", type=float, default=0.8,
+                        help="Similarité de Jaccard à partir de laquelle un bloc est retiré (défaut: 0.8)")
+    parser.add_argument("--num-perm", type=int, default=64,
+                        help="Nombre de permutations MinHash (défaut: 64)")
+    parser.add_argument("--shingle-size", type=int, default=5,
+                        help="Taille des shingles en caractères (défaut: 5)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Nombre de processus (défaut: tous les cœurs)")
+    parser.add_argument("--report", type=str, default=None,
+                        help="Rapport JSONL des groupes (défaut: <sortie>.near_dups.jsonl)")
+    args = parser.parse_args()
+
+    near_dedup_file(args.input, args.output, threshold=args.threshold, num_perm=args.num_perm,
+                    shingle_size=args.shingle_size, workers=args.workers, report_path=args.report)
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vecteurs FastText quantifiés pour le service sur petites machines.
+
+Un modèle de 100 dimensions en float32 avec 2M buckets de n-grammes pèse
+près de 1 GB. Ici chaque tableau (vecteurs des mots, buckets de n-grammes)
+est compressé :
+  - int8 : chaque ligne est codée sur 127 niveaux avec son échelle float32
+    (~4x plus petit) ;
+  - pq (quantification par produit) : les buckets de n-grammes, qui font
+    l'essentiel du poids, sont découpés en `m` sous-vecteurs, chacun
+    remplacé par le numéro (1 octet) du plus proche des 255 centroïdes
+    appris par k-means sur ce sous-espace (~16x plus petit). Les centroïdes
+    sont appris sur les buckets des mots du vocabulaire. Les autres n'ont
+    jamais été entraînés : ils reçoivent le code réservé PQ_ZERO_CODE, qui
+    se décode en vecteur nul, plutôt que le centroïde d'un vrai n-gramme
+    (un mot inventé prendrait sinon le vecteur plausible d'un vrai mot et
+    passerait le correcteur). Les vecteurs des mots, peu nombreux et qui
+    font la qualité de most_similar, restent en int8.
+
+QuantizedVectors reprend l'API utilisée par web_app/app.py et
+12_test_app.py (most_similar, vecteur d'un mot hors vocabulaire composé de
+ses n-grammes, get_vecattr(mot, "count"), index_to_key...). Les scores
+sont calculés sur les codes int8 par paquets, sans décompresser la matrice.
+La lecture ne dépend que de numpy (pas de gensim ni scipy à charger).
+
+Structure d'un store :
+    embeddings_mg/quantized/
+    ├── meta.json                    # méthode, dimension, n-grammes, mots
+    ├── vectors.codes.npy            # int8 (n, d)
+    ├── vectors.scale.npy            # échelle de chaque ligne
+    ├── vectors_ngrams.codes.npy     # int8 (bucket, d), ou uint8 (bucket, m) en pq
+    ├── vectors_ngrams.scale.npy     # int8
+    ├── vectors_ngrams.centroids.npy # pq : (m, 256, d / m)
+    ├── norms.npy                    # normes des vecteurs de mots décodés
+    └── counts.npy                   # fréquence de chaque mot
+
+Usage :
+    python3 quantized_store.py --model embeddings_mg/malagasy_fasttext.model --method pq --output embeddings_mg/quantized
+    # Comparaison au modèle float : bench_quantized.py
+"""
+
+import os
+import json
+import shutil
+import argparse
+
+import numpy as np
+
+
+META_FILE = "meta.json"
+# Lignes traitées ensemble (borne les matrices temporaires en float32)
+CHUNK_ROWS = 65536
+PQ_CENTROIDS = 256
+# Code des buckets jamais entraînés : son centroïde est nul dans chaque sous-espace
+PQ_ZERO_CODE = 0
+PQ_SAMPLE = 65536
+PQ_ITERATIONS = 15
+SEED = 0x5EED
+
+
+# ============================================================
+# Hachage des n-grammes (identique à gensim / fastText)
+# ============================================================
+
+def ngrams_bytes(word, min_n, max_n):
+    """N-grammes de caractères de <word> en UTF-8, dans l'ordre de gensim."""
+    data = f"<{word}>".encode("utf-8")
+    size = len(data)
+    result = []
+    for i in range(size):
+        if (data[i] & 0xC0) == 0x80:
+            continue
+        j, n = i, 1
+        while j < size and n <= max_n:
+            j += 1
+            while j < size and (data[j] & 0xC0) == 0x80:
+                j += 1
+            if n >= min_n and not (n == 1 and (i == 0 or j == size)):
+                result.append(data[i:j])
+            n += 1
+    return result
+
+
+def ft_hash(data):
+    """FNV-1a 32 bits de fastText (octets pris comme des char signés)."""
+    h = 2166136261
+    for b in data:
+        h = ((h ^ ((b - 256 if b > 127 else b) & 0xFFFFFFFF)) * 16777619) & 0xFFFFFFFF
+    return h
+
+
+def ngram_buckets(word, min_n, max_n, bucket):
+    return [ft_hash(ngram) % bucket for ngram in ngrams_bytes(word, min_n, max_n)]
+
+
+# ============================================================
+# Codage
+# ============================================================
+
+def int8_encode(array):
+    """(codes int8, échelle float32 par ligne)."""
+    codes = np.empty(array.shape, dtype=np.int8)
+    scale = np.empty(len(array), dtype=np.float32)
+    for start in range(0, len(array), CHUNK_ROWS):
+        block = np.asarray(array[start:start + CHUNK_ROWS], dtype=np.float32)
+        s = np.abs(block).max(axis=1) / 127
+        s[s == 0] = 1
+        codes[start:start + len(block)] = np.rint(block / s[:, None]).clip(-127, 127)
+        scale[start:start + len(block)] = s
+    return {"codes": codes, "scale": scale}
+
+
+def nearest_centroids(block, centroids):
+    """Numéro du centroïde le plus proche de chaque ligne de `block` (un sous-espace)."""
+    distances = (-2 * block @ centroids.T) + (centroids ** 2).sum(axis=1)[None, :]
+    return distances.argmin(axis=1)
+
+
+def pq_train(array, m, rng, rows=None):
+    """Centroïdes (m, 256, d / m) appris par k-means sur un échantillon de `rows`
+    (par défaut toutes les lignes) ; le centroïde PQ_ZERO_CODE reste nul."""
+    dsub = array.shape[1] // m
+    rows = np.arange(len(array)) if rows is None or not len(rows) else np.asarray(rows)
+    sample = np.asarray(array[np.sort(rng.choice(rows, min(len(rows), PQ_SAMPLE), replace=False))],
+                        dtype=np.float32)
+    k = min(PQ_CENTROIDS - 1, len(sample))
+    learned = np.arange(PQ_CENTROIDS) != PQ_ZERO_CODE
+    centroids = np.zeros((m, PQ_CENTROIDS, dsub), dtype=np.float32)
+    for sub in range(m):
+        data = sample[:, sub * dsub:(sub + 1) * dsub]
+        current = data[rng.choice(len(data), k, replace=False)].copy()
+        for _ in range(PQ_ITERATIONS):
+            labels = nearest_centroids(data, current)
+            sums = np.zeros_like(current)
+            np.add.at(sums, labels, data)
+            counts = np.bincount(labels, minlength=k)
+            filled = counts > 0
+            current[filled] = sums[filled] / counts[filled, None]
+            # Centroïde vide : relancé sur un point au hasard
+            if not filled.all():
+                current[~filled] = data[rng.choice(len(data), int((~filled).sum()))]
+        # Places restantes (échantillon plus petit que 255) : doublons du premier
+        centroids[sub, learned] = np.concatenate(
+            [current, np.repeat(current[:1], PQ_CENTROIDS - 1 - k, axis=0)])
+    return centroids
+
+
+def pq_encode(array, m, rng, rows=None):
+    """(codes uint8 (n, m), centroïdes appris sur `rows`). Les lignes hors de
+    `rows` (si donné) sont codées PQ_ZERO_CODE : décodées en zéro exact."""
+    if array.shape[1] % m:
+        raise ValueError(f"la dimension {array.shape[1]} n'est pas divisible par m={m}")
+    centroids = pq_train(array, m, rng, rows)
+    dsub = array.shape[1] // m
+    trained = np.ones(len(array), dtype=bool)
+    if rows is not None and len(rows):
+        trained[:] = False
+        trained[np.asarray(rows)] = True
+    codes = np.full((len(array), m), PQ_ZERO_CODE, dtype=np.uint8)
+    for start in range(0, len(array), CHUNK_ROWS):
+        index = start + np.flatnonzero(trained[start:start + CHUNK_ROWS])
+        if not len(index):
+            continue
+        block = np.asarray(array[index], dtype=np.float32)
+        for sub in range(m):
+            codes[index, sub] = nearest_centroids(block[:, sub * dsub:(sub + 1) * dsub], centroids[sub])
+    return {"codes": codes, "centroids": centroids}
+
+
+def decode(parts, rows):
+    """Lignes `rows` décodées en float32."""
+    codes = parts["codes"][rows]
+    if "scale" in parts:
+        return codes.astype(np.float32) * parts["scale"][rows][..., None]
+    centroids = parts["centroids"]
+    m = centroids.shape[0]
+    return centroids[np.arange(m), codes].reshape(codes.shape[:-1] + (-1,))
+
+
+def quantize(wv, output_dir, method="int8", m=None):
+    """Écrit le store quantifié de `wv` (FastTextKeyedVectors du modèle ou du
+    store de service) ; m = nombre de sous-vecteurs en pq (défaut : dimension / 4)."""
+    if method not in ("int8", "pq"):
+        raise ValueError(f"méthode inconnue : {method}")
+    rng = np.random.default_rng(SEED)
+
+    tmp = output_dir.rstrip("/\\") + ".tmp"
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+
+    arrays = {"vectors": int8_encode(wv.vectors)}
+    if method == "pq":
+        m = m or max(1, wv.vector_size // 4)
+        # Buckets réellement entraînés : ceux des n-grammes du vocabulaire
+        used = {b for word in wv.index_to_key for b in ngram_buckets(word, wv.min_n, wv.max_n, wv.bucket)}
+        arrays["vectors_ngrams"] = pq_encode(wv.vectors_ngrams, m, rng, sorted(used))
+    else:
+        m = None
+        arrays["vectors_ngrams"] = int8_encode(wv.vectors_ngrams)
+    for name, parts in arrays.items():
+        for part, array in parts.items():
+            np.save(os.path.join(tmp, f"{name}.{part}.npy"), array)
+
+    # Normes des vecteurs tels qu'ils seront décodés : cosinus cohérents
+    vocab = arrays["vectors"]
+    norms = np.concatenate([np.linalg.norm(decode(vocab, slice(s, s + CHUNK_ROWS)), axis=1)
+                            for s in range(0, len(wv.index_to_key), CHUNK_ROWS)] or [np.empty(0)])
+    np.save(os.path.join(tmp, "norms.npy"), norms.astype(np.float32))
+    np.save(os.path.join(tmp, "counts.npy"),
+            np.array([wv.get_vecattr(w, "count") for w in wv.index_to_key], dtype=np.int64))
+    with open(os.path.join(tmp, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({"method": method, "m": m, "vector_size": wv.vector_size, "min_n": wv.min_n,
+                   "max_n": wv.max_n, "bucket": wv.bucket, "words": wv.index_to_key}, f, ensure_ascii=False)
+
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+    os.replace(tmp, output_dir)
+    return output_dir
+
+
+# ============================================================
+# Lecture
+# ============================================================
+
+def is_quantized_store(path):
+    try:
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            return "method" in json.load(f)
+    except (OSError, ValueError):
+        return False
+
+
+class QuantizedVectors:
+    """Recherche sur un store quantifié (tableaux ouverts avec mmap='r')."""
+
+    def __init__(self, path, mmap='r'):
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.method = meta["method"]
+        self.vector_size = meta["vector_size"]
+        self.min_n, self.max_n, self.bucket = meta["min_n"], meta["max_n"], meta["bucket"]
+        self.index_to_key = meta["words"]
+        self.key_to_index = {word: i for i, word in enumerate(self.index_to_key)}
+
+        def load(name):
+            return np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap)
+        self.vectors = {part: load(f"vectors.{part}") for part in ("codes", "scale")}
+        if self.method == "pq":
+            # Centroïdes : petits et lus à chaque requête, en RAM
+            self.vectors_ngrams = {"codes": load("vectors_ngrams.codes"),
+                                   "centroids": np.load(os.path.join(path, "vectors_ngrams.centroids.npy"))}
+        else:
+            self.vectors_ngrams = {part: load(f"vectors_ngrams.{part}") for part in ("codes", "scale")}
+        self.norms = load("norms")
+        self.counts = load("counts")
+
+    def __len__(self):
+        return len(self.index_to_key)
+
+    def __contains__(self, word):
+        return word in self.key_to_index or self.bucket > 0
+
+    def get_vecattr(self, word, attr):
+        if attr != "count":
+            raise KeyError(attr)
+        return int(self.counts[self.key_to_index[word]])
+
+    def get_vector(self, word, norm=False):
+        """Vecteur décodé du mot ; hors vocabulaire, moyenne de ses n-grammes."""
+        index = self.key_to_index.get(word)
+        if index is not None:
+            vector = decode(self.vectors, index)
+        elif self.bucket == 0:
+            raise KeyError(f"mot '{word}' absent du vocabulaire")
+        else:
+            buckets = ngram_buckets(word, self.min_n, self.max_n, self.bucket)
+            if not buckets:
+                return np.zeros(self.vector_size, dtype=np.float32)
+            vector = decode(self.vectors_ngrams, np.array(buckets)).mean(axis=0)
+        if norm:
+            length = np.linalg.norm(vector)
+            return vector / length if length else vector
+        return vector
+
+    __getitem__ = get_vector
+
+    def scores(self, query):
+        """Produit scalaire de `query` avec tous les vecteurs de mots, calculé sur les codes int8."""
+        n = len(self.index_to_key)
+        out = np.empty(n, dtype=np.float32)
+        codes, scale = self.vectors["codes"], self.vectors["scale"]
+        for start in range(0, n, CHUNK_ROWS):
+            block = codes[start:start + CHUNK_ROWS].astype(np.float32)
+            out[start:start + len(block)] = (block @ query) * scale[start:start + len(block)]
+        return out
+
+    def most_similar(self, positive=None, negative=None, topn=10):
+        """Comme KeyedVectors.most_similar : [(mot, cosinus)], mots de la requête exclus."""
+        if isinstance(positive, str):
+            positive = [positive]
+        positive = list(positive or [])
+        negative = list(negative or [])
+        query = np.zeros(self.vector_size, dtype=np.float32)
+        for words, sign in ((positive, 1.0), (negative, -1.0)):
+            for word in words:
+                query += sign * self.get_vector(word, norm=True)
+        length = np.linalg.norm(query)
+        if not length:
+            return []
+        query /= length
+
+        norms = np.asarray(self.norms)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            similarities = np.where(norms > 0, self.scores(query) / norms, 0)
+        exclude = {self.key_to_index[w] for w in positive + negative if w in self.key_to_index}
+        k = min(topn + len(exclude), len(similarities))
+        if k == 0:
+            return []
+        best = np.argpartition(-similarities, k - 1)[:k]
+        best = best[np.argsort(-similarities[best])]
+        return [(self.index_to_key[i], float(similarities[i])) for i in best if i not in exclude][:topn]
+
+
+def store_bytes(path):
+    """Taille des tableaux du store (ce qui doit tenir en RAM pour servir sans I/O)."""
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path) if name.endswith(".npy"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantifie les vecteurs d'un modèle FastText (int8 ou pq)")
+    parser.add_argument("--model", type=str, default="embeddings_mg/malagasy_fasttext.model",
+                        help="Modèle FastText (08_train_embeddings.py) ou store de service (embeddings_mg/serving)")
+    parser.add_argument("--method", type=str, default="int8", choices=["int8", "pq"], help="Codage (défaut: int8)")
+    parser.add_argument("--m", type=int, default=None, help="Sous-vecteurs en pq (défaut: dimension / 4)")
+    parser.add_argument("--output", type=str, default="embeddings_mg/quantized", help="Dossier du store")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.model):
+        from embedding_store import load_vectors
+        wv = load_vectors(args.model)
+    else:
+        from gensim.models import FastText
+        wv = FastText.load(args.model).wv
+    print(f"🗜️ Quantification {args.method} de {len(wv)} mots et {wv.bucket} buckets...")
+    quantize(wv, args.output, method=args.method, m=args.m)
+    print(f"✅ Store écrit dans {args.output} ({store_bytes(args.output) / 1024 / 1024:.1f} MB, "
+          f"float32 : {(wv.vectors.nbytes + wv.vectors_ngrams.nbytes) / 1024 / 1024:.1f} MB)")
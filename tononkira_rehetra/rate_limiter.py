@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Limiteur de débit partagé par tous les workers du scraper.
+Un token bucket par hôte (requêtes/s + rafale), qui ralentit tout seul
+quand le serveur répond 429/503 puis remonte doucement vers le débit cible.
+
+Utilisable depuis des threads (wait) comme depuis asyncio (wait_async).
+"""
+
+import time
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+
+# Codes HTTP qui signifient "vous allez trop vite"
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value):
+    """Convertit un en-tête Retry-After (secondes ou date HTTP) en secondes."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket thread-safe avec ajustement AIMD du débit.
+
+    - reserve() prend un jeton et renvoie le temps d'attente nécessaire
+      (le solde peut devenir négatif : les appelants font la queue).
+    - penalize() divise le débit par deux et bloque le bucket (Retry-After) :
+      pas de recharge pendant le blocage, les réservations faites entre-temps
+      s'échelonnent au débit réduit après sa fin au lieu de partir ensemble.
+    - reward() remonte le débit de 5 % de la cible à chaque succès.
+    """
+
+    def __init__(self, rate, burst, min_rate=None):
+        self.target_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.min_rate = min_rate if min_rate is not None else self.target_rate / 16
+        self.tokens = self.burst
+        self.blocked_until = 0.0
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        if now <= self.last:
+            # Bucket bloqué : `last` est la fin du blocage
+            return
+        elapsed = now - self.last
+        self.last = now
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            # Fin du blocage éventuel, puis le temps de regagner ce jeton
+            wait = max(0.0, self.last - now)
+            if self.tokens < 0:
+                wait += -self.tokens / self.rate
+            return wait
+
+    def penalize(self, retry_after=None):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            self.blocked_until = max(self.blocked_until, now + pause)
+            # La recharge reprend à la fin du blocage ; un seul jeton disponible alors
+            self.last = max(self.last, self.blocked_until)
+            self.tokens = min(self.tokens, 1.0)
+
+    def reward(self):
+        with self.lock:
+            if self.rate < self.target_rate:
+                self.rate = min(self.target_rate, self.rate + self.target_rate * 0.05)
+
+
+class RateLimiter:
+    """Un TokenBucket par hôte, créé à la demande.
+
+    rate <= 0 désactive la limitation (wait() ne bloque jamais).
+    """
+
+    def __init__(self, rate=4.0, burst=8):
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.configure(rate, burst)
+
+    def configure(self, rate, burst):
+        """Change le débit cible ; les buckets existants sont recréés."""
+        with self.lock:
+            self.rate = rate
+            self.burst = burst
+            self.buckets = {}
+
+    def _bucket(self, url):
+        if self.rate <= 0:
+            return None
+        host = urlparse(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self.buckets[host] = bucket
+            return bucket
+
+    def wait(self, url):
+        """Bloque le thread courant jusqu'à obtenir un jeton pour l'hôte de `url`."""
+        bucket = self._bucket(url)
+        if bucket is None:
+            return
+        delay = bucket.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, url):
+        """Version asyncio de wait()."""
+        bucket = self._bucket(url)
+        if bucket is None:
+            return
+        delay = bucket.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def feedback(self, url, status, retry_after=None):
+        """Informe le limiteur du code HTTP reçu pour ajuster le débit."""
+        bucket = self._bucket(url)
+        if bucket is None:
+            return
+        if status in THROTTLE_STATUSES:
+            bucket.penalize(parse_retry_after(retry_after))
+        elif status is not None and status < 400:
+            bucket.reward()
+
+    def current_rate(self, url):
+        bucket = self._bucket(url)
+        return bucket.rate if bucket is not None else None
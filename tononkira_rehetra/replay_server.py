@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Enregistrement et rejeu hors-ligne d'un crawl tononkira.
+- CrawlArchive : archive SQLite des réponses brutes (remplie par
+  02_scrape_lyrics.py --record).
+- Serveur local qui rejoue l'archive à la place du site, avec latence et
+  injection d'erreurs configurables, pour tester et benchmarker le scraper
+  sans toucher au vrai site.
+
+Usage :
+    python3 replay_server.py --archive crawl_archive.sqlite --port 8765 --latency 80
+    python3 02_scrape_lyrics.py --base-url http://127.0.0.1:8765 --no-state
+"""
+
+import time
+import random
+import sqlite3
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+ORIGIN = "https://tononkira.serasera.org"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    path         TEXT PRIMARY KEY,
+    url          TEXT NOT NULL,
+    status       INTEGER NOT NULL,
+    content_type TEXT,
+    body         BLOB NOT NULL,
+    elapsed      REAL
+);
+"""
+
+
+def url_key(url):
+    """Clé d'archive : chemin + query, indépendante de l'hôte."""
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+class CrawlArchive:
+    """Archive thread-safe des réponses HTTP, indexée par chemin."""
+
+    def __init__(self, db_path="crawl_archive.sqlite"):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def record(self, url, status, body, content_type=None, elapsed=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (path, url, status, content_type, body, elapsed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url_key(url), url, status, content_type, body, elapsed)
+            )
+            self.conn.commit()
+
+    def lookup(self, path):
+        """Retourne (status, content_type, body) ou None."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT status, content_type, body FROM responses WHERE path = ?", (path,)
+            ).fetchone()
+
+    def artist_slugs(self):
+        """Slugs des artistes dont la première page de liste est archivée."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path FROM responses WHERE path LIKE '/mpihira/%/hira'"
+            ).fetchall()
+        return sorted(r[0].split("/")[2] for r in rows)
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+def make_handler(archive, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503,
+                 origin=ORIGIN):
+    """Construit la classe de handler HTTP qui rejoue `archive`.
+
+    latency / jitter en secondes ; error_rate : probabilité de répondre
+    `error_status` au lieu de la page. Les liens absolus vers `origin` sont
+    réécrits vers le serveur local pour que le scraper y reste.
+    """
+    origin_bytes = origin.encode("utf-8")
+
+    class ReplayHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # En-têtes et corps partent en deux écritures sur une connexion
+        # keep-alive : avec Nagle et l'ACK retardé du client, ~40 ms de plus
+        # par réponse, qui fausseraient les latences mesurées
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            delay = latency + random.uniform(0, jitter) if jitter else latency
+            if delay > 0:
+                time.sleep(delay)
+
+            if error_rate and random.random() < error_rate:
+                self.send_response(error_status)
+                if error_status in (429, 503):
+                    self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            entry = archive.lookup(self.path)
+            if entry is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            status, content_type, body = entry
+            local = f"http://{self.headers.get('Host', '127.0.0.1')}".encode("utf-8")
+            body = bytes(body).replace(origin_bytes, local)
+
+            self.send_response(status)
+            self.send_header("Content-Type", content_type or "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return ReplayHandler
+
+
+class ReplayServer(ThreadingHTTPServer):
+    # File d'attente de listen() : à 5 (défaut de socketserver), une rafale de
+    # connexions du moteur asyncio déborde et les SYN perdus sont retransmis
+    # au bout d'une seconde, ce qui fausse p95 / p99 sans aucune erreur
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def start_server(archive, host="127.0.0.1", port=0, **options):
+    """Démarre le serveur de rejeu dans un thread ; retourne (server, base_url)."""
+    server = ReplayServer((host, port), make_handler(archive, **options))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serveur local qui rejoue un crawl tononkira enregistré"
+    )
+    parser.add_argument("--archive", type=str, default="crawl_archive.sqlite",
+                        help="Archive SQLite créée par 02_scrape_lyrics.py --record")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Adresse d'écoute")
+    parser.add_argument("--port", type=int, default=8765, help="Port d'écoute (défaut: 8765)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Latence ajoutée à chaque réponse, en ms (défaut: 0)")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="Latence aléatoire supplémentaire max, en ms (défaut: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Probabilité de répondre une erreur (défaut: 0)")
+    parser.add_argument("--error-status", type=int, default=503,
+                        help="Code HTTP des erreurs injectées (défaut: 503)")
+    args = parser.parse_args()
+
+    archive = CrawlArchive(args.archive)
+    server = ReplayServer(
+        (args.host, args.port),
+        make_handler(archive, latency=args.latency / 1000, jitter=args.jitter / 1000,
+                     error_rate=args.error_rate, error_status=args.error_status)
+    )
+    print("=" * 70)
+    print("🎞️  SERVEUR DE REJEU")
+    print(f"   Archive  : {args.archive} ({archive.count()} réponses)")
+    print(f"   Adresse  : http://{args.host}:{args.port}")
+    print(f"   Latence  : {args.latency:.0f} ms (+ jitter {args.jitter:.0f} ms)")
+    print(f"   Erreurs  : {args.error_rate:.1%} → HTTP {args.error_status}")
+    print("=" * 70)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Arrêt du serveur.")
+    finally:
+        archive.close()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipeline incrémental des phases 04 → 09 (fusion, nettoyage, Wikipedia,
+consolidation, tokenizer, pré-tokenisation, normalisation, embeddings).
+
+Chaque phase déclare ses entrées, ses sorties et ses paramètres. Elle n'est
+relancée que si le hash de ses entrées, de son script ou de ses paramètres
+a changé depuis la dernière exécution réussie (pipeline_state.json), ou si
+une de ses sorties a disparu. Les phases indépendantes (nettoyage des lyrics
+et téléchargement Wikipedia, tokenizer et embeddings) tournent en parallèle.
+
+Chaque phase est un sous-processus : son temps réel et son pic de mémoire
+(RSS) sont journalisés dans pipeline.log.
+
+Usage :
+    python3 run_pipeline.py                       # tout ce qui a changé
+    python3 run_pipeline.py --dry-run             # ce qui serait relancé
+    python3 run_pipeline.py --only clean consolidate --force
+    python3 run_pipeline.py --config pipeline.json
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PHASES = [
+    {
+        "name": "merge",
+        "script": "04_merge_corpus.py",
+        "inputs": ["output"],
+        "outputs": ["malagasy_lyrics_corpus.txt"],
+        "args": ["--output", "output", "--final", "malagasy_lyrics_corpus.txt"],
+    },
+    {
+        "name": "clean",
+        "script": "05_clean_corpus.py",
+        "inputs": ["malagasy_lyrics_corpus.txt"],
+        "outputs": ["malagasy_lyrics_cleaned.txt"],
+        "args": ["--input", "malagasy_lyrics_corpus.txt", "--output", "malagasy_lyrics_cleaned.txt"],
+    },
+    {
+        "name": "wiki_download",
+        "script": "10_download_wikipedia.py",
+        "inputs": [],
+        "outputs": ["../mgwiki-latest-pages-articles.xml.bz2"],
+        "args": [],
+    },
+    {
+        "name": "consolidate",
+        "script": "06_consolidate_corpus.py",
+        # Les articles sont extraits du dump à la volée (pas de texte Wikipedia intermédiaire)
+        "inputs": ["malagasy_lyrics_cleaned.txt", "../from_bible_json", "../mgwiki-latest-pages-articles.xml.bz2"],
+        "outputs": ["malagasy_corpus_v2_final.txt"],
+        "args": ["--lyrics", "malagasy_lyrics_cleaned.txt", "--bible", "../from_bible_json",
+                 "--wiki", "../mgwiki-latest-pages-articles.xml.bz2", "--output", "malagasy_corpus_v2_final.txt"],
+    },
+    {
+        "name": "tokenizer",
+        "script": "07_train_tokenizer.py",
+        "inputs": ["malagasy_corpus_v2_final.txt"],
+        "outputs": ["tokenizer_mg"],
+        "args": ["--corpus", "malagasy_corpus_v2_final.txt", "--output", "tokenizer_mg"],
+    },
+    {
+        "name": "encode",
+        "script": "14_encode_corpus.py",
+        "inputs": ["malagasy_corpus_v2_final.txt", "tokenizer_mg"],
+        "outputs": ["corpus_tokens"],
+        "args": ["--corpus", "malagasy_corpus_v2_final.txt", "--tokenizer", "tokenizer_mg/tokenizer-mg.json",
+                 "--output", "corpus_tokens"],
+    },
+    {
+        "name": "normalize",
+        "script": "09_normalize_corpus.py",
+        "inputs": ["malagasy_corpus_v2_final.txt"],
+        "outputs": ["malagasy_corpus_normalized.txt"],
+        "args": ["--input", "malagasy_corpus_v2_final.txt", "--output", "malagasy_corpus_normalized.txt"],
+    },
+    {
+        "name": "embeddings",
+        "script": "08_train_embeddings.py",
+        "inputs": ["malagasy_corpus_normalized.txt"],
+        "outputs": ["embeddings_mg"],
+        "args": ["--corpus", "malagasy_corpus_normalized.txt", "--output", "embeddings_mg", "--corpus-file"],
+    },
+]
+
+
+# ============================================================
+# HASH DU CONTENU
+# ============================================================
+
+class ContentHasher:
+    """Hash blake2b des fichiers et dossiers, mémorisé par (taille, mtime).
+
+    Un gros corpus inchangé n'est donc pas relu à chaque lancement. Les
+    dossiers (output/ et ses milliers de petits fichiers) sont hachés sur la
+    liste (chemin relatif, taille, mtime) de leurs fichiers.
+    """
+
+    def __init__(self, memo=None):
+        self.memo = memo or {}
+        self.lock = threading.Lock()
+
+    def file_hash(self, path):
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        with self.lock:
+            cached = self.memo.get(path)
+        if cached and cached[:2] == stamp:
+            return cached[2]
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with self.lock:
+            self.memo[path] = stamp + [digest]
+        return digest
+
+    def dir_hash(self, path):
+        h = hashlib.blake2b(digest_size=16)
+        stack = [path]
+        entries = []
+        while stack:
+            current = stack.pop()
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        st = entry.stat()
+                        entries.append((os.path.relpath(entry.path, path), st.st_size, st.st_mtime_ns))
+        for rel, size, mtime in sorted(entries):
+            h.update(f"{rel}\0{size}\0{mtime}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def path_hash(self, path):
+        """Hash d'un fichier ou d'un dossier, None s'il n'existe pas."""
+        if os.path.isdir(path):
+            return self.dir_hash(path)
+        if os.path.isfile(path):
+            return self.file_hash(path)
+        return None
+
+
+def phase_key(phase, hasher):
+    """Empreinte d'une phase : script + paramètres + contenu des entrées."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(hasher.file_hash(os.path.join(HERE, phase["script"])).encode())
+    h.update(json.dumps(phase["args"]).encode("utf-8"))
+    for path in phase["inputs"]:
+        h.update(f"{path}={hasher.path_hash(path)}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+# ============================================================
+# ÉTAT
+# ============================================================
+
+def load_state(state_file):
+    if not os.path.exists(state_file):
+        return {"phases": {}, "files": {}}
+    with open(state_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state_file, state):
+    tmp = f"{state_file}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, state_file)
+
+
+# ============================================================
+# EXÉCUTION
+# ============================================================
+
+def run_phase(phase, logger):
+    """Lance le script de la phase ; retourne (code retour, durée s, pic RSS en MB)."""
+    cmd = [sys.executable, os.path.join(HERE, phase["script"])] + phase["args"]
+    log_path = f"pipeline_{phase['name']}.log"
+    logger.info(f"▶️  {phase['name']:<14} : {' '.join(cmd[1:])}")
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 donne l'usage mémoire de CE processus, même avec des phases en parallèle
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - start
+    return proc.returncode, elapsed, usage.ru_maxrss / 1024
+
+
+def dependencies(phases):
+    """{phase: {phases qui produisent une de ses entrées}}."""
+    producers = {out: p["name"] for p in phases for out in p["outputs"]}
+    return {
+        p["name"]: {producers[i] for i in p["inputs"] if i in producers and producers[i] != p["name"]}
+        for p in phases
+    }
+
+
+def run_pipeline(only=None, force=False, jobs=2, dry_run=False,
+                 state_file="pipeline_state.json", config=None):
+    """Exécute les phases dont les entrées ont changé, en parallèle quand c'est possible.
+
+    `only` : noms des phases à considérer (les autres sont supposées à jour).
+    `force` : relance les phases sélectionnées même si rien n'a changé.
+    `config` : {phase: {"args": [...]}} pour remplacer les paramètres par défaut.
+    """
+    log_file = "pipeline.log"
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file, encoding='utf-8'),
+            logging.StreamHandler()
+        ]
+    )
+    logger = logging.getLogger(__name__)
+
+    phases = [dict(p) for p in PHASES]
+    for p in phases:
+        p.update((config or {}).get(p["name"], {}))
+    by_name = {p["name"]: p for p in phases}
+    deps = dependencies(phases)
+    selected = set(only) if only else set(by_name)
+
+    state = load_state(state_file)
+    hasher = ContentHasher(state.get("files"))
+    state_lock = threading.Lock()
+
+    logger.info("=" * 70)
+    logger.info("🛠️  PIPELINE INCRÉMENTAL (04 → 09)")
+    logger.info(f"   Phases      : {', '.join(p['name'] for p in phases if p['name'] in selected)}")
+    logger.info(f"   Parallélisme: {jobs}")
+    logger.info(f"   État        : {state_file}")
+    logger.info("=" * 70)
+
+    def needs_run(name):
+        phase = by_name[name]
+        key = phase_key(phase, hasher)
+        previous = state["phases"].get(name, {})
+        missing = [o for o in phase["outputs"] if not os.path.exists(o)]
+        return key, force or missing or previous.get("key") != key
+
+    def execute(name, upstream_pending=False):
+        key, changed = needs_run(name)
+        if not changed and not upstream_pending:
+            return name, "cached", 0.0, 0.0
+        if dry_run:
+            return name, "would_run", 0.0, 0.0
+        code, elapsed, rss = run_phase(by_name[name], logger)
+        missing = [o for o in by_name[name]["outputs"] if not os.path.exists(o)]
+        if code != 0 or missing:
+            return name, "failed", elapsed, rss
+        with state_lock:
+            state["phases"][name] = {
+                "key": key,
+                "outputs": {o: hasher.path_hash(o) for o in by_name[name]["outputs"]},
+                "elapsed": round(elapsed, 2),
+                "peak_rss_mb": round(rss, 1),
+                "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            state["files"] = hasher.memo
+            save_state(state_file, state)
+        return name, "done", elapsed, rss
+
+    results = {}
+    done = {name for name in by_name if name not in selected}
+    pending = [p["name"] for p in phases if p["name"] in selected]
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            for name in list(pending):
+                blocked = deps[name] - done
+                if any(results.get(d, ("",))[0] in ("failed", "skipped") for d in deps[name]):
+                    pending.remove(name)
+                    results[name] = ("skipped", 0.0, 0.0)
+                    logger.info(f"⏭️  {name:<14} : sautée (dépendance en échec)")
+                    done.add(name)
+                elif not blocked and len(running) < jobs:
+                    pending.remove(name)
+                    # En --dry-run, une phase en amont « à relancer » n'a pas encore changé ses sorties
+                    upstream = any(results[d][0] == "would_run" for d in deps[name] if d in results)
+                    running[executor.submit(execute, name, upstream)] = name
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                _, status, elapsed, rss = future.result()
+                results[name] = (status, elapsed, rss)
+                done.add(name)
+                if status == "done":
+                    logger.info(f"✅ {name:<14} : {elapsed:8.1f}s, RSS max {rss:8.1f} MB")
+                elif status == "failed":
+                    logger.info(f"❌ {name:<14} : échec après {elapsed:.1f}s "
+                                f"(voir pipeline_{name}.log)")
+                elif status == "would_run":
+                    logger.info(f"🔁 {name:<14} : à relancer")
+                else:
+                    logger.info(f"💾 {name:<14} : inchangée (cache)")
+
+    if not dry_run:
+        state["files"] = hasher.memo
+        save_state(state_file, state)
+
+    logger.info("\n" + "=" * 70)
+    logger.info("📊 RÉSUMÉ DU PIPELINE")
+    logger.info("=" * 70)
+    logger.info(f"{'Phase':<16} {'Statut':<10} {'Durée':>10} {'RSS max':>12}")
+    logger.info("-" * 70)
+    for p in phases:
+        if p["name"] in results:
+            status, elapsed, rss = results[p["name"]]
+            logger.info(f"{p['name']:<16} {status:<10} {elapsed:>9.1f}s {rss:>9.1f} MB")
+    logger.info("=" * 70)
+    return 0 if all(r[0] != "failed" for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pipeline incrémental des phases 04 → 09 avec cache par hash de contenu"
+    )
+    parser.add_argument("--only", nargs="+", default=None,
+                        choices=[p["name"] for p in PHASES],
+                        help="Ne considérer que ces phases")
+    parser.add_argument("--force", action="store_true",
+                        help="Relancer les phases sélectionnées même si rien n'a changé")
+    parser.add_argument("--jobs", type=int, default=2,
+                        help="Phases indépendantes lancées en parallèle (défaut: 2)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Affiche ce qui serait relancé sans rien exécuter")
+    parser.add_argument("--state", type=str, default="pipeline_state.json",
+                        help="Fichier d'état du pipeline (défaut: pipeline_state.json)")
+    parser.add_argument("--config", type=str, default=None,
+                        help='JSON {"phase": {"args": [...]}} pour changer les paramètres')
+    args = parser.parse_args()
+
+    config = None
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+
+    sys.exit(run_pipeline(only=args.only, force=args.force, jobs=args.jobs,
+                          dry_run=args.dry_run, state_file=args.state, config=config))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Outils communs aux scripts de phase et aux benchmarks.
+
+- load_script() importe un script NN_*.py, dont le nom n'est pas un nom de
+  module importable directement ;
+- measured() exécute une fonction dans un processus fils et rend sa durée
+  et son pic mémoire (entraînements comparés en balayage : 07, eval_embeddings) ;
+- peak_rss_mb() donne le pic mémoire du processus courant.
+"""
+
+import os
+import sys
+import json
+import time
+import traceback
+import importlib.util
+
+try:
+    import resource  # Pic mémoire (Linux / macOS)
+except ImportError:
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(filename, name):
+    """Importe le script `filename` (à côté de ce fichier) sous le nom `name`."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    # Enregistré pour que les pools de processus retrouvent ses fonctions
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def peak_mb(maxrss):
+    # ru_maxrss : kilo-octets sous Linux, octets sous macOS
+    return round(maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def peak_rss_mb():
+    """Pic de RSS du processus courant en MB, ou None sans module resource."""
+    if resource is None:
+        return None
+    return peak_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def measured(fn, *args):
+    """Exécute fn(*args) dans un processus fils : (résultat, secondes, pic RSS en MB).
+
+    Le résultat doit être sérialisable en JSON. Le pic mémoire est celui du
+    fils seul (os.wait4), donc propre à chaque appel. Sans fork, exécution
+    sur place (pic du processus entier, 0 sans module resource).
+    """
+    start = time.time()
+    if not hasattr(os, "fork") or not hasattr(os, "wait4"):
+        result = fn(*args)
+        return result, time.time() - start, peak_rss_mb() or 0.0
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        status = 1
+        try:
+            result = fn(*args)
+            os.write(write_fd, json.dumps(result).encode())
+            status = 0
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            os._exit(status)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as pipe:
+        payload = pipe.read()
+    _, status, usage = os.wait4(pid, 0)
+    if status != 0:
+        raise RuntimeError("l'exécution a échoué dans le processus fils")
+    return json.loads(payload), time.time() - start, peak_mb(usage.ru_maxrss)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parser rapide des pages de chanson, basé sur lxml.
+Même résultat que extract_song_info (BeautifulSoup / html.parser) de la
+Phase 2, mais le titre, l'artiste et le div source sont trouvés en un seul
+parcours de l'arbre, au lieu de quatre scans complets du document.
+
+La conformité octet par octet est vérifiée par bench_song_parser.py sur des
+pages sauvegardées.
+"""
+
+import re
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # Optionnel : repli sur BeautifulSoup dans la Phase 2
+    lxml = None
+    etree = None
+
+
+SOURCE_CLASS = "print my-3 fst-italic"
+SOURCE_TEXT = "Nalaina tao amin'ny tononkira.serasera.org"
+
+# Chaînes que BeautifulSoup exclut de get_text() (Script, Stylesheet, TemplateString)
+SPECIAL_TAGS = ("script", "style", "template")
+
+# Balises qui terminent le bloc de paroles
+STOP_TAGS = ("div", "h5", "form", "footer")
+
+
+def _is_string_node(el):
+    """Commentaires et instructions : des NavigableString pour BeautifulSoup."""
+    return el.tag is etree.Comment or el.tag is etree.ProcessingInstruction
+
+
+def _strings(el, out):
+    """Ajoute à `out` les textes que BeautifulSoup compterait dans get_text()."""
+    if el.text and el.tag not in SPECIAL_TAGS:
+        out.append(el.text)
+    for child in el:
+        if not _is_string_node(child) and child.tag not in SPECIAL_TAGS:
+            _strings(child, out)
+        if child.tail:
+            out.append(child.tail)
+
+
+def get_text_strip(el):
+    """Équivalent de Tag.get_text(strip=True)."""
+    if el.tag in SPECIAL_TAGS:
+        parts = [el.text or ""]
+    else:
+        parts = []
+        _strings(el, parts)
+    return "".join(p.strip() for p in parts if p.strip())
+
+
+def single_string(el):
+    """Équivalent de Tag.string : le texte unique de l'élément, sinon None."""
+    while True:
+        children = list(el)
+        count = len(children) + (1 if el.text else 0) + sum(1 for c in children if c.tail)
+        if count != 1:
+            return None
+        if el.text:
+            return el.text
+        child = children[0]
+        if _is_string_node(child):
+            return child.text
+        el = child
+
+
+def _parse(html):
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # Chaîne avec déclaration d'encodage XML : lxml veut des octets
+        return lxml.html.document_fromstring(html.encode("utf-8"))
+
+
+def extract_song_info_lxml(html, song_url):
+    """Extrait le titre, l'artiste et les paroles d'une page de chanson.
+
+    Retourne un dict {title, artist, lyrics} ou None si échec, exactement
+    comme extract_song_info de 02_scrape_lyrics.py.
+    """
+    root = _parse(html)
+
+    first_h2 = first_h1 = title_tag = None
+    artist = ""
+    artist_found = False
+    source_div = fallback_div = None
+
+    # Un seul parcours : on s'arrête dès que tout ce qui compte est trouvé
+    for el in root.iter():
+        tag = el.tag
+        if tag == "h2":
+            if first_h2 is None:
+                first_h2 = el
+        elif tag == "h1":
+            if first_h1 is None:
+                first_h1 = el
+        elif tag == "title":
+            if title_tag is None:
+                title_tag = el
+        elif tag == "a":
+            if not artist_found and "href" in el.attrib:
+                href = el.attrib["href"]
+                if "/mpihira/" in href and "/hira" not in href and "/ankafizo" not in href:
+                    candidate = get_text_strip(el)
+                    if candidate and len(candidate) > 1:
+                        artist = candidate
+                        artist_found = True
+        elif tag == "div":
+            if source_div is None:
+                text = single_string(el)
+                if text and "tononkira.serasera.org" in text:
+                    if fallback_div is None:
+                        fallback_div = el
+                    if (SOURCE_TEXT in text
+                            and " ".join(el.get("class", "").split()) == SOURCE_CLASS):
+                        source_div = el
+        if first_h2 is not None and artist_found and source_div is not None:
+            break
+
+    # Titre — <h2> "TITRE (Artiste)", sinon <h1>, sinon <title>
+    title = ""
+    title_elem = first_h2 if first_h2 is not None else first_h1
+    if title_elem is not None:
+        title = get_text_strip(title_elem)
+        title = re.sub(r'\(.*?\)', '', title).strip()
+    if not title and title_tag is not None:
+        parts = [title_tag.text or ""]
+        if title_tag.tag not in SPECIAL_TAGS:
+            parts = []
+            _strings(title_tag, parts)
+        title = "".join(parts).split("-")[0].strip()
+
+    source_div = source_div if source_div is not None else fallback_div
+    if source_div is None:
+        return None
+
+    # Paroles — les frères qui suivent le div source
+    lines = []
+    if source_div.tail:
+        t = source_div.tail.strip()
+        if t:
+            lines.append(t)
+    for elem in source_div.itersiblings():
+        if _is_string_node(elem):
+            t = (elem.text or "").strip()
+            if t:
+                lines.append(t)
+        elif elem.tag in STOP_TAGS:
+            break
+        elif elem.tag == "br":
+            lines.append("\n")
+        else:
+            t = get_text_strip(elem)
+            if t:
+                lines.append(t)
+        if elem.tail:
+            t = elem.tail.strip()
+            if t:
+                lines.append(t)
+
+    lyrics = "\n".join(lines)
+    lyrics = re.sub(r"\n{3,}", "\n\n", lyrics).strip()
+
+    if not lyrics:
+        return None
+
+    return {
+        "title": title,
+        "artist": artist,
+        "lyrics": lyrics
+    }
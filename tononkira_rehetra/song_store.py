@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stockage des chansons en shards append-only, à la place d'un fichier .txt
+par chanson dans output/<artiste>/.
+
+Structure d'un store :
+    song_store/
+    ├── shard-00000.jsonl   # une chanson par ligne, taille plafonnée
+    ├── shard-00001.jsonl
+    └── index.sqlite        # (artiste, nom) -> shard, position, longueur, taille
+
+Chaque ligne est un objet JSON {artist, name, url, content}, où `content`
+est exactement le texte du fichier .txt historique et `name` son nom sans
+extension. Les phases suivantes lisent quelques gros fichiers séquentiellement
+au lieu de parcourir des dizaines de milliers de petits fichiers, ce qui
+change tout sur Google Drive ou un disque réseau.
+
+Usage :
+    python3 song_store.py import --folders output --store song_store
+    python3 song_store.py export --store song_store --folders output
+"""
+
+import os
+import json
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+
+
+DEFAULT_SHARD_SIZE = 64 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS songs (
+    artist   TEXT NOT NULL,
+    name     TEXT NOT NULL,
+    url      TEXT,
+    shard    INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    length   INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    PRIMARY KEY (artist, name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_songs_position ON songs (shard, position);
+"""
+
+
+def shard_name(number):
+    return f"shard-{number:05d}.jsonl"
+
+
+class SongStore:
+    """Store de chansons thread-safe : un seul shard ouvert en écriture.
+
+    Une écriture = une ligne ajoutée au shard courant, puis une ligne dans
+    l'index. L'index fait foi : une ligne écrite sans entrée d'index (crash
+    entre les deux) est tronquée à la réouverture.
+    """
+
+    def __init__(self, root="song_store", shard_size=DEFAULT_SHARD_SIZE):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.shard_size = shard_size
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.root / "index.sqlite", check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self.writer = None
+        self.shard = None
+
+    def close(self):
+        with self.lock:
+            if self.writer:
+                self.writer.close()
+                self.writer = None
+            self.conn.close()
+
+    # --------------------------------------------------------
+    # Écriture
+    # --------------------------------------------------------
+
+    def _open_writer(self):
+        """Ouvre le dernier shard en ajout, tronqué à la fin de son index."""
+        row = self.conn.execute(
+            "SELECT shard, MAX(position + length) FROM songs "
+            "WHERE shard = (SELECT MAX(shard) FROM songs)"
+        ).fetchone()
+        if row[0] is None:
+            self.shard, end = 0, 0
+        else:
+            self.shard, end = row
+        path = self.root / shard_name(self.shard)
+        if path.exists() and path.stat().st_size > end:
+            with open(path, "r+b") as f:
+                f.truncate(end)
+        self.writer = open(path, "ab")
+
+    def put(self, artist, name, url, content):
+        """Ajoute (ou remplace) une chanson ; l'ancienne version reste dans
+        son shard mais n'est plus indexée."""
+        line = json.dumps(
+            {"artist": artist, "name": name, "url": url, "content": content},
+            ensure_ascii=False
+        ).encode("utf-8") + b"\n"
+        with self.lock:
+            if self.writer is None:
+                self._open_writer()
+            position = self.writer.tell()
+            if position and position + len(line) > self.shard_size:
+                self.writer.close()
+                self.shard += 1
+                self.writer = open(self.root / shard_name(self.shard), "ab")
+                position = self.writer.tell()
+            self.writer.write(line)
+            self.writer.flush()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO songs (artist, name, url, shard, position, length, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (artist, name, url, self.shard, position, len(line),
+                 len(content.encode("utf-8")))
+            )
+            self.conn.commit()
+
+    # --------------------------------------------------------
+    # Lecture
+    # --------------------------------------------------------
+
+    def exists(self, artist, name):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT 1 FROM songs WHERE artist = ? AND name = ?", (artist, name)
+            ).fetchone() is not None
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+
+    def entries(self):
+        """[(artist, name, size)] triés par artiste puis nom, sans lire les shards."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT artist, name, size FROM songs ORDER BY artist, name"
+            ).fetchall()
+
+    def iter_songs(self):
+        """Parcourt toutes les chansons indexées, dans l'ordre des shards.
+
+        Les shards sont lus séquentiellement ; les anciennes versions d'une
+        chanson remplacée sont sautées.
+        """
+        with self.lock:
+            if self.writer:
+                self.writer.flush()
+            rows = self.conn.execute(
+                "SELECT shard, position, length FROM songs ORDER BY shard, position"
+            ).fetchall()
+
+        current, f = None, None
+        try:
+            for shard, position, length in rows:
+                if shard != current:
+                    if f:
+                        f.close()
+                    f = open(self.root / shard_name(shard), "rb", buffering=1024 * 1024)
+                    current = shard
+                if f.tell() != position:
+                    f.seek(position)
+                yield json.loads(f.read(length))
+        finally:
+            if f:
+                f.close()
+
+
+def is_store(path):
+    """Vrai si `path` est un dossier de store (contient index.sqlite)."""
+    return (Path(path) / "index.sqlite").exists()
+
+
+# ============================================================
+# COMPATIBILITÉ AVEC LE FORMAT DOSSIERS
+# ============================================================
+
+def export_to_folders(store, output_dir):
+    """Recrée output/<artiste>/<nom>.txt à partir du store."""
+    output_base = Path(output_dir)
+    count = 0
+    made = set()
+    for song in store.iter_songs():
+        artist_dir = output_base / song["artist"]
+        if song["artist"] not in made:
+            artist_dir.mkdir(parents=True, exist_ok=True)
+            made.add(song["artist"])
+        with open(artist_dir / (song["name"] + ".txt"), "w", encoding="utf-8") as f:
+            f.write(song["content"])
+        count += 1
+    return count
+
+
+def import_from_folders(store, output_dir):
+    """Ajoute au store les fichiers output/<artiste>/*.txt absents de l'index."""
+    count = 0
+    with os.scandir(output_dir) as artists:
+        for artist in sorted((e for e in artists if e.is_dir()), key=lambda e: e.name):
+            with os.scandir(artist.path) as songs:
+                for entry in sorted(songs, key=lambda e: e.name):
+                    if not (entry.is_file() and entry.name.endswith(".txt")):
+                        continue
+                    name = entry.name[:-4]
+                    if store.exists(artist.name, name):
+                        continue
+                    with open(entry.path, "r", encoding="utf-8") as f:
+                        content = f.read()
+                    url = None
+                    for line in content.split("\n", 3)[:3]:
+                        if line.startswith("Source: "):
+                            url = line[len("Source: "):]
+                    store.put(artist.name, name, url, content)
+                    count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Conversion entre le store de chansons et le format dossiers output/"
+    )
+    parser.add_argument("action", choices=["import", "export"],
+                        help="import : dossiers -> store ; export : store -> dossiers")
+    parser.add_argument("--store", type=str, default="song_store",
+                        help="Dossier du store (défaut: song_store/)")
+    parser.add_argument("--folders", type=str, default="output",
+                        help="Dossier au format historique (défaut: output/)")
+    parser.add_argument("--shard-size", type=int, default=64,
+                        help="Taille max d'un shard en MB (défaut: 64)")
+    args = parser.parse_args()
+
+    store = SongStore(args.store, shard_size=args.shard_size * 1024 * 1024)
+    print("=" * 70)
+    if args.action == "import":
+        print(f"📥 IMPORT : {args.folders} -> {args.store}")
+        n = import_from_folders(store, args.folders)
+    else:
+        print(f"📤 EXPORT : {args.store} -> {args.folders}")
+        n = export_to_folders(store, args.folders)
+    print(f"✅ {n} chansons traitées ({store.count()} dans le store)")
+    print("=" * 70)
+    store.close()
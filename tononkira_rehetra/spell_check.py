@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Règle de détection des fautes du correcteur (route /check de web_app/app.py),
+partagée avec eval_embeddings.py qui en mesure la précision et le rappel.
+
+Un mot est considéré correct s'il est fréquent dans le corpus (au moins
+FREQ_OK occurrences). Sinon, on demande à l'IA son plus proche voisin : un
+mot absent est une faute si ce voisin est à moins de OOV_THRESHOLD, un mot
+rare si le voisin est à moins de RARE_THRESHOLD.
+"""
+
+FREQ_OK = 5
+OOV_THRESHOLD = 0.85
+RARE_THRESHOLD = 0.70
+
+
+def word_freq(wv, word):
+    try:
+        return wv.get_vecattr(word.lower(), "count")
+    except:
+        return 0
+
+
+def check_word(wv, word):
+    """(faute ?, fréquence, score du plus proche voisin ou None) pour `word`."""
+    word_lower = word.lower()
+    freq = word_freq(wv, word_lower)
+    if freq >= FREQ_OK:
+        return False, freq, None
+
+    # Si le mot est rare ou absent, on demande l'avis sémantique de l'IA
+    try:
+        similars = wv.most_similar(word_lower, topn=1)
+        score = similars[0][1]
+    except:
+        # Mot inconnu et impossible à analyser
+        return True, freq, None
+
+    # Seuil de tolérance :
+    # Si le mot est absent (freq=0) et score < 0.85 -> Erreur
+    # Si le mot est très rare (freq < 5) et score < 0.70 -> Erreur
+    if freq == 0:
+        return score < OOV_THRESHOLD, freq, score
+    return score < RARE_THRESHOLD, freq, score
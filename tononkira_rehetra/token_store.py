@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Corpus pré-tokenisé : identifiants de tokens en tableaux np.memmap.
+
+Structure d'un store (écrit par 14_encode_corpus.py) :
+    corpus_tokens/
+    ├── tokens.bin      # identifiants de tous les documents bout à bout (uint16 ou uint32)
+    ├── offsets.npy     # int64, n_documents + 1 : document i = tokens[offsets[i]:offsets[i + 1]]
+    └── meta.json       # dtype, taille du vocabulaire, tokenizer et corpus d'origine
+
+Un document est un bloc du corpus consolidé (séparé par une ligne vide).
+Les deux tableaux sont projetés en mémoire sans être lus : ouvrir un store
+de plusieurs Go est instantané et un document n'est qu'une vue (sans
+copie) dans tokens.bin.
+
+Usage :
+    from token_store import TokenCorpus
+    corpus = TokenCorpus("corpus_tokens")
+    ids = corpus[42]                     # np.ndarray en lecture seule
+    lengths = corpus.lengths()
+
+    python3 token_store.py --store corpus_tokens   # statistiques
+"""
+
+import os
+import json
+import argparse
+
+import numpy as np
+
+
+TOKENS_FILE = "tokens.bin"
+OFFSETS_FILE = "offsets.npy"
+META_FILE = "meta.json"
+
+
+def token_dtype(vocab_size):
+    """Plus petit type entier non signé qui contient tous les identifiants."""
+    return np.uint16 if vocab_size <= np.iinfo(np.uint16).max + 1 else np.uint32
+
+
+def is_token_store(path):
+    return os.path.exists(os.path.join(path, META_FILE))
+
+
+class TokenCorpus:
+    """Accès aléatoire par document à un store de tokens, sans copie."""
+
+    def __init__(self, root="corpus_tokens"):
+        self.root = root
+        with open(os.path.join(root, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.dtype = np.dtype(self.meta["dtype"])
+        self.vocab_size = self.meta["vocab_size"]
+        self.offsets = np.load(os.path.join(root, OFFSETS_FILE), mmap_mode="r")
+        if self.offsets[-1]:
+            self.tokens = np.memmap(os.path.join(root, TOKENS_FILE), dtype=self.dtype,
+                                    mode="r", shape=(int(self.offsets[-1]),))
+        else:
+            # np.memmap refuse un fichier vide
+            self.tokens = np.empty(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"document {index} hors du store ({len(self)} documents)")
+        return self.tokens[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.tokens[self.offsets[index]:self.offsets[index + 1]]
+
+    @property
+    def num_tokens(self):
+        return int(self.offsets[-1])
+
+    def lengths(self):
+        """Nombre de tokens de chaque document."""
+        return np.diff(self.offsets)
+
+    def token_counts(self):
+        """Fréquence de chaque identifiant sur tout le corpus."""
+        return np.bincount(self.tokens, minlength=self.vocab_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Statistiques d'un corpus pré-tokenisé")
+    parser.add_argument("--store", type=str, default="corpus_tokens", help="Dossier du store")
+    args = parser.parse_args()
+
+    corpus = TokenCorpus(args.store)
+    lengths = corpus.lengths()
+    print(f"📚 {len(corpus)} documents, {corpus.num_tokens} tokens ({corpus.dtype.name})")
+    if len(corpus):
+        print(f"📏 Tokens par document : moyenne {lengths.mean():.1f}, "
+              f"médiane {np.median(lengths):.0f}, max {lengths.max()}")
+        used = np.count_nonzero(corpus.token_counts())
+        print(f"🔤 Vocabulaire utilisé : {used}/{corpus.vocab_size}")
@@ -2,28 +2,40 @@ from flask import Flask, render_template, request, jsonify, make_response
 from gensim.models import FastText
 import os
 import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_store import is_vector_store, load_vectors
+from quantized_store import is_quantized_store, QuantizedVectors
+from spell_check import check_word
 
 app = Flask(__name__)
 
 # Config
 MODEL_PATH = "model/malagasy_fasttext.model"
-model = None
+# Vecteurs exportés par 08_train_embeddings.py (embeddings_mg/serving), ouverts en mmap
+VECTORS_PATH = "model/serving"
+# Ou vecteurs quantifiés par quantized_store.py (petites machines)
+QUANTIZED_PATH = "model/quantized"
+wv = None
 
 def load_model():
-    global model
-    if os.path.exists(MODEL_PATH):
+    global wv
+    if is_vector_store(VECTORS_PATH):
+        print(f"📦 Chargement du cerveau Malagasy: {VECTORS_PATH} (mmap)")
+        wv = load_vectors(VECTORS_PATH)
+        print("✅ Modèle chargé !")
+    elif is_quantized_store(QUANTIZED_PATH):
+        print(f"📦 Chargement du cerveau Malagasy: {QUANTIZED_PATH} (quantifié)")
+        wv = QuantizedVectors(QUANTIZED_PATH)
+        print("✅ Modèle chargé !")
+    elif os.path.exists(MODEL_PATH):
         print(f"📦 Chargement du cerveau Malagasy: {MODEL_PATH}")
-        model = FastText.load(MODEL_PATH)
+        wv = FastText.load(MODEL_PATH).wv
         print("✅ Modèle chargé !")
     else:
         print(f"⚠️ Modèle introuvable à {MODEL_PATH}. L'app fonctionnera sans IA.")
 
-def get_word_freq(w):
-    try:
-        return model.wv.get_vecattr(w.lower(), "count")
-    except:
-        return 0
-
 @app.route('/')
 def index():
     response = make_response(render_template('index.html'))
@@ -34,7 +46,7 @@ def index():
 
 @app.route('/check', methods=['POST'])
 def check():
-    if model is None:
+    if wv is None:
         return jsonify({"errors": []})
         
     data = request.json
@@ -47,35 +59,17 @@ def check():
     print(f"\n--- Analyse de texte ---")
     
     for word in words:
-        word_lower = word.lower()
-        freq = get_word_freq(word_lower)
-        
-        # LOGIQUE DÉTECTION :
+        # LOGIQUE DÉTECTION (spell_check.py) :
         # Un mot est considéré "Correct" si :
         # 1. Il est fréquent dans le corpus (freq >= 5)
         # 2. OU il est moyennement fréquent (1-4) ET il a un score de confiance sémantique très élevé
-        
-        is_error = False
-        
-        if freq < 5:
-            # Si le mot est rare ou absent, on demande l'avis sémantique de l'IA
-            try:
-                similars = model.wv.most_similar(word_lower, topn=1)
-                score = similars[0][1]
-                
-                # Seuil de tolérance : 
-                # Si le mot est absent (freq=0) et score < 0.85 -> Erreur
-                # Si le mot est très rare (freq < 5) et score < 0.75 -> Erreur
-                if freq == 0 and score < 0.85:
-                    is_error = True
-                elif freq > 0 and score < 0.70:
-                    is_error = True
-                    
-                if is_error:
-                    print(f"🚩 FAUTE : '{word}' (Freq: {freq}, Score: {score:.4f})")
-            except:
-                is_error = True
+        is_error, freq, score = check_word(wv, word)
+
+        if is_error:
+            if score is None:
                 print(f"🚩 FAUTE : '{word}' (Mot inconnu et impossible à analyser)")
+            else:
+                print(f"🚩 FAUTE : '{word}' (Freq: {freq}, Score: {score:.4f})")
 
         if is_error:
             errors.append(word)
@@ -84,7 +78,7 @@ def check():
 
 @app.route('/predict', methods=['POST'])
 def predict():
-    if model is None:
+    if wv is None:
         return jsonify({"suggestions": []})
         
     data = request.json
@@ -100,14 +94,14 @@ def predict():
             return jsonify({"suggestions": []})
             
         # PRIORITÉ : index_to_key est trié par fréquence décroissante.
-        suggestions = [w for w in model.wv.index_to_key if w.startswith(last_word_part)][:5]
+        suggestions = [w for w in wv.index_to_key if w.startswith(last_word_part)][:5]
         return jsonify({"suggestions": suggestions, "type": "completion"})
         
     # Cas 2 : PRÉDICTION DU MOT SUIVANT (Contextual)
     else:
         last_word = text.strip().split()[-1].lower()
         try:
-            raw_suggestions = model.wv.most_similar(last_word, topn=15)
+            raw_suggestions = wv.most_similar(last_word, topn=15)
             suggestions = []
             for s in raw_suggestions:
                 s_word = s[0]
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Nettoyeur de wikitext en une passe (remplace la suite de re.sub de
+clean_wiki_text dans 11_extract_wiki.py).
+
+Une expression compilée saute le texte ordinaire jusqu'au prochain
+élément de balisage et le reconnaît ; une petite machine à états suit
+l'imbrication :
+  - modèles {{...}} et tableaux {| ... |} (imbriqués) : supprimés ;
+  - <ref>, <gallery>, <math>... : supprimés avec leur contenu ;
+    commentaires <!-- --> supprimés, autres balises HTML retirées ;
+  - liens [[cible|libellé]] -> libellé, [[cible]] -> cible ; liens de
+    fichiers, catégories et interwikis ([[xx:...]]) supprimés ;
+  - liens externes [http://... libellé] -> libellé.
+Le gras/italique, les titres de sections, les puces et les __MOTS_MAGIQUES__
+sont ensuite retirés du texte produit.
+
+À l'intérieur d'un modèle ou d'un tableau, seuls les délimiteurs
+d'imbrication sont cherchés, si bien que ces blocs sont sautés sans
+examiner leur contenu. Un modèle ou tableau jamais refermé n'efface pas
+la suite de l'article : seul son délimiteur ouvrant est retiré.
+
+Le débit face à l'ancienne version est mesuré par bench_wikitext.py.
+"""
+
+import re
+
+
+# Balisage structurel. Chaque motif commence par sauter le texte ordinaire
+# puis reconnaît l'élément. Chaque alternative commence par un caractère
+# exclu du texte sauté : le saut est atomique, pris dans une assertion
+# (?=(?P<run>...))(?P=run) dont le moteur ne revient jamais en arrière
+# (équivalent de *+, Python 3.11+ seulement). Un échec coûte donc un seul
+# parcours du texte ordinaire au lieu d'un retour arrière caractère par
+# caractère.
+# Les formes simples (lien sans lien imbriqué, modèle sans modèle imbriqué)
+# sont prises d'un seul coup ; les formes imbriquées passent par la pile.
+_STRUCTURE = r"""
+    (?P<template>\{\{[^{}]*\}\})
+  | (?P<open>\{\{)
+  | (?P<table>\{\|)
+  | (?P<close>\}\})
+  | (?P<simplelink>\[\[[^\[\]\n]*\]\])
+  | (?P<link>\[\[)
+  | (?P<endlink>\]\])
+  | (?P<simpleext>\[(?:https?:|ftp:|mailto:|//)[^\s\]]*[ \t]*(?P<extlabel>[^\[\]\n]*)\])
+  | (?P<ext>\[)
+  | (?P<endext>\])
+  | (?P<tag><)
+"""
+TOKEN = re.compile(r"(?=(?P<run>[^{}\[\]<]*))(?P=run)(?:" + _STRUCTURE + ")", re.X)
+
+# Dans un lien [[...]] imbriqué : les | séparent cible et libellé
+LINK_TOKEN = re.compile(r"(?=(?P<run>[^{}\[\]<|]*))(?P=run)(?:" + _STRUCTURE + r"| (?P<pipe>\|))",
+                        re.X)
+
+# À l'intérieur d'un modèle ou d'un tableau : seulement l'imbrication. Les
+# | des cellules et des paramètres sont sautés avec le texte ; seul un |}
+# en début de ligne ferme un tableau.
+SKIP_TOKEN = re.compile(r"""(?=(?P<run>[^{}<\n]*(?:\n(?![ \t]*\|\})[^{}<\n]*)*))(?P=run)(?:
+    (?P<template>\{\{[^{}]*\}\})
+  | (?P<open>\{\{)
+  | (?P<table>\{\|)
+  | (?P<close>\}\})
+  | (?P<endtable>\n[ \t]*\|\})
+  | (?P<tag><)
+)""", re.X)
+
+# Caractère spécial isolé ({, }, |...) sur lequel un motif a échoué
+SPECIAL = {TOKEN: re.compile(r"[{}\[\]<]"),
+           LINK_TOKEN: re.compile(r"[{}\[\]<|]"),
+           SKIP_TOKEN: re.compile(r"[{}<]")}
+
+HTML_TAG = re.compile(r"<(/?)([A-Za-z][A-Za-z0-9]*)(?:\s[^<>]*?)?(/?)>")
+EXT_URL = re.compile(r"(?:https?:|ftp:|mailto:|//)[^\s\]]*[ \t]*")
+
+# Mise en forme retirée du texte produit. Chaque motif commence par un
+# caractère fixe, ce qui garde les substitutions rapides.
+QUOTES = re.compile(r"'''*")
+LINE_MARKUP = re.compile(r"\n(?:=+[^\n]*=+[ \t]*(?=\n)|[*#:;]+[ \t]*)")
+MAGIC_WORDS = re.compile(r"__[A-Z]+__")
+BLANK_LINES = re.compile(r"\n\s*\n")
+
+# Balises dont le contenu n'est pas du texte d'article
+DROP_TAGS = {"ref", "references", "gallery", "math", "chem", "timeline", "score",
+             "syntaxhighlight", "source", "imagemap", "graph", "mapframe", "templatedata"}
+
+_CLOSING_TAGS = {}
+
+
+def _closing_tag(name):
+    pattern = _CLOSING_TAGS.get(name)
+    if pattern is None:
+        pattern = _CLOSING_TAGS[name] = re.compile(rf"</{name}\s*>", re.I)
+    return pattern
+
+
+def _skip_tag(text, pos):
+    """Position après la balise, le commentaire ou l'élément ignoré qui commence
+    en `pos` (sur le '<'), ou None si ce n'est pas une balise."""
+    if text.startswith("<!--", pos):
+        end = text.find("-->", pos + 4)
+        return len(text) if end < 0 else end + 3
+    m = HTML_TAG.match(text, pos)
+    if m is None:
+        return None
+    closing, name, self_closing = m.groups()
+    name = name.lower()
+    if name in DROP_TAGS and not closing and not self_closing:
+        end = _closing_tag(name).search(text, m.end())
+        if end is not None:
+            return end.end()
+    return m.end()
+
+
+def _line_start(text, pos):
+    """True si seuls des espaces précèdent `pos` sur sa ligne."""
+    # On remonte sur les espaces seulement : pas de parcours de la ligne entière
+    while pos and text[pos - 1] in " \t":
+        pos -= 1
+    return pos == 0 or text[pos - 1] == "\n"
+
+
+def _link_text(inner):
+    """Texte affiché d'un lien [[inner]], ou "" pour un fichier, une catégorie ou un interwiki."""
+    target, _, label = inner.partition("|")
+    if ":" in target:
+        return ""
+    # Le libellé est le dernier segment ; [[cible]] affiche la cible
+    return label.rpartition("|")[2] if label else target
+
+
+def _format(text):
+    """Retire gras/italique, titres, puces et mots magiques, puis les lignes vides."""
+    text = QUOTES.sub("", text)
+    text = LINE_MARKUP.sub("\n", "\n" + text + "\n")
+    if "__" in text:
+        text = MAGIC_WORDS.sub("", text)
+    return BLANK_LINES.sub("\n", text).strip()
+
+
+def strip_wikitext(text):
+    """Texte brut d'un article en wikitext (même rôle que clean_wiki_text)."""
+    out = []        # morceaux gardés au niveau de l'article
+    frames = []     # liens imbriqués ouverts : [genre ("link" / "ext"), morceaux, cible]
+    skip = []       # blocs ignorés ouverts : (fermeture "}}" ou "|}", position de l'ouverture)
+    unclosed = ()   # positions des ouvertures jamais refermées, retirées seules
+    pos = 0         # début du texte pas encore copié
+    scan = 0        # position où reprendre la recherche
+    pattern = TOKEN
+    sink = out
+
+    while True:
+        m = pattern.match(text, scan)
+        if m is None:
+            hit = SPECIAL[pattern].search(text, scan)
+            if hit is not None:
+                # Caractère spécial isolé : il reste dans le texte en cours
+                scan = hit.start() + 1
+                continue
+            if skip:
+                # Blocs jamais refermés : on ne retire que leurs délimiteurs
+                # ouvrants et on reprend après le plus externe (une seule fois)
+                unclosed = {start for _, start in skip}
+                pos = scan = skip[0][1] + 2
+                skip.clear()
+                pattern = LINK_TOKEN if frames and frames[-1][0] == "link" else TOKEN
+                continue
+            sink.append(text[pos:])
+            break
+
+        kind = m.lastgroup
+        start = m.start(kind)
+        if kind == "table" and not _line_start(text, start):
+            scan = start + 1
+            continue
+        if not skip:
+            sink.append(text[pos:start])
+        pos = scan = m.end()
+
+        if kind == "template":
+            continue
+        if kind == "simplelink":
+            sink.append(_link_text(text[start + 2:pos - 2]))
+            continue
+        if kind == "simpleext":
+            sink.append(m.group("extlabel"))
+            continue
+
+        if kind == "open" or kind == "table":
+            if start not in unclosed:
+                skip.append(("}}" if kind == "open" else "|}", start))
+        elif kind == "close":
+            if skip and skip[-1][0] == "}}":
+                skip.pop()
+        elif kind == "endtable":
+            if any(closer == "|}" for closer, _ in skip):
+                while skip.pop()[0] != "|}":
+                    pass
+        elif kind == "tag":
+            end = _skip_tag(text, start)
+            if end is not None:
+                pos = scan = end
+            elif not skip:
+                sink.append("<")
+        elif kind == "link":
+            frames.append(["link", [], None])
+        elif kind == "pipe":
+            frame = frames[-1]
+            if frame[2] is None:
+                frame[2] = "".join(frame[1])
+            # Le libellé est le dernier segment ([[Sary:x.jpg|thumb|légende]])
+            frame[1] = []
+        elif kind == "endlink":
+            if frames:
+                genre, parts, target = frames.pop()
+                label = "".join(parts)
+                if genre == "link":
+                    target = label if target is None else target
+                    # Fichiers, catégories, interwikis : pas du texte d'article
+                    if ":" not in target:
+                        (frames[-1][1] if frames else out).append(label)
+                else:
+                    (frames[-1][1] if frames else out).append(label)
+        elif kind == "ext":
+            url = EXT_URL.match(text, pos)
+            if url is None:
+                sink.append("[")
+            else:
+                frames.append(["ext", [], None])
+                pos = scan = url.end()
+        elif kind == "endext":
+            if frames and frames[-1][0] == "ext":
+                label = "".join(frames.pop()[1])
+                (frames[-1][1] if frames else out).append(label)
+            else:
+                sink.append("]")
+
+        # L'état a changé : motif et destination du texte
+        if skip:
+            pattern = SKIP_TOKEN
+        elif frames and frames[-1][0] == "link":
+            pattern = LINK_TOKEN
+        else:
+            pattern = TOKEN
+        sink = frames[-1][1] if frames else out
+
+    # Liens jamais refermés : on garde leur texte, dans l'ordre d'ouverture
+    # (chaque morceau n'est copié qu'une fois, quelle que soit la profondeur)
+    for _, parts, _ in frames:
+        out.extend(parts)
+
+    return _format("".join(out))